@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def silent_database() -> int:
+    # Accepts connections and never answers, like a Postgres host that is up but stuck.
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(128)
+    held: list[socket.socket] = []
+
+    def accept() -> None:
+        while True:
+            connection, _ = listener.accept()
+            held.append(connection)
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def start_api(backend_dir: Path, port: int, env: dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def cold_start(backend_dir: Path, env: dict[str, str]) -> dict[str, float]:
+    port = free_port()
+    started = time.perf_counter()
+    process = start_api(backend_dir, port, env)
+    result: dict[str, float] = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            while "health_ms" not in result:
+                try:
+                    client.get("/api/health").raise_for_status()
+                    result["health_ms"] = (time.perf_counter() - started) * 1000
+                except httpx.HTTPError:
+                    time.sleep(0.01)
+            client.post("/api/users", json={"line_user_id": "bench-cold-start"}).raise_for_status()
+            result["first_user_ms"] = (time.perf_counter() - started) * 1000
+    finally:
+        process.terminate()
+        process.wait()
+    return result
+
+
+def outage(backend_dir: Path, env: dict[str, str], requests: int, connect_timeout: int) -> dict[str, float]:
+    port = free_port()
+    database_port = silent_database()
+    env = {
+        **env,
+        "DATABASE_URL": f"postgresql+psycopg://bench@127.0.0.1:{database_port}/bench?connect_timeout={connect_timeout}",
+    }
+    process = start_api(backend_dir, port, env)
+    latencies = []
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            started = time.perf_counter()
+            while True:
+                try:
+                    client.get("/api/health")
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.05)
+            ready_ms = (time.perf_counter() - started) * 1000
+            for _ in range(requests):
+                request_started = time.perf_counter()
+                status = client.post("/api/users", json={"line_user_id": "bench-cold-start"}).status_code
+                latencies.append(time.perf_counter() - request_started)
+                assert status == 503, status
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "ready_ms": round(ready_ms, 1),
+        "requests": requests,
+        "p50_503_ms": round(statistics.median(latencies) * 1000, 1),
+        "total_seconds": round(sum(latencies), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure API cold start and behaviour while the database hangs.")
+    parser.add_argument("--backend-dir", type=Path, default=BACKEND_DIR, help="Backend checkout to start, for before/after runs.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--outage-requests", type=int, default=10)
+    parser.add_argument("--connect-timeout", type=int, default=2)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    samples = [cold_start(args.backend_dir, env) for _ in range(args.runs)]
+    result = {
+        "backend_dir": str(args.backend_dir),
+        "runs": args.runs,
+        "health_ms": round(statistics.median(sample["health_ms"] for sample in samples), 1),
+        "first_user_ms": round(statistics.median(sample["first_user_ms"] for sample in samples), 1),
+        "outage": outage(args.backend_dir, env, args.outage_requests, args.connect_timeout),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import select, text
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+CONFIGS = {
+    "pre_ping": {"DATABASE_POOL_PRE_PING": "true", "DATABASE_PREPARE_THRESHOLD": "5"},
+    "tuned": {},
+    "pgbouncer": {"DATABASE_PGBOUNCER": "true"},
+}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def seed(api, swipes: int, liked: int) -> None:
+    with api.engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                INSERT INTO places (place_id, name, lat, lng, image, snapshot, updated_at)
+                SELECT 'bench-' || n, 'Bench place ' || n, 13.0, 100.0, '', '{}'::json, now()
+                FROM generate_series(1, :liked) AS n
+                ON CONFLICT (place_id) DO NOTHING
+                """
+            ),
+            {"liked": liked},
+        )
+        user_id = connection.execute(
+            text(
+                """
+                INSERT INTO users (line_user_id, created_at, updated_at) VALUES ('bench-pool', now(), now())
+                ON CONFLICT (line_user_id) DO UPDATE SET updated_at = now()
+                RETURNING id
+                """
+            )
+        ).scalar_one()
+        connection.execute(text("DELETE FROM swipes WHERE user_id = :user_id"), {"user_id": user_id})
+        connection.execute(text("DELETE FROM user_places WHERE user_id = :user_id"), {"user_id": user_id})
+        connection.execute(
+            text(
+                """
+                INSERT INTO swipes (user_id, place_id, direction, created_at)
+                SELECT :user_id, 'bench-' || (1 + n % :liked), 'right', now() - make_interval(secs => n)
+                FROM generate_series(1, :swipes) AS n
+                """
+            ),
+            {"user_id": user_id, "swipes": swipes, "liked": liked},
+        )
+        connection.execute(
+            text(
+                """
+                INSERT INTO user_places (user_id, place_id, status, source, created_at, updated_at)
+                SELECT :user_id, 'bench-' || n, 'liked', 'swipe', now(), now() FROM generate_series(1, :liked) AS n
+                """
+            ),
+            {"user_id": user_id, "liked": liked},
+        )
+
+
+def run_worker(threads: int, seconds: float) -> dict[str, object]:
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main as api
+
+    session = contextmanager(api.get_db)
+
+    def hot_queries() -> None:
+        with session() as db:
+            user = db.scalar(select(api.UserRecord).where(api.UserRecord.line_user_id == "bench-pool"))
+            db.scalars(
+                select(api.UserPlaceRecord.place_id)
+                .where(api.UserPlaceRecord.user_id == user.id, api.UserPlaceRecord.status == "liked")
+                .order_by(api.UserPlaceRecord.updated_at.desc())
+            ).all()
+            db.execute(
+                select(api.SwipeRecord.place_id, api.SwipeRecord.direction, api.SwipeRecord.created_at)
+                .where(api.SwipeRecord.user_id == user.id)
+                .order_by(api.SwipeRecord.created_at.desc(), api.SwipeRecord.id.desc())
+                .limit(50)
+            ).all()
+
+    for _ in range(threads * 10):
+        hot_queries()
+
+    latencies: list[list[float]] = [[] for _ in range(threads)]
+    deadline = time.perf_counter() + seconds
+
+    def loop(samples: list[float]) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            hot_queries()
+            samples.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=loop, args=(samples,)) for samples in latencies]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    with api.engine.connect() as connection:
+        prepared = connection.execute(text("SELECT count(*) FROM pg_prepared_statements")).scalar()
+    combined = [value for samples in latencies for value in samples]
+    return {
+        "requests_per_second": round(len(combined) / seconds, 1),
+        "p50_ms": round(statistics.median(combined) * 1000, 3),
+        "p99_ms": round(percentile(combined, 0.99) * 1000, 3),
+        "prepared_statements_on_one_connection": prepared,
+        "pool": api.engine.pool.status(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare connection pool and prepared statement settings.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--swipes", type=int, default=20_000)
+    parser.add_argument("--liked", type=int, default=500)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.threads, args.seconds)))
+        return
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main as api
+    import migrations
+
+    migrations.migrate()
+    seed(api, args.swipes, args.liked)
+    results = {}
+    for name in args.configs.split(","):
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", "--threads", str(args.threads), "--seconds", str(args.seconds)],
+            env={**os.environ, **CONFIGS[name]},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from synthetic_catalogue import BASE_PLACES, write_catalogue
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+# The worker's own scoring, kept so the id-order runs can swap in the previous place-id tie-break.
+SCORE = None
+
+
+class VirtualClock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def percentile(values: list[float], quantile: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(quantile * len(ordered)))], 1)
+
+
+def simulate(
+    worker,
+    catalogue: list[dict],
+    workdir: Path,
+    args: argparse.Namespace,
+    prioritized: bool,
+    weighted: bool,
+) -> dict:
+    import image_demand
+
+    clock = VirtualClock()
+    run = f"{'demand' if prioritized else 'id'}-{'weighted' if weighted else 'uniform'}"
+    worker.time = clock
+    worker.FETCH_WORKERS = 1
+    worker.IMAGE_DEMAND_ENABLED = prioritized
+    worker.WorkQueue.score = SCORE if prioritized else lambda queue, place_id, now: 0.0
+    worker.load_manifest = lambda: {"places": {}}
+    worker.write_manifest = lambda manifest: None
+    worker.ensure_bucket = lambda: None
+    worker.now_iso = lambda: datetime.fromtimestamp(clock.now, timezone.utc).isoformat()
+    spool = image_demand.DemandSpool(workdir / f"demand-{run}", 0, 0)
+    worker.read_spool = lambda: image_demand.read_spool(spool.directory)
+
+    rng = random.Random(args.seed)
+    records = [raw for raw in catalogue if str(raw.get("placeId") or raw.get("id") or "").strip()]
+    place_ids = [str(raw.get("placeId") or raw.get("id")).strip() for raw in records]
+    # Weighted requests follow viewer counts, the way popular places dominate swipe decks; uniform requests hit the long tail.
+    weights = [max(1, raw["viewer"]) if isinstance(raw.get("viewer"), int) else 1 for raw in records] if weighted else None
+    arrivals = sorted(
+        (clock.now + rng.uniform(0, args.window_minutes * 60), place_id)
+        for place_id in rng.choices(place_ids, weights=weights, k=args.requests)
+    )
+    requested_at: dict[str, float] = {}
+    cached_at: dict[str, float] = {}
+    next_arrival = 0
+
+    def cache_place(place_id: str, urls: list[str], previous: dict, method: int) -> dict:
+        nonlocal next_arrival
+        clock.sleep(args.seconds_per_place)
+        while next_arrival < len(arrivals) and arrivals[next_arrival][0] <= clock.now:
+            at, requested = arrivals[next_arrival]
+            next_arrival += 1
+            requested_at.setdefault(requested, at)
+            if requested not in cached_at:
+                spool._pending.setdefault(requested, {"hits": 1, "requested_at": at, "missing": True})
+        spool.flush()
+        cached_at.setdefault(place_id, clock.now)
+        return {"status": "cached" if urls else "no_source", "objects": [place_id] if urls else [], "checked_at": worker.now_iso()}
+
+    worker.cache_place = cache_place
+    queue = worker.WorkQueue(workdir / f"queue-{run}.json")
+    worker.run_once(queue, {})
+
+    # A place cached before anyone asked for it costs the user no wait at all.
+    waits = [max(0.0, cached_at[place_id] - at) for place_id, at in requested_at.items() if place_id in cached_at]
+    return {
+        "requested_places": len(requested_at),
+        "cached_before_request": sum(1 for place_id, at in requested_at.items() if cached_at.get(place_id, at) < at),
+        "p50_seconds_to_cached": percentile(waits, 0.5),
+        "p95_seconds_to_cached": percentile(waits, 0.95),
+        "mean_seconds_to_cached": round(statistics.fmean(waits), 1) if waits else None,
+        "batch_seconds": round(max(cached_at.values()) - min(cached_at.values()) + args.seconds_per_place, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate time from first API request to a cached image during a full cache fill.")
+    parser.add_argument("--scale", type=float, default=1, help=f"Catalogue size as a multiple of {BASE_PLACES:,} places.")
+    parser.add_argument("--seconds-per-place", type=float, default=0.8, help="Virtual fetch and encode time per place.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--window-minutes", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="long-image-demand-"))
+    places_path, manifest_path = write_catalogue(workdir, int(BASE_PLACES * args.scale))
+    os.environ.update(
+        {
+            "PLACES_JSON_PATH": str(places_path),
+            "IMAGE_CACHE_MANIFEST_PATH": str(manifest_path),
+            "CATALOGUE_SNAPSHOT_PATH": str(workdir / "snapshot.json"),
+        }
+    )
+    sys.path.insert(0, str(BACKEND_DIR))
+    import cache_place_images as worker
+
+    global SCORE
+    SCORE = worker.WorkQueue.score
+    catalogue = json.loads(places_path.read_text(encoding="utf-8"))
+    result = {
+        "places": int(BASE_PLACES * args.scale),
+        "seconds_per_place": args.seconds_per_place,
+        "requests": args.requests,
+        "window_minutes": args.window_minutes,
+    }
+    for weighted in (True, False):
+        requests = "viewer_weighted_requests" if weighted else "uniform_requests"
+        result[requests] = {
+            "id_order": simulate(worker, catalogue, workdir, args, prioritized=False, weighted=weighted),
+            "demand_order": simulate(worker, catalogue, workdir, args, prioritized=True, weighted=weighted),
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
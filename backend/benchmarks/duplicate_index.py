@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def clustered_hashes(count: int, cluster_share: float, seed: int) -> list[int]:
+    # Mostly unrelated photos, plus stock images that recur at many places with a few bits of re-encoding noise.
+    rng = random.Random(seed)
+    stock = [rng.getrandbits(64) for _ in range(max(1, int(count * cluster_share) // 20))]
+    hashes = []
+    for _ in range(count):
+        if rng.random() < cluster_share:
+            noise = 0
+            for _ in range(rng.randint(0, 3)):
+                noise |= 1 << rng.randrange(64)
+            hashes.append(rng.choice(stock) ^ noise)
+        else:
+            hashes.append(rng.getrandbits(64))
+    return hashes
+
+
+def best_seconds(function: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    runs, value = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = function()
+        runs.append(time.perf_counter() - started)
+    return min(runs), value
+
+
+def tuple_bits(value: int, bits: int) -> tuple[int, ...]:
+    return tuple((value >> (bits - 1 - index)) & 1 for index in range(bits))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare BK-tree Hamming-radius queries with a linear scan, and packed placeholder hashes with bit tuples.")
+    parser.add_argument("--images", type=int, default=150_000, help="Cached images in the index.")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--placeholders", type=int, default=200, help="Reference placeholders for the tuple-versus-packed comparison.")
+    parser.add_argument("--cluster-share", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from perceptual_index import BKTree, hamming
+
+    hashes = clustered_hashes(args.images, args.cluster_share, args.seed)
+    rng = random.Random(args.seed + 1)
+    queries = [rng.choice(hashes) ^ (1 << rng.randrange(64)) for _ in range(args.queries // 2)]
+    queries += [rng.getrandbits(64) for _ in range(args.queries - len(queries))]
+
+    started = time.perf_counter()
+    tree = BKTree()
+    for position, value in enumerate(hashes):
+        tree.add(value, position)
+    build_seconds = time.perf_counter() - started
+
+    radii = {}
+    for radius in (2, 6):
+        linear_seconds, linear = best_seconds(
+            lambda: [sorted(position for position, value in enumerate(hashes) if hamming(query, value) <= radius) for query in queries[:30]],
+            1,
+        )
+        tree_seconds, found = best_seconds(lambda: [sorted(position for _, position in tree.search(query, radius)) for query in queries], 3)
+        radii[f"radius_{radius}"] = {
+            "linear_ms_per_query": round(linear_seconds / 30 * 1000, 2),
+            "bk_tree_ms_per_query": round(tree_seconds / len(queries) * 1000, 3),
+            "same_matches": linear == found[:30],
+            "mean_matches": round(sum(len(matches) for matches in found) / len(found), 1),
+        }
+
+    # Placeholder matching: the old bit-tuple comparison against each reference versus packed ints in a BK-tree.
+    references = [rng.getrandbits(512) for _ in range(args.placeholders)]
+    candidates = [rng.getrandbits(512) for _ in range(200)] + [reference ^ (1 << rng.randrange(512)) for reference in references[:20]]
+    threshold = 51
+    reference_tuples = [tuple_bits(reference, 512) for reference in references]
+
+    def tuple_matches() -> list[bool]:
+        results = []
+        for candidate in candidates:
+            bits = tuple_bits(candidate, 512)
+            results.append(any(sum(1 for left, right in zip(bits, reference) if left != right) <= threshold for reference in reference_tuples))
+        return results
+
+    placeholder_tree = BKTree()
+    for position, reference in enumerate(references):
+        placeholder_tree.add(reference, position)
+    tuple_seconds, tuple_result = best_seconds(tuple_matches, 1)
+    packed_seconds, packed_result = best_seconds(lambda: [bool(placeholder_tree.search(candidate, threshold)) for candidate in candidates], 3)
+
+    print(
+        json.dumps(
+            {
+                "images": args.images,
+                "queries": len(queries),
+                "build_seconds": round(build_seconds, 2),
+                "queries_by_radius": radii,
+                "placeholders": {
+                    "references": len(references),
+                    "tuple_ms_per_image": round(tuple_seconds / len(candidates) * 1000, 2),
+                    "packed_ms_per_image": round(packed_seconds / len(candidates) * 1000, 3),
+                    "same_matches": tuple_result == packed_result,
+                    "matched": sum(packed_result),
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
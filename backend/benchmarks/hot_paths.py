@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable
+
+from synthetic_catalogue import BASE_PLACES, write_catalogue
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = Path(__file__).resolve().with_name("baseline.json")
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def measure(function: Callable[[], Any], repeat: int, min_seconds: float = 0.2) -> dict[str, float]:
+    function()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds or number >= 1 << 20:
+            break
+        number *= 2
+    runs = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        runs.append((time.perf_counter() - started) / number)
+    return {"median_ms": round(statistics.median(runs) * 1000, 4), "min_ms": round(min(runs) * 1000, 4)}
+
+
+def sample_images() -> dict[str, bytes]:
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(3)
+    photo = Image.new("RGB", (1600, 1067))
+    draw = ImageDraw.Draw(photo)
+    for _ in range(400):
+        x, y = rng.randrange(1600), rng.randrange(1067)
+        colour = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        draw.rectangle((x, y, x + rng.randrange(20, 200), y + rng.randrange(20, 200)), fill=colour)
+    images = {"photo": photo, "blurry": photo.filter(ImageFilter.GaussianBlur(12)), "small": photo.resize((200, 133))}
+    encoded = {}
+    for name, image in images.items():
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        encoded[name] = buffer.getvalue()
+    logo = BACKEND_DIR.parent / "src" / "assets" / "sha-logo.png"
+    if logo.exists():
+        encoded["sha_placeholder"] = logo.read_bytes()
+    return encoded
+
+
+def micro_benchmarks(api: Any, raw_places: list[dict], repeat: int) -> dict[str, dict[str, float]]:
+    import image_quality
+
+    rng = random.Random(5)
+    places = api.get_places()
+    points = [(place.lat, place.long) for place in rng.sample(places, 32)]
+    point_cycle = iter(points * 1_000_000)
+    provinces = sorted({place.province for place in places if place.province})
+    results: dict[str, dict[str, float]] = {}
+
+    def normalize_all() -> None:
+        for raw in raw_places:
+            api._normalize_place(raw)
+
+    def load_places() -> None:
+        api.get_places.cache_clear()
+        api.get_places()
+
+    results["normalize_place_catalogue"] = measure(normalize_all, repeat)
+    results["get_places_cold"] = measure(load_places, repeat)
+    api.catalogue_rows.cache_clear()
+    api.places_by_id.cache_clear()
+    api.warm_caches()
+
+    def nearby() -> None:
+        lat, lng = next(point_cycle)
+        api.nearby_pois(lat=lat, lng=lng, radius_km=25, limit=12, exclude_ids=None, images_only=False, line_user_id=None)
+
+    def nearby_images_only() -> None:
+        lat, lng = next(point_cycle)
+        api.nearby_pois(lat=lat, lng=lng, radius_km=25, limit=12, exclude_ids=None, images_only=True, line_user_id=None)
+
+    results["nearby_pois"] = measure(nearby, repeat)
+    results["nearby_pois_images_only"] = measure(nearby_images_only, repeat)
+    results["list_pois_search"] = measure(
+        lambda: api.list_pois(q="น้ำตก", province=None, category=None, limit=50, offset=0), repeat
+    )
+    results["list_pois_province"] = measure(
+        lambda: api.list_pois(q=None, province=provinces[0], category="attraction", limit=50, offset=0), repeat
+    )
+    results["poi_clusters"] = measure(lambda: api.poi_clusters(limit=12, grid_size=0.25, min_places=20), repeat)
+
+    anchor = api.RouteAnchor(lat=points[0][0], lng=points[0][1], label="bench")
+    candidates = []
+    for place in places:
+        distance = api._haversine_km(anchor.lat, anchor.lng, place.lat, place.long)
+        candidates.append(place.model_copy(update={"distance_km": distance}))
+    candidates = sorted(candidates, key=lambda place: place.distance_km)[:200]
+    for personality in ("introvert mode", "adventure mode"):
+        results[f"fallback_route_{personality.split()[0]}"] = measure(
+            lambda personality=personality: api.fallback_route(candidates, 8, anchor, personality), repeat
+        )
+
+    for name, content in sample_images().items():
+        results[f"check_image_bytes_{name}"] = measure(lambda content=content: image_quality.check_image_bytes(content), repeat)
+    return results
+
+
+async def end_to_end(api: Any, seconds: float, concurrency: int) -> dict[str, Any]:
+    import httpx
+
+    places = api.get_places()
+    rng = random.Random(9)
+    latencies: dict[str, list[float]] = {}
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    transport = httpx.ASGITransport(app=api.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def user() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                place = rng.choice(places)
+                requests = [
+                    ("clusters", "/api/poi-clusters", {}),
+                    ("nearby", "/api/pois/nearby", {"lat": place.lat, "lng": place.long, "radius_km": 25}),
+                    ("nearby", "/api/pois/nearby", {"lat": place.lat, "lng": place.long, "images_only": "true"}),
+                    ("search", "/api/pois", {"q": rng.choice(("วัด", "หาด", "คาเฟ่", "ตลาด"))}),
+                ]
+                for name, path, params in requests:
+                    started = time.perf_counter()
+                    response = await client.get(path, params=params)
+                    latencies.setdefault(name, []).append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "requests_per_second": round(total / elapsed, 1),
+        "errors": errors,
+        "endpoints": {
+            name: {
+                "requests": len(values),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            }
+            for name, values in sorted(latencies.items())
+        },
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[dict[str, Any]]:
+    rows = []
+    for name, current in results["micro"].items():
+        previous = baseline.get("micro", {}).get(name)
+        if not previous:
+            continue
+        # The fastest run is the least disturbed by other work on the machine, so compare minimums.
+        ratio = current["min_ms"] / previous["min_ms"] if previous["min_ms"] else 1.0
+        rows.append({"name": name, "baseline_ms": previous["min_ms"], "current_ms": current["min_ms"], "ratio": round(ratio, 3)})
+    previous_rps = baseline.get("end_to_end", {}).get("requests_per_second")
+    if previous_rps:
+        current_rps = results["end_to_end"]["requests_per_second"]
+        rows.append(
+            {"name": "end_to_end_rps", "baseline": previous_rps, "current": current_rps, "ratio": round(previous_rps / current_rps, 3)}
+        )
+    for row in rows:
+        row["regression"] = row["ratio"] > 1 + tolerance
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the catalogue, search, route, and image-check hot paths.")
+    parser.add_argument("--scale", type=float, default=10, help=f"Catalogue size as a multiple of {BASE_PLACES:,} places.")
+    parser.add_argument("--places", type=int, help="Exact number of places; overrides --scale.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of the end-to-end scenario.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", type=Path, help="Write the results JSON here.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Replace the baseline with these results.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before a result counts as a regression.")
+    args = parser.parse_args()
+
+    places = args.places or int(BASE_PLACES * args.scale)
+    workdir = Path(tempfile.mkdtemp(prefix="long-hot-paths-"))
+    places_path, manifest_path = write_catalogue(workdir, places)
+    os.environ["PLACES_JSON_PATH"] = str(places_path)
+    os.environ["IMAGE_CACHE_MANIFEST_PATH"] = str(manifest_path)
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main as api
+
+    raw_places = json.loads(places_path.read_text(encoding="utf-8"))
+    results: dict[str, Any] = {
+        "places": places,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "micro": micro_benchmarks(api, raw_places, args.repeat),
+        "end_to_end": asyncio.run(end_to_end(api, args.seconds, args.concurrency)),
+    }
+
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("places") == places:
+            results["comparison"] = compare(results, baseline, args.tolerance)
+        else:
+            print(f"Baseline was recorded with {baseline.get('places')} places; skipping comparison.", file=sys.stderr)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.write_text(output + "\n", encoding="utf-8")
+    print(output)
+    if any(row["regression"] for row in results.get("comparison", [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from synthetic_catalogue import BASE_PLACES, write_catalogue
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def timed(function, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - started)
+    return round(statistics.median(runs) * 1000, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare a full catalogue scan with the image cache work queue.")
+    parser.add_argument("--scale", type=float, default=10, help=f"Catalogue size as a multiple of {BASE_PLACES:,} places.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="long-image-queue-"))
+    places_path, manifest_path = write_catalogue(workdir, int(BASE_PLACES * args.scale))
+    os.environ.update(
+        {
+            "PLACES_JSON_PATH": str(places_path),
+            "IMAGE_CACHE_MANIFEST_PATH": str(manifest_path),
+            "CATALOGUE_SNAPSHOT_PATH": str(workdir / "snapshot.json"),
+            "IMAGE_CACHE_QUEUE_PATH": str(workdir / "queue.json"),
+        }
+    )
+    sys.path.insert(0, str(BACKEND_DIR))
+    import cache_place_images as worker
+    from image_cache import load_manifest
+    from place_catalogue import image_candidates, load_catalogue, source_fingerprint
+
+    # Every place was checked a minute ago, so an idle pass finds nothing to do.
+    checked_at = datetime.now(timezone.utc).isoformat()
+    manifest = load_manifest()
+    for entry in load_catalogue(places_path):
+        manifest["places"][entry["id"]] = {
+            **manifest["places"].get(entry["id"], {}),
+            "source_fingerprint": entry["image_fingerprint"],
+            "variant_spec": worker.variant_spec(),
+            "checked_at": checked_at,
+        }
+    worker.write_manifest(manifest)
+
+    def full_scan() -> int:
+        # The previous run_once: parse places.json, fingerprint every place, parse every checked_at.
+        due = 0
+        current = load_manifest()
+        retry_seconds = worker.RETRY_HOURS * 3600
+        for raw in json.loads(places_path.read_text(encoding="utf-8")):
+            place_id = str(raw.get("placeId") or raw.get("id") or "").strip()
+            if not place_id:
+                continue
+            previous = current["places"].get(place_id, {})
+            changed = previous.get("source_fingerprint") != source_fingerprint(image_candidates(raw))
+            elapsed = datetime.now(timezone.utc) - datetime.fromisoformat(previous["checked_at"])
+            due += changed or elapsed.total_seconds() >= retry_seconds
+        return due
+
+    queue = worker.WorkQueue(worker.QUEUE_PATH)
+    urls: dict[str, list[str]] = {}
+    started = time.perf_counter()
+    worker.run_once(queue, urls)
+    bootstrap_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    restarted = worker.WorkQueue.load(worker.QUEUE_PATH)
+    worker.run_once(restarted, {})
+    restart_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    idle_ms = timed(lambda: worker.run_once(queue, urls), args.repeat)
+    full_scan_ms = timed(full_scan, args.repeat)
+
+    payload = json.loads(places_path.read_text(encoding="utf-8"))
+    payload[0]["sha"]["thumbnailUrl"] = "https://images.example.invalid/changed.jpg"
+    places_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    started = time.perf_counter()
+    changed = worker.sync_catalogue(queue, load_manifest())
+    changed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    result = {
+        "places": len(payload),
+        "previous_full_scan_ms": full_scan_ms,
+        "queue_bootstrap_ms": bootstrap_ms,
+        "queue_restart_idle_cycle_ms": restart_ms,
+        "queue_idle_cycle_ms": idle_ms,
+        "queue_sync_after_one_change_ms": changed_ms,
+        "due_after_one_change": queue.pending(time.time()),
+        "catalogue_reloaded": changed is not None,
+        "queue_file_kb": round(worker.QUEUE_PATH.stat().st_size / 1024, 1),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
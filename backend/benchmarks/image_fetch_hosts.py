@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+IMAGE_BYTES = random.Random(5).randbytes(48_000)
+
+# name: (share of image URLs, latency seconds, error rate); a latency of None never answers within the timeout.
+HOSTS = {
+    "cdn-a": (0.25, 0.03, 0.0),
+    "cdn-b": (0.25, 0.03, 0.0),
+    "flaky": (0.2, 0.05, 0.3),
+    "slow": (0.1, 1.5, 0.0),
+    "dead": (0.2, None, 0.0),
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        latency, error_rate = self.server.behaviour
+        time.sleep(latency if latency is not None else self.server.hang_seconds)
+        if random.random() < error_rate:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(IMAGE_BYTES)))
+        self.end_headers()
+        self.wfile.write(IMAGE_BYTES)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_hosts(hang_seconds: float) -> dict[str, str]:
+    origins = {}
+    for name, (_, latency, error_rate) in HOSTS.items():
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        server.daemon_threads = True
+        server.behaviour = (latency, error_rate)
+        server.hang_seconds = hang_seconds
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        origins[name] = f"http://127.0.0.1:{server.server_address[1]}"
+    return origins
+
+
+def place_urls(origins: dict[str, str], places: int, urls_per_place: int, seed: int) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    names = list(HOSTS)
+    weights = [HOSTS[name][0] for name in names]
+    return {
+        f"P{index:07d}": [
+            f"{origins[host]}/{index}-{position}.jpg"
+            for position, host in enumerate(rng.choices(names, weights=weights, k=urls_per_place))
+        ]
+        for index in range(places)
+    }
+
+
+def previous_cache_place(worker, urls: list[str], timeout: float) -> dict[str, Any]:
+    # The fetch loop before per-host limits: one client per place, no retries, one URL at a time.
+    import httpx
+
+    objects, failures = [], []
+    with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+        for url in urls:
+            try:
+                response = client.get(url)
+                response.raise_for_status()
+                objects.append(url)
+            except httpx.HTTPError as exc:
+                failures.append({"url": url, "reason": type(exc).__name__})
+    return {"status": "cached" if objects else "failed", "objects": objects, "failures": failures}
+
+
+def summarize(results: dict[str, dict[str, Any]], seconds: float, origins: dict[str, str]) -> dict[str, Any]:
+    hosts = {origin: name for name, origin in origins.items()}
+    reasons = Counter(failure["reason"] for result in results.values() for failure in result["failures"])
+    healthy = sum(1 for result in results.values() for url in result["objects"] if hosts[url.rsplit("/", 1)[0]] in {"cdn-a", "cdn-b"})
+    return {
+        "seconds": round(seconds, 1),
+        "places_cached": sum(1 for result in results.values() if result["status"] == "cached"),
+        "places_deferred": sum(1 for result in results.values() if result["status"] == "deferred"),
+        "healthy_host_images_per_second": round(healthy / seconds, 1),
+        "failure_reasons": dict(reasons.most_common()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch place images from stand-in hosts with injected latency and errors.")
+    parser.add_argument("--places", type=int, default=120)
+    parser.add_argument("--urls-per-place", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=2.0, help="Read timeout for both fetchers; production uses 12 s.")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("IMAGE_CACHE_FETCH_TIMEOUT_SECONDS", str(args.timeout))
+    os.environ.setdefault("IMAGE_FETCH_RETRY_BASE_SECONDS", "0.2")
+    sys.path.insert(0, str(BACKEND_DIR))
+    import cache_place_images as worker
+
+    origins = start_hosts(hang_seconds=args.timeout * 5)
+    urls = place_urls(origins, args.places, args.urls_per_place, args.seed)
+    # Quality checks and encoding are stubbed so the comparison isolates fetch scheduling.
+    worker.check_image_bytes = lambda content: type("Quality", (), {"usable": True, "reason": "ok", "duplicate_hash": 0})()
+    worker.encode_variants = lambda content, method: []
+
+    started = time.perf_counter()
+    previous = {place_id: previous_cache_place(worker, place_urls_, args.timeout) for place_id, place_urls_ in urls.items()}
+    previous_seconds = time.perf_counter() - started
+
+    results: dict[str, dict[str, Any]] = {}
+    started = time.perf_counter()
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=worker.FETCH_WORKERS) as pool:
+        futures = {place_id: pool.submit(worker.cache_place, place_id, place_urls_, {}) for place_id, place_urls_ in urls.items()}
+        for place_id, future in futures.items():
+            result = future.result()
+            # cache_place names objects after the URL digest; map them back to hosts for the summary.
+            result["objects"] = [url for url in urls[place_id] if url not in {failure["url"] for failure in result["failures"]}]
+            results[place_id] = result
+    current_seconds = time.perf_counter() - started
+
+    print(
+        json.dumps(
+            {
+                "places": args.places,
+                "urls_per_place": args.urls_per_place,
+                "timeout_seconds": args.timeout,
+                "fetch_workers": worker.FETCH_WORKERS,
+                "hosts": {name: {"share": share, "latency_seconds": latency, "error_rate": error} for name, (share, latency, error) in HOSTS.items()},
+                "previous": summarize(previous, previous_seconds, origins),
+                "scheduled": summarize(results, current_seconds, origins),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import uvicorn
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def object_store_app(object_bytes: int, latency_seconds: float, chunk_count: int):
+    payload = os.urandom(object_bytes)
+    chunk_size = max(1, object_bytes // chunk_count)
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        headers = [
+            (b"content-type", b"image/webp"),
+            (b"content-length", str(object_bytes).encode()),
+            (b"etag", b'"stand-in"'),
+            (b"last-modified", b"Mon, 01 Jan 2024 00:00:00 GMT"),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+        for offset in range(0, object_bytes, chunk_size):
+            await asyncio.sleep(latency_seconds / chunk_count)
+            await send({"type": "http.response.body", "body": payload[offset : offset + chunk_size], "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+def run_object_store(port: int, object_bytes: int, latency_seconds: float) -> None:
+    app = object_store_app(object_bytes, latency_seconds, 8)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def run_load(base_url: str, requests: int, concurrency: int, objects: int) -> dict[str, object]:
+    import httpx
+
+    image_latencies: list[float] = []
+    health_latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index % objects)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=concurrency + 4)) as client:
+
+        async def image_worker() -> None:
+            nonlocal errors
+            while not queue.empty():
+                object_index = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(f"/api/image-cache/images/places/bench/{object_index:06d}.webp")
+                image_latencies.append(time.perf_counter() - started)
+                errors += response.status_code != 200
+
+        async def health_probe() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/health")
+                health_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        probe = asyncio.create_task(health_probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(image_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "image_p50_ms": round(statistics.median(image_latencies) * 1000, 1),
+        "image_p95_ms": round(percentile(image_latencies, 0.95) * 1000, 1),
+        "health_p50_ms": round(statistics.median(health_latencies) * 1000, 1) if health_latencies else None,
+        "health_max_ms": round(max(health_latencies) * 1000, 1) if health_latencies else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load the image proxy against a local object-store stand-in.")
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=48)
+    parser.add_argument("--objects", type=int, default=600, help="Distinct objects; equal to --requests means all misses.")
+    parser.add_argument("--object-kb", type=int, default=120)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--max-streams", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="long-proxy-bench-"))
+    (workdir / "places.json").write_text("[]", encoding="utf-8")
+    store_port = free_port()
+    os.environ.update(
+        {
+            "MINIO_ENDPOINT": f"127.0.0.1:{store_port}",
+            "IMAGE_CACHE_MANIFEST_PATH": str(workdir / "manifest.json"),
+            "IMAGE_PROXY_CACHE_DIR": str(workdir / "proxy"),
+            "IMAGE_PROXY_MAX_STREAMS": str(args.max_streams),
+            "PLACES_JSON_PATH": str(workdir / "places.json"),
+            "DATABASE_URL": f"sqlite:///{workdir / 'bench.sqlite'}",
+        }
+    )
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main as api
+
+    store = multiprocessing.Process(
+        target=run_object_store,
+        args=(store_port, args.object_kb * 1024, args.latency_ms / 1000),
+        daemon=True,
+    )
+    store.start()
+    time.sleep(1)
+    api_port = free_port()
+    start_server(api.app, api_port)
+
+    result = asyncio.run(run_load(f"http://127.0.0.1:{api_port}", args.requests, args.concurrency, args.objects))
+    result["proxy_cache"] = api.image_proxy_cache().stats()
+    store.terminate()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
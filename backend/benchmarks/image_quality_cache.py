@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from hot_paths import sample_images
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        kind = self.path.rsplit("/", 1)[-1].removesuffix(".jpg")
+        content = self.server.images.get(kind)
+        if content is None:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def previous_check(image_quality, url: str, timeout: float):
+    # check_image_url before the shared client and result cache: a new client per URL and a full check every time.
+    import httpx
+
+    try:
+        with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+            response = client.get(url)
+            response.raise_for_status()
+            content = response.content
+    except httpx.HTTPError:
+        return image_quality.ImageQualityResult(usable=True, reason="fetch-error")
+    return image_quality.check_image_bytes(content)
+
+
+def timed(function) -> tuple[float, Any]:
+    started = time.perf_counter()
+    value = function()
+    return round(time.perf_counter() - started, 3), value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time image URL quality checks with and without the shared client and result cache.")
+    parser.add_argument("--urls", type=int, default=40, help="Image URLs; they share the handful of distinct sample images.")
+    parser.add_argument("--broken", type=int, default=5, help="Extra URLs that always answer 503.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in server latency per request in seconds.")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="long-image-quality-"))
+    os.environ.update(
+        {
+            "IMAGE_QUALITY_CACHE_PATH": str(workdir / "quality.sqlite3"),
+            "IMAGE_FETCH_RETRIES": "0",
+            # Every URL lives on one stand-in host; lift its rate limit so the run measures the client and the cache.
+            "IMAGE_FETCH_HOST_RATE": "1000",
+            "IMAGE_FETCH_HOST_BURST": "1000",
+        }
+    )
+    sys.path.insert(0, str(BACKEND_DIR))
+    import image_quality
+
+    images = sample_images()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    server.daemon_threads = True
+    server.images = images
+    server.latency = args.latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    origin = f"http://127.0.0.1:{server.server_address[1]}"
+    kinds = list(images)
+    urls = [f"{origin}/{index}/{kinds[index % len(kinds)]}.jpg" for index in range(args.urls)]
+    urls += [f"{origin}/{index}/missing.jpg" for index in range(args.broken)]
+
+    previous_seconds, previous = timed(lambda: [url for url in urls if previous_check(image_quality, url, 4).usable])
+    cold_seconds, cold = timed(lambda: image_quality.usable_image_urls(urls))
+    warm_seconds, warm = timed(lambda: image_quality.usable_image_urls(urls))
+    # A new cache object reopens the SQLite file, as a restarted worker would.
+    image_quality.quality_cache.cache_clear()
+    restart_seconds, restarted = timed(lambda: image_quality.usable_image_urls(urls))
+
+    print(
+        json.dumps(
+            {
+                "urls": len(urls),
+                "distinct_images": len(images),
+                "latency_seconds": args.latency,
+                "previous_seconds": previous_seconds,
+                "cold_seconds": cold_seconds,
+                "warm_seconds": warm_seconds,
+                "restart_seconds": restart_seconds,
+                "previous_usable": len(previous),
+                "usable": len(cold),
+                "same_result_after_restart": cold == warm == restarted,
+                "cache_kb": round((workdir / "quality.sqlite3").stat().st_size / 1024, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable
+
+from hot_paths import sample_images
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def corpus() -> dict[str, bytes]:
+    from PIL import Image, ImageFilter
+
+    samples = sample_images()
+    photo = Image.open(BytesIO(samples["photo"])).convert("RGB")
+
+    def encode(image: Image.Image, image_format: str, **options: Any) -> bytes:
+        buffer = BytesIO()
+        image.save(buffer, image_format, **options)
+        return buffer.getvalue()
+
+    camera = photo.resize((4000, 2667), Image.Resampling.BICUBIC).filter(ImageFilter.UnsharpMask(2, 150))
+    images = {
+        "jpeg_4000": encode(camera, "JPEG", quality=90),
+        "jpeg_1600": samples["photo"],
+        "jpeg_progressive_2400": encode(camera.resize((2400, 1600)), "JPEG", quality=85, progressive=True),
+        "png_rgba_1600": encode(photo.convert("RGBA"), "PNG"),
+        "webp_1600": encode(photo, "WEBP", quality=80),
+        "small_200": samples["small"],
+    }
+    for radius in (1, 2, 3, 5, 12):
+        images[f"blur_{radius}_1600"] = encode(photo.filter(ImageFilter.GaussianBlur(radius)), "JPEG", quality=85)
+    if "sha_placeholder" in samples:
+        images["sha_placeholder_png"] = samples["sha_placeholder"]
+    return images
+
+
+def previous_check(image_quality) -> Callable[[bytes], Any]:
+    # check_image_bytes before staging: full decode, hashes at full resolution, per-pixel Laplacian in Python.
+    from PIL import Image, UnidentifiedImageError
+
+    quality = image_quality
+
+    def normalized(image: Image.Image, size: tuple[int, int] | None = None) -> Image.Image:
+        return quality._normalized_rgb(image, size)
+
+    def average_hash(image: Image.Image, size: int = 16) -> tuple[int, ...]:
+        pixels = list(normalized(image, (size, size)).convert("L").getdata())
+        average = sum(pixels) / len(pixels)
+        return tuple(1 if pixel >= average else 0 for pixel in pixels)
+
+    def difference_hash(image: Image.Image, size: int = 16) -> tuple[int, ...]:
+        gray = normalized(image, (size + 1, size)).convert("L")
+        return tuple(1 if gray.getpixel((x, y)) > gray.getpixel((x + 1, y)) else 0 for y in range(size) for x in range(size))
+
+    def laplacian_variance(image: Image.Image) -> float:
+        gray = normalized(image).convert("L")
+        gray.thumbnail((512, 512), Image.Resampling.LANCZOS)
+        width, height = gray.size
+        pixels = gray.load()
+        values = [
+            int(pixels[x - 1, y]) + int(pixels[x + 1, y]) + int(pixels[x, y - 1]) + int(pixels[x, y + 1]) - 4 * int(pixels[x, y])
+            for y in range(1, height - 1)
+            for x in range(1, width - 1)
+        ]
+        mean = sum(values) / len(values)
+        return sum((value - mean) ** 2 for value in values) / len(values)
+
+    def hash_similarity(left: tuple[int, ...], right: tuple[int, ...]) -> float:
+        return sum(1 for left_bit, right_bit in zip(left, right) if left_bit == right_bit) / len(left)
+
+    with Image.open(quality.SHA_REFERENCE_PATH) as logo:
+        reference = (average_hash(logo), difference_hash(logo))
+
+    def check(content: bytes) -> tuple[str, float]:
+        try:
+            image = Image.open(BytesIO(content))
+            image.load()
+        except (UnidentifiedImageError, OSError):
+            return "invalid-image", 0.0
+        if min(image.size) < quality.MIN_IMAGE_EDGE:
+            return "too-small", 0.0
+        similarity = (hash_similarity(average_hash(image), reference[0]) + hash_similarity(difference_hash(image), reference[1])) / 2
+        if similarity >= quality.SHA_MATCH_THRESHOLD:
+            return "sha-placeholder", 0.0
+        sharpness = laplacian_variance(image)
+        return ("blurry" if sharpness < quality.MIN_SHARPNESS_SCORE else "ok"), round(sharpness, 2)
+
+    return check
+
+
+def staged_check(image_quality) -> Callable[[bytes], Any]:
+    def check(content: bytes) -> tuple[str, float]:
+        result = image_quality.check_image_bytes(content)
+        return result.reason, result.sharpness
+
+    return check
+
+
+def in_child(function: Callable[[bytes], Any], content: bytes) -> int:
+    # Peak RSS growth, measured in a forked child so each image starts from the same baseline.
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        function(content)
+        grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+        os.write(write_end, str(grown).encode())
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as reader:
+        grown_kb = int(reader.read() or 0)
+    os.waitpid(pid, 0)
+    return grown_kb
+
+
+def best_ms(function: Callable[[bytes], Any], content: bytes, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(content)
+        runs.append(time.perf_counter() - started)
+    return round(min(runs) * 1000, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare check_image_bytes time, peak memory and verdicts before and after staging.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import image_quality
+
+    checks = {"previous": previous_check(image_quality), "staged": staged_check(image_quality)}
+    for check in checks.values():
+        check(sample_images()["photo"])
+
+    rows = {}
+    for name, content in corpus().items():
+        row: dict[str, Any] = {"kb": round(len(content) / 1024)}
+        for label, check in checks.items():
+            reason, sharpness = check(content)
+            row[label] = {
+                "ms": best_ms(check, content, args.repeat),
+                "peak_rss_growth_kb": in_child(check, content),
+                "reason": reason,
+                "sharpness": sharpness,
+            }
+        row["same_verdict"] = row["previous"]["reason"] == row["staged"]["reason"]
+        rows[name] = row
+
+    totals = {label: round(sum(row[label]["ms"] for row in rows.values()), 1) for label in checks}
+    print(json.dumps({"images": rows, "total_ms": totals, "all_verdicts_match": all(row["same_verdict"] for row in rows.values())}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from synthetic_catalogue import write_catalogue
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def worker_pids(master: int) -> list[int]:
+    pids = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master:
+            pids.append(int(stat.parent.name))
+    return pids
+
+
+def memory_kb(pid: int) -> dict[str, int]:
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        values[key] = int(value.split()[0])
+    return {"rss": values["Rss"], "pss": values["Pss"], "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+async def load(base_url: str, seconds: float, concurrency: int) -> dict[str, float]:
+    latencies: list[float] = []
+    deadline = time.perf_counter() + seconds
+    rng = random.Random(11)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+
+        async def user() -> None:
+            while time.perf_counter() < deadline:
+                params = {"lat": 5.6 + rng.random() * 14.8, "lng": 97.3 + rng.random() * 8.3, "radius_km": 25, "limit": 12}
+                started = time.perf_counter()
+                response = await client.get("/api/pois/nearby", params=params)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    return {
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+    }
+
+
+def run(workdir: Path, workers: int, preload: bool, seconds: float, concurrency: int) -> dict[str, object]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "PLACES_JSON_PATH": str(workdir / "places.json"),
+        "IMAGE_CACHE_MANIFEST_PATH": str(workdir / "manifest.json"),
+        "IMAGE_PROXY_CACHE_DIR": str(workdir / "proxy"),
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_PRELOAD": "true" if preload else "false",
+    }
+    server = subprocess.Popen(
+        ["gunicorn", "main:app"], cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        while len(worker_pids(server.pid)) < workers:
+            time.sleep(0.1)
+        while True:
+            try:
+                httpx.get(f"{base_url}/api/health", timeout=30).raise_for_status()
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        result = asyncio.run(load(base_url, seconds, concurrency))
+        memory = [memory_kb(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "workers": workers,
+        "preload": preload,
+        **result,
+        "worker_rss_mib": round(statistics.mean(item["rss"] for item in memory) / 1024, 1),
+        "worker_pss_mib": round(statistics.mean(item["pss"] for item in memory) / 1024, 1),
+        "worker_private_mib": round(statistics.mean(item["private"] for item in memory) / 1024, 1),
+        "total_pss_mib": round(sum(item["pss"] for item in memory) / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure worker memory and throughput of the gunicorn entry point.")
+    parser.add_argument("--places", type=int, default=50_000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="long-workers-bench-"))
+    write_catalogue(workdir, args.places)
+    results = [
+        run(workdir, workers, preload, args.seconds, args.concurrency)
+        for preload in (False, True)
+        for workers in [int(value) for value in args.workers.split(",")]
+    ]
+    print(json.dumps({"places": args.places, "cpus": os.cpu_count(), "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from image_proxy_load import run_object_store
+from synthetic_catalogue import BASE_PLACES, write_catalogue
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PERSONALITIES = ("introvert mode", "extrovert mode", "adventure mode")
+DURATIONS = ("1 วัน ไม่ค้างคืน", "2 วัน 1 คืน", "3 วัน 2 คืน")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def openrouter_app(latency_seconds: float, error_rate: float):
+    rng = random.Random(13)
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await asyncio.sleep(max(0.0, rng.gauss(latency_seconds, latency_seconds / 4)))
+        if rng.random() < error_rate:
+            await send({"type": "http.response.start", "status": 502, "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b"upstream error"})
+            return
+        prompt = json.loads(json.loads(body)["messages"][-1]["content"])
+        ids = [place["id"] for place in prompt["candidate_places"]][: prompt["desired_place_count"]]
+        content = json.dumps(
+            {"trip_name": "Bench trip", "description": "Mock route", "reasoning": "mock", "ordered_place_ids": ids}
+        )
+        payload = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]}).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": payload})
+
+    return app
+
+
+def run_openrouter(port: int, latency_seconds: float, error_rate: float) -> None:
+    uvicorn.run(openrouter_app(latency_seconds, error_rate), host="127.0.0.1", port=port, log_level="warning")
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.sessions: list[float] = []
+        self.providers: dict[str, int] = {}
+        self.pool_samples: list[float] = []
+        self.postgres_samples: list[tuple[int, int]] = []
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if response is None or response.status_code >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return None
+        return response
+
+
+async def session(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    rng: random.Random,
+    line_user_id: str,
+    returning: bool,
+    args: argparse.Namespace,
+) -> None:
+    started = time.perf_counter()
+    user_path = f"/api/users/{line_user_id}"
+    await recorder.request(client, "POST /api/users", "POST", "/api/users", json={"line_user_id": line_user_id})
+    if returning:
+        await recorder.request(client, "GET /api/users/{id}/swipes", "GET", f"{user_path}/swipes", params={"limit": 200})
+
+    response = await recorder.request(
+        client, "GET /api/poi-clusters", "GET", "/api/poi-clusters", params={"limit": 12, "min_places": 20, "grid_size": 0.25}
+    )
+    clusters = response.json()["clusters"] if response else []
+    if not clusters:
+        return
+    cluster = rng.choice(clusters)
+
+    swipes = 0
+    while swipes < args.swipes:
+        response = await recorder.request(
+            client,
+            "GET /api/pois/nearby",
+            "GET",
+            "/api/pois/nearby",
+            params={
+                "lat": cluster["lat"],
+                "lng": cluster["lng"],
+                "radius_km": cluster["radius_km"],
+                "limit": 12,
+                "images_only": "true",
+                "line_user_id": line_user_id,
+            },
+        )
+        deck = response.json()["places"] if response else []
+        if not deck:
+            break
+        for card in deck:
+            if args.images and card.get("thumbnail_url"):
+                await recorder.request(client, "GET /api/image-cache/images", "GET", card["thumbnail_url"])
+            await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+            direction = "right" if rng.random() < args.like_rate else "left"
+            await recorder.request(
+                client,
+                "POST /api/users/{id}/swipes",
+                "POST",
+                f"{user_path}/swipes",
+                json={"place": card, "direction": direction, "source": "swipe"},
+            )
+            swipes += 1
+            if swipes >= args.swipes:
+                break
+
+    response = await recorder.request(
+        client,
+        "POST /api/users/{id}/routes/generate",
+        "POST",
+        f"{user_path}/routes/generate",
+        json={
+            "personality": rng.choice(PERSONALITIES),
+            "duration": rng.choice(DURATIONS),
+            "anchor": {"lat": cluster["lat"], "lng": cluster["lng"], "radius_km": cluster["radius_km"], "label": cluster["label"]},
+        },
+    )
+    if response:
+        provider = response.json()["provider"]
+        recorder.providers[provider] = recorder.providers.get(provider, 0) + 1
+    recorder.sessions.append(time.perf_counter() - started)
+
+
+async def sample_connections(client: httpx.AsyncClient, recorder: Recorder, database_url: str, done: asyncio.Event) -> None:
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url, pool_size=1, max_overflow=0)
+    pattern = re.compile(r"^db_pool_checked_out_connections (\S+)$", re.MULTILINE)
+
+    def postgres_connections() -> tuple[int, int]:
+        with engine.connect() as connection:
+            row = connection.execute(
+                text(
+                    "SELECT count(*), count(*) FILTER (WHERE state = 'active') FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                )
+            ).one()
+        return int(row[0]), int(row[1])
+
+    try:
+        while not done.is_set():
+            response = await client.get("/api/metrics")
+            match = pattern.search(response.text)
+            if match:
+                recorder.pool_samples.append(float(match.group(1)))
+            if engine.dialect.name == "postgresql":
+                recorder.postgres_samples.append(await asyncio.to_thread(postgres_connections))
+            await asyncio.sleep(0.25)
+    finally:
+        engine.dispose()
+
+
+async def run_load(base_url: str, database_url: str, args: argparse.Namespace) -> Recorder:
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.seconds
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.users + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+
+        async def virtual_user(index: int) -> None:
+            rng = random.Random(index)
+            line_user_id = f"load-{os.getpid()}-{index}"
+            returning = False
+            # Stagger arrivals so sessions do not all open at the same moment.
+            await asyncio.sleep(rng.random() * min(5.0, args.seconds / 4))
+            while time.perf_counter() < deadline:
+                await session(client, recorder, rng, line_user_id, returning, args)
+                returning = True
+
+        sampler = asyncio.create_task(sample_connections(client, recorder, database_url, done))
+        await asyncio.gather(*(virtual_user(index) for index in range(args.users)))
+        done.set()
+        await sampler
+    return recorder
+
+
+def report(recorder: Recorder, elapsed: float, pool_capacity: int) -> dict[str, object]:
+    total = sum(len(values) for values in recorder.latencies.values())
+    result: dict[str, object] = {
+        "elapsed_seconds": round(elapsed, 1),
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "sessions_completed": len(recorder.sessions),
+        "session_p50_seconds": round(statistics.median(recorder.sessions), 1) if recorder.sessions else None,
+        "route_providers": recorder.providers,
+        "endpoints": {
+            name: {
+                "requests": len(values),
+                "errors": recorder.errors.get(name, 0),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            }
+            for name, values in sorted(recorder.latencies.items())
+        },
+    }
+    if recorder.pool_samples:
+        result["db_pool"] = {
+            "capacity": pool_capacity,
+            "max_checked_out": int(max(recorder.pool_samples)),
+            "mean_checked_out": round(statistics.mean(recorder.pool_samples), 2),
+            "saturated_share": round(sum(value >= pool_capacity for value in recorder.pool_samples) / len(recorder.pool_samples), 3),
+        }
+    if recorder.postgres_samples:
+        result["postgres_connections"] = {
+            "max_open": max(total for total, _ in recorder.postgres_samples),
+            "max_active": max(active for _, active in recorder.postgres_samples),
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay LIFF swipe sessions against the full API.")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users.")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--swipes", type=int, default=30, help="Swipes per session before generating a route.")
+    parser.add_argument("--think-ms", type=float, default=400, help="Mean pause before each swipe.")
+    parser.add_argument("--like-rate", type=float, default=0.3)
+    parser.add_argument("--no-images", dest="images", action="store_false", help="Skip fetching card thumbnails.")
+    parser.add_argument("--scale", type=float, default=1, help=f"Catalogue size as a multiple of {BASE_PLACES:,} places.")
+    parser.add_argument("--openrouter-latency-ms", type=float, default=2500)
+    parser.add_argument("--openrouter-error-rate", type=float, default=0.05)
+    parser.add_argument("--object-latency-ms", type=float, default=30)
+    parser.add_argument("--object-kb", type=int, default=40)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        parser.error("set DATABASE_URL to a scratch database")
+
+    workdir = Path(tempfile.mkdtemp(prefix="long-session-load-"))
+    places_path, manifest_path = write_catalogue(workdir, int(BASE_PLACES * args.scale))
+    store_port, openrouter_port, api_port = free_port(), free_port(), free_port()
+    env = {
+        **os.environ,
+        "PLACES_JSON_PATH": str(places_path),
+        "IMAGE_CACHE_MANIFEST_PATH": str(manifest_path),
+        "IMAGE_PROXY_CACHE_DIR": str(workdir / "proxy"),
+        "MINIO_ENDPOINT": f"127.0.0.1:{store_port}",
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{openrouter_port}/api/v1",
+    }
+    subprocess.run([sys.executable, "migrations.py"], cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    stand_ins = [
+        multiprocessing.Process(
+            target=run_object_store, args=(store_port, args.object_kb * 1024, args.object_latency_ms / 1000), daemon=True
+        ),
+        multiprocessing.Process(
+            target=run_openrouter,
+            args=(openrouter_port, args.openrouter_latency_ms / 1000, args.openrouter_error_rate),
+            daemon=True,
+        ),
+    ]
+    for process in stand_ins:
+        process.start()
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(api_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{api_port}"
+    try:
+        while True:
+            try:
+                httpx.get(f"{base_url}/api/health", timeout=30).raise_for_status()
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        started = time.perf_counter()
+        recorder = asyncio.run(run_load(base_url, database_url, args))
+        elapsed = time.perf_counter() - started
+    finally:
+        api.terminate()
+        api.wait()
+        for process in stand_ins:
+            process.terminate()
+
+    pool_capacity = int(os.getenv("DATABASE_POOL_SIZE", "5")) + int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+    print(json.dumps(report(recorder, elapsed, pool_capacity), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def seed(engine, users: int, swipes: int, places: int) -> list[str]:
+    line_user_ids = [f"bench-swipes-{index}" for index in range(users)]
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                INSERT INTO places (place_id, name, lat, lng, image, snapshot, updated_at)
+                SELECT 'bench-' || n, 'Bench place ' || n, 13.0, 100.0, '',
+                       json_build_object('id', 'bench-' || n, 'name', 'Bench place ' || n, 'lat', 13.0, 'long', 100.0),
+                       now()
+                FROM generate_series(1, :places) AS n
+                ON CONFLICT (place_id) DO NOTHING
+                """
+            ),
+            {"places": places},
+        )
+        for line_user_id in line_user_ids:
+            user_id = connection.execute(
+                text(
+                    """
+                    INSERT INTO users (line_user_id, created_at, updated_at) VALUES (:line_user_id, now(), now())
+                    ON CONFLICT (line_user_id) DO UPDATE SET updated_at = now()
+                    RETURNING id
+                    """
+                ),
+                {"line_user_id": line_user_id},
+            ).scalar_one()
+            connection.execute(text("DELETE FROM swipes WHERE user_id = :user_id"), {"user_id": user_id})
+            connection.execute(text("DELETE FROM user_places WHERE user_id = :user_id"), {"user_id": user_id})
+            connection.execute(
+                text(
+                    """
+                    INSERT INTO swipes (user_id, place_id, direction, created_at)
+                    SELECT :user_id, 'bench-' || (1 + n % :places), CASE WHEN n % 3 = 0 THEN 'right' ELSE 'left' END,
+                           now() - make_interval(secs => n)
+                    FROM generate_series(1, :swipes) AS n
+                    """
+                ),
+                {"user_id": user_id, "swipes": swipes, "places": places},
+            )
+            connection.execute(
+                text(
+                    """
+                    INSERT INTO user_places (user_id, place_id, status, source, created_at, updated_at)
+                    SELECT :user_id, 'bench-' || n, 'liked', 'swipe', now(), now()
+                    FROM generate_series(1, :places) AS n
+                    """
+                ),
+                {"user_id": user_id, "places": places},
+            )
+        connection.execute(text("ANALYZE swipes"))
+        connection.execute(text("ANALYZE user_places"))
+    return line_user_ids
+
+
+def timed(callback, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        callback()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time swipe history and liked-place clearing for heavy users.")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--swipes", type=int, default=50_000, help="Swipes per user.")
+    parser.add_argument("--places", type=int, default=5_000, help="Liked places per user.")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    from fastapi.testclient import TestClient
+
+    import main as api
+    import migrations
+
+    migrations.migrate()
+    with TestClient(api.app) as client:
+        line_user_ids = seed(api.engine, args.users, args.swipes, args.places)
+        line_user_id = line_user_ids[0]
+        url = f"/api/users/{line_user_id}/swipes"
+
+        def first_page() -> None:
+            client.get(url, params={"limit": args.page_size}).raise_for_status()
+
+        def deep_page() -> None:
+            cursor = None
+            for _ in range(10):
+                params = {"limit": args.page_size, **({"since": cursor} if cursor else {})}
+                cursor = client.get(url, params=params).json()["next_cursor"]
+
+        def clear_liked() -> None:
+            client.delete(f"/api/users/{line_user_id}/liked-places").raise_for_status()
+
+        result = {
+            "users": args.users,
+            "swipes_per_user": args.swipes,
+            "liked_places_per_user": args.places,
+            "first_page_ms": timed(first_page, args.repeat),
+            "ten_pages_ms": timed(deep_page, args.repeat),
+            "clear_liked_places_ms": timed(clear_liked, args.repeat),
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
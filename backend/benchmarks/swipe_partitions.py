@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+USER_PAGE = """
+SELECT place_id, direction, created_at FROM swipes
+WHERE user_id = :user_id
+ORDER BY created_at DESC, id DESC
+LIMIT 200
+"""
+
+RECENT_TOP_PLACES = """
+SELECT place_id, count(*) FILTER (WHERE direction = 'right') AS likes
+FROM swipes
+WHERE created_at >= now() - interval '30 days'
+GROUP BY place_id
+ORDER BY likes DESC
+LIMIT 20
+"""
+
+
+def reset(engine, api, migrations) -> None:
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS swipe_rollups"))
+        connection.execute(text("DROP TABLE IF EXISTS swipes CASCADE"))
+    api.Base.metadata.create_all(bind=engine)
+    migrations.migrate()
+
+
+def seed(engine, users: int, places: int, months: int, swipes_per_month: int) -> list[int]:
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                """
+                INSERT INTO places (place_id, name, lat, lng, image, snapshot, updated_at)
+                SELECT 'bench-' || n, 'Bench place ' || n, 13.0, 100.0, '',
+                       json_build_object('id', 'bench-' || n, 'name', 'Bench place ' || n, 'lat', 13.0, 'long', 100.0),
+                       now()
+                FROM generate_series(1, :places) AS n
+                ON CONFLICT (place_id) DO NOTHING
+                """
+            ),
+            {"places": places},
+        )
+        user_ids = list(
+            connection.execute(
+                text(
+                    """
+                    INSERT INTO users (line_user_id, created_at, updated_at)
+                    SELECT 'bench-partitions-' || n, now(), now() FROM generate_series(1, :users) AS n
+                    ON CONFLICT (line_user_id) DO UPDATE SET updated_at = now()
+                    RETURNING id
+                    """
+                ),
+                {"users": users},
+            ).scalars()
+        )
+        total = months * swipes_per_month
+        connection.execute(
+            text(
+                """
+                INSERT INTO swipes (user_id, place_id, direction, created_at)
+                SELECT (:user_ids)[1 + n % cardinality(:user_ids)], 'bench-' || (1 + n % :places),
+                       CASE WHEN n % 3 = 0 THEN 'right' ELSE 'left' END,
+                       now() - make_interval(secs => n * (:months * 30 * 86400.0 / :total))
+                FROM generate_series(1, :total) AS n
+                """
+            ),
+            {"user_ids": user_ids, "places": places, "months": months, "total": total},
+        )
+        connection.execute(text("ANALYZE swipes"))
+    return user_ids
+
+
+def timed(engine, sql: str, params: dict[str, object], repeat: int) -> float:
+    samples = []
+    with engine.connect() as connection:
+        connection.execute(text(sql), params).all()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            connection.execute(text(sql), params).all()
+            samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def measure(engine, user_id: int, repeat: int) -> dict[str, float]:
+    with engine.connect() as connection:
+        raw_rows = connection.execute(text("SELECT count(*) FROM swipes")).scalar()
+    return {
+        "raw_rows": raw_rows,
+        "user_page_ms": timed(engine, USER_PAGE, {"user_id": user_id}, repeat),
+        "recent_top_places_ms": timed(engine, RECENT_TOP_PLACES, {}, repeat),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time swipe queries as history grows, before and after partitioning.")
+    parser.add_argument(
+        "--reset-swipes",
+        action="store_true",
+        help="Required: drops the swipes and swipe_rollups tables. Point DATABASE_URL at a scratch database.",
+    )
+    parser.add_argument("--months", default="6,24,48", help="Comma-separated history lengths to seed.")
+    parser.add_argument("--swipes-per-month", type=int, default=40_000)
+    parser.add_argument("--retention-months", type=int, default=12)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--places", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    if not args.reset_swipes:
+        parser.error("--reset-swipes is required")
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import db_maintenance
+    import main as api
+    import migrations
+
+    results = []
+    for months in [int(value) for value in args.months.split(",")]:
+        reset(api.engine, api, migrations)
+        user_ids = seed(api.engine, args.users, args.places, months, args.swipes_per_month)
+        unpartitioned = measure(api.engine, user_ids[0], args.repeat)
+        started = time.perf_counter()
+        maintenance = db_maintenance.run_once(retention_months=args.retention_months)
+        maintenance_seconds = round(time.perf_counter() - started, 2)
+        with api.engine.begin() as connection:
+            connection.execute(text("ANALYZE swipes"))
+        results.append(
+            {
+                "months": months,
+                "seeded_rows": months * args.swipes_per_month,
+                "unpartitioned": unpartitioned,
+                "partitioned": measure(api.engine, user_ids[0], args.repeat),
+                "maintenance_seconds": maintenance_seconds,
+                "rows_rolled_up": maintenance["rows_rolled_up"],
+            }
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
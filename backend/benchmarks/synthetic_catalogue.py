@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+
+BASE_PLACES = 5_000
+
+# (name, district, latitude, longitude, spread in degrees, weight)
+PROVINCES = (
+    ("กรุงเทพมหานคร", "พระนคร", 13.7563, 100.5018, 0.12, 14),
+    ("เชียงใหม่", "เมืองเชียงใหม่", 18.7883, 98.9853, 0.35, 9),
+    ("ภูเก็ต", "เมืองภูเก็ต", 7.8804, 98.3923, 0.10, 7),
+    ("ชลบุรี", "บางละมุง", 13.3611, 100.9847, 0.25, 7),
+    ("กระบี่", "อ่าวนาง", 8.0863, 98.9063, 0.25, 5),
+    ("สุราษฎร์ธานี", "เกาะสมุย", 9.1382, 99.3215, 0.45, 5),
+    ("ประจวบคีรีขันธ์", "หัวหิน", 11.8124, 99.7973, 0.40, 4),
+    ("พระนครศรีอยุธยา", "พระนครศรีอยุธยา", 14.3532, 100.5689, 0.12, 4),
+    ("กาญจนบุรี", "เมืองกาญจนบุรี", 14.0228, 99.5328, 0.45, 4),
+    ("เชียงราย", "เมืองเชียงราย", 19.9105, 99.8406, 0.40, 4),
+    ("ขอนแก่น", "เมืองขอนแก่น", 16.4419, 102.8360, 0.30, 3),
+    ("นครราชสีมา", "ปากช่อง", 14.9799, 102.0978, 0.45, 3),
+    ("ระยอง", "เมืองระยอง", 12.6814, 101.2816, 0.25, 3),
+    ("ตราด", "เกาะช้าง", 12.2428, 102.5175, 0.30, 2),
+    ("สงขลา", "หาดใหญ่", 7.1898, 100.5954, 0.30, 3),
+    ("อุดรธานี", "เมืองอุดรธานี", 17.4138, 102.7872, 0.30, 2),
+    ("น่าน", "เมืองน่าน", 18.7756, 100.7730, 0.40, 2),
+    ("เลย", "เชียงคาน", 17.4860, 101.7223, 0.40, 2),
+    ("อุบลราชธานี", "เมืองอุบลราชธานี", 15.2287, 104.8564, 0.40, 2),
+    ("พิษณุโลก", "เมืองพิษณุโลก", 16.8211, 100.2659, 0.30, 2),
+)
+
+# (category, name prefixes, tags)
+KINDS = (
+    ("attraction", ("วัด", "พระธาตุ", "ศาลเจ้า"), ("วัด", "ศาสนา", "ประวัติศาสตร์")),
+    ("attraction", ("หาด", "อ่าว", "เกาะ"), ("หาด", "ทะเล", "เกาะ")),
+    ("attraction", ("น้ำตก", "ดอย", "อุทยาน", "ถ้ำ"), ("ธรรมชาติ", "น้ำตก", "ภูเขา", "ผจญภัย")),
+    ("attraction", ("พิพิธภัณฑ์", "หอศิลป์", "อุทยานประวัติศาสตร์"), ("พิพิธภัณฑ์", "ศิลปะ", "เรียนรู้")),
+    ("attraction", ("สวน", "ไร่", "ฟาร์ม"), ("สวน", "ธรรมชาติ", "ครอบครัว")),
+    ("shopping", ("ตลาด", "ถนนคนเดิน", "ตลาดน้ำ"), ("ตลาด", "ช้อป", "กลางคืน")),
+    ("restaurant", ("ร้านอาหาร", "ครัว", "ข้าวมันไก่"), ("ร้านอาหาร", "อาหารไทย")),
+    ("restaurant", ("คาเฟ่", "บ้านกาแฟ", "ร้านขนม"), ("คาเฟ่", "กาแฟ", "ถ่ายรูป")),
+    ("accommodation", ("โรงแรม", "รีสอร์ท", "โฮมสเตย์"), ("ที่พัก", "ครอบครัว")),
+    ("activity", ("ล่องแก่ง", "ดำน้ำ", "ปีนผา"), ("กิจกรรม", "กีฬา", "ผจญภัย")),
+)
+
+SYLLABLES = (
+    "ศรี", "สุข", "ทอง", "พระ", "แก้ว", "บุญ", "ชัย", "มงคล", "สวรรค์", "นาง", "ใหญ่", "น้อย",
+    "เงิน", "ดาว", "ฟ้า", "ใส", "หลวง", "ราม", "เจดีย์", "บาง", "แสน", "มะพร้าว", "ลม", "คำ",
+)
+STATUSES = ("approved",) * 48 + ("pending", "rejected")
+
+
+def thai_name(rng: random.Random, prefixes: tuple[str, ...]) -> str:
+    return rng.choice(prefixes) + "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+
+
+def synthetic_place(rng: random.Random, index: int) -> dict:
+    province, district, lat, lng, spread, _ = rng.choices(PROVINCES, weights=[item[5] for item in PROVINCES])[0]
+    category, prefixes, tags = rng.choice(KINDS)
+    place_id = f"P{index:07d}"
+    name = thai_name(rng, prefixes)
+    pictures = [f"https://images.example.invalid/{place_id}/{picture}.jpg" for picture in range(rng.randint(0, 4))]
+    place = {
+        "placeId": place_id,
+        "name": name,
+        "slug": place_id.lower(),
+        "latitude": round(rng.gauss(lat, spread), 6),
+        "longitude": round(rng.gauss(lng, spread), 6),
+        "status": rng.choice(STATUSES),
+        "viewer": int(rng.paretovariate(1.2) * 40),
+        "introduction": f"{name} {' '.join(rng.sample(tags, min(2, len(tags))))} ใน{district} จังหวัด{province}",
+        "tags": rng.sample(tags, rng.randint(1, len(tags))),
+        "location": {
+            "province": {"name": province},
+            "district": {"name": district},
+            "address": f"{rng.randint(1, 999)} หมู่ {rng.randint(1, 12)} {district} {province}",
+        },
+        "category": {"name": category},
+        "sha": {
+            "name": name,
+            "type": {"name": category},
+            "thumbnailUrl": pictures[0] if pictures else "",
+            "detailPicture": pictures[1:],
+        },
+    }
+    # A few records the normalizer has to reject or repair, as in the scraped catalogue.
+    roll = rng.random()
+    if roll < 0.01:
+        place["latitude"] = ""
+    elif roll < 0.02:
+        place["longitude"] = None
+    elif roll < 0.03:
+        place["viewer"] = str(place["viewer"])
+    return place
+
+
+def manifest_entry(place_id: str, index: int, images: int) -> dict:
+    objects = [f"places/{place_id}/{index:08x}{image:04x}.webp" for image in range(images)]
+    return {
+        "status": "cached",
+        "objects": objects,
+        "variants": {
+            object_name: [
+                {"name": "thumb", "object": object_name.replace(".webp", "-thumb.webp"), "edge": 320, "format": "webp"},
+                {"name": "card", "object": object_name.replace(".webp", "-card.webp"), "edge": 800, "format": "webp"},
+                {"name": "full", "object": object_name, "edge": 1600, "format": "webp"},
+            ]
+            for object_name in objects
+        },
+        "versions": {object_name: f"{index:08x}{image:08x}" for image, object_name in enumerate(objects)},
+    }
+
+
+def write_catalogue(directory: Path, places: int, seed: int = 7, cached_ratio: float = 0.6) -> tuple[Path, Path]:
+    rng = random.Random(seed)
+    payload = [synthetic_place(rng, index) for index in range(places)]
+    manifest_places: dict[str, dict] = {}
+    for index, place in enumerate(payload):
+        pictures = [place["sha"]["thumbnailUrl"], *place["sha"]["detailPicture"]]
+        pictures = [picture for picture in pictures if picture]
+        if not pictures:
+            manifest_places[place["placeId"]] = {"status": "no_source"}
+        elif rng.random() < cached_ratio:
+            manifest_places[place["placeId"]] = manifest_entry(place["placeId"], index, len(pictures))
+        else:
+            manifest_places[place["placeId"]] = {"status": "failed"}
+    manifest = {"run_status": "finished", "source_total": places, "places": manifest_places}
+
+    directory.mkdir(parents=True, exist_ok=True)
+    places_path = directory / "places.json"
+    manifest_path = directory / "manifest.json"
+    places_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    return places_path, manifest_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic places.json and image manifest.")
+    parser.add_argument("output", type=Path, help="Directory for places.json and manifest.json.")
+    parser.add_argument("--scale", type=float, default=1, help=f"Multiple of {BASE_PLACES:,} places.")
+    parser.add_argument("--places", type=int, help="Exact number of places; overrides --scale.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cached-ratio", type=float, default=0.6, help="Share of places with cached images.")
+    args = parser.parse_args()
+
+    places = args.places or int(BASE_PLACES * args.scale)
+    places_path, manifest_path = write_catalogue(args.output, places, args.seed, args.cached_ratio)
+    print(json.dumps({"places": places, "places_path": str(places_path), "manifest_path": str(manifest_path)}))
+
+
+if __name__ == "__main__":
+    main()
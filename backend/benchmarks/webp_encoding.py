@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable
+
+from image_quality_stages import corpus
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def ssim(reference, candidate) -> float:
+    # Mean SSIM of luma over 8x8 blocks, built from Pillow float images so the benchmark needs no numpy.
+    from PIL import Image, ImageMath
+
+    x = reference.convert("L").convert("F")
+    y = candidate.convert("L").convert("F")
+    if y.size != x.size:
+        y = y.resize(x.size, Image.Resampling.BICUBIC)
+    products = {
+        "xx": ImageMath.lambda_eval(lambda args: args["x"] * args["x"], x=x),
+        "yy": ImageMath.lambda_eval(lambda args: args["y"] * args["y"], y=y),
+        "xy": ImageMath.lambda_eval(lambda args: args["x"] * args["y"], x=x, y=y),
+    }
+    means = {name: image.reduce(8) for name, image in {"x": x, "y": y, **products}.items()}
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def block_ssim(args: dict[str, Any]) -> Any:
+        mx, my = args["x"], args["y"]
+        covariance = args["xy"] - mx * my
+        variances = args["xx"] - mx * mx + args["yy"] - my * my
+        return ((2 * mx * my + c1) * (2 * covariance + c2)) / ((mx * mx + my * my + c1) * (variances + c2))
+
+    blocks = ImageMath.lambda_eval(block_ssim, **means)
+    return blocks.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+
+
+def previous_encode(worker) -> Callable[[bytes], list[tuple[str, int, str, int, bytes]]]:
+    # encode_variants before adaptive effort: full decode, LANCZOS from full resolution, method 6 for every variant.
+    from PIL import Image, ImageOps
+
+    def encode(content: bytes) -> list[tuple[str, int, str, int, bytes]]:
+        with Image.open(BytesIO(content)) as source:
+            image = ImageOps.exif_transpose(source).convert("RGB")
+        image.thumbnail((worker.MAX_EDGE, worker.MAX_EDGE), Image.Resampling.LANCZOS)
+        full_edge = max(image.size)
+        sized = [("full", full_edge, image)]
+        current = image
+        for name, edge in sorted(worker.IMAGE_VARIANTS, key=lambda item: item[1], reverse=True):
+            if edge >= full_edge:
+                continue
+            current = current.copy()
+            current.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            sized.append((name, max(current.size), current))
+        output = []
+        for name, edge, variant in sized:
+            buffer = BytesIO()
+            variant.save(buffer, format="WEBP", quality=worker.WEBP_QUALITY, method=6)
+            output.append((name, edge, "webp", 6, buffer.getvalue()))
+        return output
+
+    return encode
+
+
+def references(worker, content: bytes) -> dict[str, Any]:
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(content)) as source:
+        original = ImageOps.exif_transpose(source).convert("RGB")
+    sizes = {"full": worker.MAX_EDGE, **dict(worker.IMAGE_VARIANTS)}
+    resized = {}
+    for name, edge in sizes.items():
+        image = original.copy()
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=None)
+        resized[name] = image
+    return resized
+
+
+def measure(encode: Callable[[bytes], list], content: bytes, reference: dict[str, Any], repeat: int) -> dict[str, Any]:
+    from PIL import Image
+
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        variants = encode(content)
+        runs.append(time.perf_counter() - started)
+    scores = {name: round(ssim(reference[name], Image.open(BytesIO(encoded))), 4) for name, _, _, _, encoded in variants}
+    return {
+        "ms": round(min(runs) * 1000, 1),
+        "bytes": sum(len(encoded) for *_, encoded in variants),
+        "methods": {name: method for name, _, _, method, _ in variants},
+        "ssim": scores,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare WebP encode time, size and SSIM for the previous and adaptive encoding profiles.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import cache_place_images as worker
+
+    profiles = {
+        "previous": previous_encode(worker),
+        "full_effort": lambda content: worker.encode_variants(content, worker.WEBP_METHOD),
+        "backlog": lambda content: worker.encode_variants(content, worker.WEBP_FAST_METHOD),
+    }
+    fixtures = {name: content for name, content in corpus().items() if not name.startswith("blur_") and name != "small_200"}
+
+    rows = {}
+    for name, content in fixtures.items():
+        reference = references(worker, content)
+        rows[name] = {"kb": round(len(content) / 1024), **{label: measure(encode, content, reference, args.repeat) for label, encode in profiles.items()}}
+
+    totals = {
+        label: {
+            "ms": round(sum(row[label]["ms"] for row in rows.values()), 1),
+            "kb": round(sum(row[label]["bytes"] for row in rows.values()) / 1024, 1),
+            "mean_ssim": round(sum(sum(row[label]["ssim"].values()) / len(row[label]["ssim"]) for row in rows.values()) / len(rows), 4),
+            "min_ssim": min(min(row[label]["ssim"].values()) for row in rows.values()),
+        }
+        for label in profiles
+    }
+    print(
+        json.dumps(
+            {
+                "webp_quality": worker.WEBP_QUALITY,
+                "webp_method": worker.WEBP_METHOD,
+                "webp_fast_method": worker.WEBP_FAST_METHOD,
+                "fast_min_edge": worker.FAST_MIN_EDGE,
+                "images": rows,
+                "totals": totals,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
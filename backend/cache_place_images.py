@@ -1,29 +1,64 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
 import json
 import os
 import sys
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
 from typing import Any
 
-import httpx
 from minio.error import S3Error
 from PIL import Image, ImageOps
 
-from image_cache import MANIFEST_PATH, MINIO_BUCKET, image_candidates, load_manifest, minio_client
+from image_cache import (
+    IMAGE_VARIANTS,
+    MANIFEST_PATH,
+    MINIO_BUCKET,
+    load_manifest,
+    minio_client,
+)
+from image_demand import IMAGE_DEMAND_ENABLED, read_spool, remove_spool_files
+from image_fetch import SKIP_REASONS, FetchError, image_fetcher
 from image_quality import MAX_IMAGE_BYTES, check_image_bytes
+from perceptual_index import BKTree, hamming
+from place_catalogue import load_catalogue, source_fingerprint
 
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 PLACES_PATH = Path(os.getenv("PLACES_JSON_PATH", ROOT_DIR / "data" / "places.json"))
 MAX_IMAGES_PER_PLACE = int(os.getenv("IMAGE_CACHE_MAX_PER_PLACE", "3"))
 RETRY_HOURS = float(os.getenv("IMAGE_CACHE_RETRY_HOURS", "12"))
+DEFER_SECONDS = float(os.getenv("IMAGE_CACHE_DEFER_SECONDS", "900"))
+FETCH_WORKERS = int(os.getenv("IMAGE_CACHE_FETCH_WORKERS", "8"))
+DUPLICATE_DISTANCE = int(os.getenv("IMAGE_DUPLICATE_DISTANCE", "6"))
+SHARED_DUPLICATE_DISTANCE = int(os.getenv("IMAGE_SHARED_DUPLICATE_DISTANCE", "2"))
+POLL_SECONDS = float(os.getenv("IMAGE_CACHE_POLL_SECONDS", "60"))
+QUEUE_PATH = Path(os.getenv("IMAGE_CACHE_QUEUE_PATH") or MANIFEST_PATH.with_name("image_cache_queue.json"))
+DEMAND_POLL_SECONDS = float(os.getenv("IMAGE_DEMAND_POLL_SECONDS", "5"))
+DEMAND_HIT_WEIGHT = float(os.getenv("IMAGE_DEMAND_HIT_WEIGHT", "50"))
+DEMAND_HALF_LIFE_HOURS = float(os.getenv("IMAGE_DEMAND_HALF_LIFE_HOURS", "24"))
+DEMAND_RETRY_SECONDS = float(os.getenv("IMAGE_DEMAND_RETRY_SECONDS", "1800"))
+DEMAND_SAMPLES = 500
 WEBP_QUALITY = int(os.getenv("IMAGE_CACHE_WEBP_QUALITY", "82"))
+WEBP_METHOD = int(os.getenv("IMAGE_CACHE_WEBP_METHOD", "6"))
+WEBP_FAST_METHOD = int(os.getenv("IMAGE_CACHE_WEBP_FAST_METHOD", "2"))
+FAST_BACKLOG = int(os.getenv("IMAGE_CACHE_FAST_BACKLOG", "100"))
+FAST_MIN_EDGE = int(os.getenv("IMAGE_CACHE_FAST_MIN_EDGE", "480"))
 MAX_EDGE = int(os.getenv("IMAGE_CACHE_MAX_EDGE", "1600"))
+AVIF_QUALITY = int(os.getenv("IMAGE_CACHE_AVIF_QUALITY", "60"))
+AVIF_ENABLED = os.getenv("IMAGE_CACHE_AVIF", "false").lower() == "true"
+REENCODE_FETCH_WAIT_SECONDS = float(os.getenv("IMAGE_CACHE_REENCODE_FETCH_WAIT_SECONDS", "1"))
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
 
 
 def now_iso() -> str:
@@ -53,73 +88,458 @@ def object_exists(object_name: str) -> bool:
         raise
 
 
-def encode_webp(content: bytes) -> bytes:
+def avif_supported() -> bool:
+    return "AVIF" in Image.SAVE
+
+
+def output_formats() -> list[str]:
+    formats = ["webp"]
+    if AVIF_ENABLED and avif_supported():
+        formats.append("avif")
+    return formats
+
+
+def variant_spec() -> str:
+    sizes = ",".join(f"{name}:{edge}" for name, edge in IMAGE_VARIANTS)
+    return f"{sizes};full:{MAX_EDGE};{'+'.join(output_formats())}"
+
+
+def encode_image(image: Image.Image, image_format: str, method: int = WEBP_METHOD) -> bytes:
+    output = BytesIO()
+    if image_format == "avif":
+        image.save(output, format="AVIF", quality=AVIF_QUALITY)
+    else:
+        image.save(output, format="WEBP", quality=WEBP_QUALITY, method=method)
+    return output.getvalue()
+
+
+def batch_method(backlog: int) -> int:
+    return WEBP_FAST_METHOD if backlog >= FAST_BACKLOG else WEBP_METHOD
+
+
+def variant_method(edge: int, method: int) -> int:
+    # Small variants cost little at full effort and are the most-served bytes, so only large ones are encoded fast.
+    return method if edge >= FAST_MIN_EDGE else max(method, WEBP_METHOD)
+
+
+def decode_source(content: bytes, method: int) -> Image.Image:
     with Image.open(BytesIO(content)) as source:
-        image = ImageOps.exif_transpose(source).convert("RGB")
-        image.thumbnail((MAX_EDGE, MAX_EDGE), Image.Resampling.LANCZOS)
-        output = BytesIO()
-        image.save(output, format="WEBP", quality=WEBP_QUALITY, method=6)
-        return output.getvalue()
+        scale = MAX_EDGE / max(source.size)
+        if scale < 1:
+            # JPEGs decode at 1/2, 1/4 or 1/8 scale in the DCT. Full-effort encodes keep Pillow's 2x margin above the output
+            # size; fast encodes let the decoder go down to the output size itself.
+            margin = 1.0 if method < WEBP_METHOD else 2.0
+            source.draft("RGB", (max(1, round(source.width * scale * margin)), max(1, round(source.height * scale * margin))))
+        return ImageOps.exif_transpose(source).convert("RGB")
+
+
+def encode_variants(content: bytes, method: int = WEBP_METHOD) -> list[tuple[str, int, str, int, bytes]]:
+    image = decode_source(content, method)
+    image.thumbnail((MAX_EDGE, MAX_EDGE), Image.Resampling.LANCZOS)
+    full_edge = max(image.size)
+
+    sized: list[tuple[str, int, Image.Image]] = [("full", full_edge, image)]
+    current = image
+    for name, edge in sorted(IMAGE_VARIANTS, key=lambda item: item[1], reverse=True):
+        if edge >= full_edge:
+            continue
+        current = current.copy()
+        current.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        sized.append((name, max(current.size), current))
+
+    return [
+        (name, edge, image_format, variant_method(edge, method), encode_image(variant, image_format, variant_method(edge, method)))
+        for name, edge, variant in sized
+        for image_format in output_formats()
+    ]
 
 
-def due_for_retry(entry: dict[str, Any]) -> bool:
+def variant_object_name(object_name: str, name: str, image_format: str) -> str:
+    base = object_name.removesuffix(".webp")
+    suffix = "" if name == "full" else f"-{name}"
+    return f"{base}{suffix}.{image_format}"
+
+
+def content_version(variants: list[dict[str, Any]]) -> str:
+    digests = "\n".join(f"{variant['object']}:{variant['sha256']}" for variant in variants)
+    return hashlib.sha256(digests.encode("utf-8")).hexdigest()[:16]
+
+
+def checked_timestamp(entry: dict[str, Any]) -> float | None:
     checked_at = entry.get("checked_at")
     if not isinstance(checked_at, str):
-        return True
+        return None
     try:
-        elapsed = datetime.now(timezone.utc) - datetime.fromisoformat(checked_at)
-        return elapsed.total_seconds() >= RETRY_HOURS * 3600
+        return datetime.fromisoformat(checked_at).timestamp()
     except ValueError:
-        return True
+        return None
+
+
+def next_check_at(entry: dict[str, Any]) -> float:
+    checked = checked_timestamp(entry)
+    return 0.0 if checked is None else checked + RETRY_HOURS * 3600
+
+
+class WorkQueue:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.source: dict[str, Any] | None = None
+        self.variant_spec = ""
+        self.due: dict[str, float] = {}
+        self.fingerprints: dict[str, str] = {}
+        self.viewers: dict[str, int] = {}
+        self.hits: dict[str, tuple[float, float]] = {}
+        self.requested: dict[str, float] = {}
+        # Consecutive batches in which cache_place raised for a place, for its retry backoff.
+        self.failures: dict[str, int] = {}
+        self.reencode_due: dict[str, float] = {}
+        self.reencode_owners: dict[str, list[str]] = {}
+        self._heap: list[tuple[float, float, str]] = []
+        self._urgent: list[tuple[float, float, str]] = []
+        self._reencode_heap: list[tuple[float, str]] = []
+        # Queue files written before re-encoding was tracked here are seeded from the manifest once.
+        self.reencode_seeded = False
+
+    @classmethod
+    def load(cls, path: Path) -> WorkQueue:
+        queue = cls(path)
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return queue
+        if not isinstance(state, dict) or state.get("version") != 2:
+            return queue
+        queue.source = state.get("source")
+        queue.variant_spec = state.get("variant_spec", "")
+        queue.due = {place_id: float(due) for place_id, due in state.get("due", {}).items()}
+        queue.fingerprints = dict(state.get("fingerprints", {}))
+        queue.viewers = dict(state.get("viewers", {}))
+        queue.hits = {place_id: (float(value), float(at)) for place_id, (value, at) in state.get("hits", {}).items()}
+        queue.requested = {place_id: float(at) for place_id, at in state.get("requested", {}).items()}
+        queue.failures = {place_id: int(count) for place_id, count in state.get("failures", {}).items()}
+        queue.reencode_seeded = "reencode" in state
+        for object_name, (due, owners) in state.get("reencode", {}).items():
+            queue.reencode_owners[object_name] = list(owners)
+            queue.schedule_reencode(object_name, float(due))
+        now = time.time()
+        queue._heap = [(due, -queue.score(place_id, now), place_id) for place_id, due in queue.due.items()]
+        heapq.heapify(queue._heap)
+        queue._urgent = [(-queue.recent_hits(place_id, now), at, place_id) for place_id, at in queue.requested.items()]
+        heapq.heapify(queue._urgent)
+        return queue
+
+    def save(self) -> None:
+        state = {
+            "version": 2,
+            "source": self.source,
+            "variant_spec": self.variant_spec,
+            "due": self.due,
+            "fingerprints": self.fingerprints,
+            "viewers": self.viewers,
+            "hits": self.hits,
+            "requested": self.requested,
+            "failures": self.failures,
+            "reencode": {object_name: [due, self.reencode_owners.get(object_name, [])] for object_name, due in self.reencode_due.items()},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(state), encoding="utf-8")
+        temporary.replace(self.path)
+
+    def recent_hits(self, place_id: str, now: float) -> float:
+        value, at = self.hits.get(place_id, (0.0, now))
+        return value * 0.5 ** ((now - at) / (DEMAND_HALF_LIFE_HOURS * 3600))
 
+    def score(self, place_id: str, now: float) -> float:
+        return self.viewers.get(place_id, 0) + DEMAND_HIT_WEIGHT * self.recent_hits(place_id, now)
 
-def source_fingerprint(urls: list[str]) -> str:
-    return hashlib.sha256("\n".join(urls).encode("utf-8")).hexdigest()
+    def add_hits(self, place_id: str, hits: int, now: float) -> None:
+        if hits:
+            self.hits[place_id] = (self.recent_hits(place_id, now) + hits, now)
 
+    def request(self, place_id: str, requested_at: float, now: float) -> bool:
+        if place_id in self.requested:
+            return False
+        self.requested[place_id] = requested_at
+        heapq.heappush(self._urgent, (-self.recent_hits(place_id, now), requested_at, place_id))
+        return True
 
-def cache_place(place_id: str, urls: list[str], previous: dict[str, Any]) -> dict[str, Any]:
-    objects = [name for name in previous.get("objects", []) if isinstance(name, str) and object_exists(name)]
+    def schedule(self, place_id: str, due: float) -> None:
+        # Places due at the same moment, as after a catalogue change, run in order of viewers and recent hits.
+        self.due[place_id] = due
+        heapq.heappush(self._heap, (due, -self.score(place_id, time.time()), place_id))
+
+    def remove(self, place_id: str) -> None:
+        self.due.pop(place_id, None)
+        self.fingerprints.pop(place_id, None)
+        self.viewers.pop(place_id, None)
+        self.hits.pop(place_id, None)
+        self.requested.pop(place_id, None)
+        self.failures.pop(place_id, None)
+
+    def failed(self, place_id: str, now: float) -> float:
+        # A place that keeps raising backs off from DEFER_SECONDS, doubling up to RETRY_HOURS, instead of returning to the front.
+        count = self.failures[place_id] = self.failures.get(place_id, 0) + 1
+        delay = min(RETRY_HOURS * 3600, DEFER_SECONDS * 2 ** (count - 1))
+        self.schedule(place_id, now + delay)
+        return delay
+
+    def _discard_stale(self) -> None:
+        # Rescheduled and removed places leave old heap items behind; the due and requested maps are authoritative.
+        while self._heap and self.due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        while self._urgent and self._urgent[0][2] not in self.requested:
+            heapq.heappop(self._urgent)
+
+    def next_due(self) -> float | None:
+        self._discard_stale()
+        if self._urgent:
+            return self._urgent[0][1]
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> str | None:
+        self._discard_stale()
+        if self._urgent:
+            return heapq.heappop(self._urgent)[2]
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        place_id = heapq.heappop(self._heap)[2]
+        del self.due[place_id]
+        return place_id
+
+    def add_reencode(self, object_name: str, place_id: str, due: float) -> None:
+        owners = self.reencode_owners.setdefault(object_name, [])
+        if place_id not in owners:
+            owners.append(place_id)
+        if object_name not in self.reencode_due:
+            self.schedule_reencode(object_name, due)
+
+    def schedule_reencode(self, object_name: str, due: float) -> None:
+        self.reencode_due[object_name] = due
+        heapq.heappush(self._reencode_heap, (due, object_name))
+
+    def pop_reencode(self, now: float) -> tuple[str, list[str]] | None:
+        while self._reencode_heap:
+            due, object_name = self._reencode_heap[0]
+            if self.reencode_due.get(object_name) != due:
+                heapq.heappop(self._reencode_heap)
+                continue
+            if due > now:
+                return None
+            heapq.heappop(self._reencode_heap)
+            del self.reencode_due[object_name]
+            return object_name, self.reencode_owners.pop(object_name, [])
+        return None
+
+    def pending(self, now: float) -> int:
+        return sum(1 for due in self.due.values() if due <= now) + len(self.requested)
+
+
+def source_key(path: Path) -> dict[str, Any]:
+    stat = path.stat()
+    return {"path": str(path.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def sync_catalogue(queue: WorkQueue, manifest: dict[str, Any]) -> dict[str, list[str]] | None:
+    key = source_key(PLACES_PATH)
+    spec = variant_spec()
+    if queue.source == key and queue.variant_spec == spec:
+        return None
+
+    now = time.time()
+    urls: dict[str, list[str]] = {}
+    changed = 0
+    for entry in load_catalogue(PLACES_PATH):
+        place_id = entry["id"]
+        urls[place_id] = entry["image_urls"]
+        queue.viewers[place_id] = (entry["poi"] or {}).get("viewer") or 0
+        fingerprint = entry["image_fingerprint"]
+        if queue.variant_spec == spec and queue.fingerprints.get(place_id) == fingerprint and place_id in queue.due:
+            continue
+        previous = manifest["places"].get(place_id, {})
+        if previous.get("source_fingerprint") == fingerprint and previous.get("variant_spec") == spec:
+            due = next_check_at(previous)
+        else:
+            due = now
+            changed += 1
+        queue.fingerprints[place_id] = fingerprint
+        queue.schedule(place_id, due)
+    for place_id in set(queue.fingerprints) - set(urls):
+        queue.remove(place_id)
+
+    queue.source = key
+    queue.variant_spec = spec
+    queue.save()
+    print(f"Image cache queue synced with {len(urls)} source places; {changed} new or changed", flush=True)
+    return urls
+
+
+def wants_demand_fetch(previous: dict[str, Any], now: float) -> bool:
+    if previous.get("status") in {"cached", "no_source"}:
+        return False
+    checked = checked_timestamp(previous)
+    return checked is None or now - checked >= DEMAND_RETRY_SECONDS
+
+
+def ingest_demand(queue: WorkQueue, manifest: dict[str, Any]) -> int:
+    if not IMAGE_DEMAND_ENABLED:
+        return 0
+    now = time.time()
+    requested = 0
+    spooled, paths = read_spool()
+    for place_id, demand in spooled.items():
+        if place_id not in queue.fingerprints:
+            continue
+        queue.add_hits(place_id, demand["hits"], now)
+        if demand["missing"] and wants_demand_fetch(manifest["places"].get(place_id, {}), now):
+            requested += queue.request(place_id, demand["requested_at"], now)
+    if paths:
+        # Spool files are removed only after the queue holding their requests is on disk, so a crash in between loses nothing.
+        queue.save()
+        remove_spool_files(paths)
+    if requested:
+        print(f"Image cache demand: {requested} places requested by the API", flush=True)
+    return requested
+
+
+def record_demand_outcome(manifest: dict[str, Any], requested_at: float, cached: bool) -> None:
+    stats = manifest.setdefault("demand", {})
+    outcome = "served" if cached else "failed"
+    stats[outcome] = stats.get(outcome, 0) + 1
+    if cached:
+        samples = [*stats.get("seconds_to_cached", []), round(time.time() - requested_at, 1)]
+        stats["seconds_to_cached"] = samples[-DEMAND_SAMPLES:]
+
+
+@lru_cache(maxsize=1)
+def duplicate_index() -> BKTree:
+    # Every cached image by its 64-bit difference hash, so a stock photo seen at another place can reuse that place's objects.
+    index = BKTree()
+    spec = variant_spec()
+    for place_id, entry in load_manifest().get("places", {}).items():
+        if not isinstance(entry, dict) or entry.get("variant_spec") != spec:
+            continue
+        for object_name, value in entry.get("hashes", {}).items():
+            if object_name in entry.get("variants", {}):
+                index.add(
+                    int(value, 16),
+                    {
+                        "place_id": place_id,
+                        "object": object_name,
+                        "variants": entry["variants"][object_name],
+                        "version": entry.get("versions", {}).get(object_name),
+                    },
+                )
+    return index
+
+
+def shared_duplicate(place_id: str, fingerprint: int) -> dict[str, Any] | None:
+    for _, match in duplicate_index().search(fingerprint, SHARED_DUPLICATE_DISTANCE):
+        if match["place_id"] != place_id and object_exists(match["object"]):
+            return match
+    return None
+
+
+def store_variants(object_name: str, url: str, content: bytes, method: int) -> list[dict[str, Any]]:
+    stored: list[dict[str, Any]] = []
+    for name, edge, image_format, effort, encoded in encode_variants(content, method):
+        variant_name = variant_object_name(object_name, name, image_format)
+        minio_client().put_object(
+            MINIO_BUCKET,
+            variant_name,
+            BytesIO(encoded),
+            len(encoded),
+            content_type=f"image/{image_format}",
+            metadata={"source-url-sha256": hashlib.sha256(url.encode()).hexdigest()},
+        )
+        stored.append(
+            {
+                "name": name,
+                "object": variant_name,
+                "edge": edge,
+                "format": image_format,
+                "method": effort,
+                "bytes": len(encoded),
+                "sha256": hashlib.sha256(encoded).hexdigest(),
+            }
+        )
+    return stored
+
+
+def cache_place(place_id: str, urls: list[str], previous: dict[str, Any], method: int = WEBP_METHOD) -> dict[str, Any]:
+    spec = variant_spec()
+    previous_variants = previous.get("variants", {}) if previous.get("variant_spec") == spec else {}
+    objects = [
+        name
+        for name in previous.get("objects", [])
+        if isinstance(name, str) and name in previous_variants and object_exists(name)
+    ]
+    variants = {name: previous_variants[name] for name in objects}
+    previous_versions = previous.get("versions", {}) if isinstance(previous.get("versions"), dict) else {}
+    versions = {name: previous_versions[name] for name in objects if name in previous_versions}
+    previous_hashes = previous.get("hashes", {}) if isinstance(previous.get("hashes"), dict) else {}
+    hashes = {name: previous_hashes[name] for name in objects if name in previous_hashes}
     attempts = int(previous.get("attempts", 0)) + 1
     failures: list[dict[str, str]] = []
 
-    with httpx.Client(timeout=12, follow_redirects=True, headers={"User-Agent": "LONG image cache/1.0"}) as client:
-        for url in urls:
-            if len(objects) >= MAX_IMAGES_PER_PLACE:
-                break
-            digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:20]
-            object_name = f"places/{place_id}/{digest}.webp"
-            if object_name in objects or object_exists(object_name):
-                if object_name not in objects:
-                    objects.append(object_name)
+    for url in urls:
+        if len(objects) >= MAX_IMAGES_PER_PLACE:
+            break
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:20]
+        object_name = f"places/{place_id}/{digest}.webp"
+        if object_name in objects:
+            continue
+        try:
+            content = image_fetcher().fetch(url)
+            if len(content) > MAX_IMAGE_BYTES:
+                failures.append({"url": url, "reason": "too-large"})
+                continue
+            quality = check_image_bytes(content)
+            if not quality.usable:
+                failures.append({"url": url, "reason": quality.reason})
                 continue
-            try:
-                response = client.get(url)
-                response.raise_for_status()
-                content = response.content
-                if len(content) > MAX_IMAGE_BYTES:
-                    failures.append({"url": url, "reason": "too-large"})
+            fingerprint = quality.duplicate_hash
+            if fingerprint:
+                if any(hamming(fingerprint, int(value, 16)) <= DUPLICATE_DISTANCE for value in hashes.values()):
+                    failures.append({"url": url, "reason": "near-duplicate"})
                     continue
-                quality = check_image_bytes(content)
-                if not quality.usable:
-                    failures.append({"url": url, "reason": quality.reason})
+                shared = shared_duplicate(place_id, fingerprint)
+                if shared is not None and shared["object"] not in objects:
+                    objects.append(shared["object"])
+                    variants[shared["object"]] = shared["variants"]
+                    versions[shared["object"]] = shared["version"] or content_version(shared["variants"])
+                    hashes[shared["object"]] = f"{fingerprint:016x}"
                     continue
-                encoded = encode_webp(content)
-                minio_client().put_object(
-                    MINIO_BUCKET,
-                    object_name,
-                    BytesIO(encoded),
-                    len(encoded),
-                    content_type="image/webp",
-                    metadata={"source-url-sha256": hashlib.sha256(url.encode()).hexdigest()},
+            stored = store_variants(object_name, url, content, method)
+            objects.append(object_name)
+            variants[object_name] = stored
+            versions[object_name] = content_version(stored)
+            if fingerprint:
+                hashes[object_name] = f"{fingerprint:016x}"
+                duplicate_index().add(
+                    fingerprint,
+                    {"place_id": place_id, "object": object_name, "variants": stored, "version": versions[object_name]},
                 )
-                objects.append(object_name)
-            except (httpx.HTTPError, OSError, S3Error) as exc:
-                failures.append({"url": url, "reason": type(exc).__name__})
-
-    status = "cached" if objects else ("no_source" if not urls else "failed")
+        except FetchError as exc:
+            failures.append({"url": url, "reason": exc.reason})
+        except (OSError, S3Error) as exc:
+            failures.append({"url": url, "reason": type(exc).__name__})
+
+    if objects:
+        status = "cached"
+    elif not urls:
+        status = "no_source"
+    elif failures and all(failure["reason"] in SKIP_REASONS for failure in failures):
+        status = "deferred"
+    else:
+        status = "failed"
     return {
         "status": status,
         "objects": objects,
+        "variants": variants,
+        "versions": versions,
+        "hashes": hashes,
+        "variant_spec": spec,
         "source_urls": urls,
         "source_fingerprint": source_fingerprint(urls),
         "attempts": attempts,
@@ -128,56 +548,187 @@ def cache_place(place_id: str, urls: list[str], previous: dict[str, Any]) -> dic
     }
 
 
-def run_once() -> dict[str, Any]:
-    ensure_bucket()
-    payload = json.loads(PLACES_PATH.read_text(encoding="utf-8"))
-    if not isinstance(payload, list):
-        raise ValueError("places.json must contain a list")
+def fast_encoded(variants: list[dict[str, Any]]) -> bool:
+    return any(variant.get("format") == "webp" and variant.get("method", WEBP_METHOD) < WEBP_METHOD for variant in variants)
 
-    manifest = load_manifest()
-    manifest.setdefault("places", {})
-    manifest.update(
-        {
-            "run_status": "running",
-            "run_started_at": now_iso(),
-            "source_total": len(payload),
-            "updated_at": now_iso(),
-            "last_error": None,
-        }
-    )
-    write_manifest(manifest)
-    print(f"Image cache batch started for {len(payload)} source places", flush=True)
 
-    for index, raw in enumerate(payload, start=1):
-        if not isinstance(raw, dict):
+def reencode_object(manifest: dict[str, Any], object_name: str, owners: list[str]) -> str:
+    source = manifest["places"].get(object_name.split("/")[1], {})
+    digest = object_name.rsplit("/", 1)[-1].removesuffix(".webp")
+    url = next((url for url in source.get("source_urls", []) if hashlib.sha256(url.encode("utf-8")).hexdigest()[:20] == digest), None)
+    if url is None:
+        # The place no longer lists this image, so there is nothing to fetch it from again.
+        return "dropped"
+    try:
+        # Idle work must not hold up the next poll, so busy or limited hosts are skipped and failures are not retried here.
+        content = image_fetcher().fetch(url, wait_seconds=REENCODE_FETCH_WAIT_SECONDS, retries=0)
+        if len(content) > MAX_IMAGE_BYTES or not check_image_bytes(content).usable:
+            return "failed"
+        stored = store_variants(object_name, url, content, WEBP_METHOD)
+    except FetchError as exc:
+        return "deferred" if exc.reason in SKIP_REASONS else "failed"
+    except (OSError, S3Error) as exc:
+        print(f"Image cache re-encode of {object_name} failed: {exc}", flush=True)
+        return "failed"
+    version = content_version(stored)
+    for place_id in owners:
+        entry = manifest["places"][place_id]
+        entry["variants"][object_name] = stored
+        entry.setdefault("versions", {})[object_name] = version
+    fingerprint = source.get("hashes", {}).get(object_name)
+    if fingerprint:
+        for _, match in duplicate_index().search(int(fingerprint, 16), 0):
+            if match["object"] == object_name:
+                match.update(variants=stored, version=version)
+    return "reencoded"
+
+
+def seed_reencode(queue: WorkQueue, manifest: dict[str, Any]) -> None:
+    spec = variant_spec()
+    now = time.time()
+    for place_id, entry in manifest["places"].items():
+        if place_id not in queue.fingerprints or not isinstance(entry, dict) or entry.get("variant_spec") != spec:
             continue
-        place_id = str(raw.get("placeId") or raw.get("id") or "").strip()
-        if not place_id:
+        for object_name, variants in entry.get("variants", {}).items():
+            if fast_encoded(variants):
+                queue.add_reencode(object_name, place_id, now)
+    queue.reencode_seeded = True
+    queue.save()
+
+
+def reencode_idle(queue: WorkQueue, manifest: dict[str, Any], deadline: float) -> int:
+    # Objects encoded at WEBP_FAST_METHOD during a backlog are queued by run_once and re-encoded at full effort while nothing is due.
+    spec = variant_spec()
+    attempted = done = 0
+    while time.time() < deadline:
+        next_due = queue.next_due()
+        if next_due is not None and next_due <= time.time():
+            break
+        popped = queue.pop_reencode(time.time())
+        if popped is None:
+            break
+        object_name, owners = popped
+        # Owners may have been re-cached, re-encoded for a new variant spec or dropped from the catalogue since they were queued.
+        owners = [
+            place_id
+            for place_id in owners
+            if place_id in queue.fingerprints
+            and manifest["places"].get(place_id, {}).get("variant_spec") == spec
+            and fast_encoded(manifest["places"][place_id].get("variants", {}).get(object_name, []))
+        ]
+        if not owners:
             continue
-        urls = image_candidates(raw)
-        previous = manifest["places"].get(place_id, {})
-        sources_changed = previous.get("source_fingerprint") != source_fingerprint(urls)
-        if not sources_changed and not due_for_retry(previous):
+        attempted += 1
+        outcome = reencode_object(manifest, object_name, owners)
+        if outcome == "reencoded":
+            done += 1
             continue
-        manifest["places"][place_id] = cache_place(place_id, urls, previous)
-        if index % 25 == 0:
-            manifest["updated_at"] = now_iso()
-            write_manifest(manifest)
-        if index % 250 == 0:
-            print(f"Image cache progress: {index}/{len(payload)} places scanned", flush=True)
+        if outcome == "dropped":
+            continue
+        retry_seconds = DEFER_SECONDS if outcome == "deferred" else RETRY_HOURS * 3600
+        for place_id in owners:
+            queue.add_reencode(object_name, place_id, time.time() + retry_seconds)
+    if attempted:
+        reencode = manifest.setdefault("reencode", {"pending": 0, "done": 0})
+        reencode.update(pending=len(queue.reencode_due), done=reencode.get("done", 0) + done)
+        manifest["updated_at"] = now_iso()
+        write_manifest(manifest)
+        queue.save()
+        print(f"Image cache idle re-encode: {done}/{attempted} objects at method {WEBP_METHOD}, {len(queue.reencode_due)} queued", flush=True)
+    return done
+
+
+def poll_seconds() -> float:
+    return min(POLL_SECONDS, DEMAND_POLL_SECONDS) if IMAGE_DEMAND_ENABLED else POLL_SECONDS
+
+
+def run_once(queue: WorkQueue, urls: dict[str, list[str]]) -> dict[str, Any]:
+    manifest = load_manifest()
+    manifest.setdefault("places", {})
+    changed_urls = sync_catalogue(queue, manifest)
+    if changed_urls is not None:
+        urls.clear()
+        urls.update(changed_urls)
+        manifest["source_total"] = len(urls)
+    ingest_demand(queue, manifest)
+    if not queue.reencode_seeded:
+        seed_reencode(queue, manifest)
+
+    next_due = queue.next_due()
+    if next_due is None or next_due > time.time():
+        # The idle pass stops by the next poll, so catalogue changes and API demand are picked up as before.
+        reencode_idle(queue, manifest, time.time() + poll_seconds())
+        return manifest
+    pending = queue.pending(time.time())
+
+    ensure_bucket()
+    duplicate_index()
+    manifest.update({"run_status": "running", "run_started_at": now_iso(), "updated_at": now_iso(), "last_error": None})
+    write_manifest(manifest)
+    print(f"Image cache batch started for {pending} due places at WebP method {batch_method(pending)}", flush=True)
+
+    processed = 0
+    failed = 0
+    running: dict[Future, str] = {}
+    # Places are fetched in parallel; per-host limits in image_fetch keep one slow host from holding every worker.
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="image-cache") as pool:
+        while True:
+            while len(running) < FETCH_WORKERS and (place_id := queue.pop_due(time.time())) is not None:
+                if place_id not in urls:
+                    # After a restart with an unchanged catalogue, URLs are read from the snapshot on first use.
+                    urls.update((entry["id"], entry["image_urls"]) for entry in load_catalogue(PLACES_PATH))
+                previous = manifest["places"].get(place_id, {})
+                method = batch_method(pending - processed)
+                running[pool.submit(cache_place, place_id, urls.get(place_id, []), previous, method)] = place_id
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                place_id = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    delay = queue.failed(place_id, time.time())
+                    failed += 1
+                    manifest["last_error"] = f"{place_id}: {exc}"[:500]
+                    print(f"Image cache of {place_id} failed, retrying in {delay / 60:.0f} min: {exc}", flush=True)
+                    continue
+                queue.failures.pop(place_id, None)
+                manifest["places"][place_id] = result
+                for object_name, variants in result.get("variants", {}).items():
+                    if fast_encoded(variants):
+                        queue.add_reencode(object_name, place_id, time.time())
+                retry_seconds = DEFER_SECONDS if result["status"] == "deferred" else RETRY_HOURS * 3600
+                queue.schedule(place_id, time.time() + retry_seconds)
+                if place_id in queue.requested and result["status"] != "deferred":
+                    record_demand_outcome(manifest, queue.requested.pop(place_id), result["status"] == "cached")
+                processed += 1
+                if processed % 25 == 0:
+                    # Demand that arrives during a long batch jumps ahead of the remaining scheduled places.
+                    ingest_demand(queue, manifest)
+                    manifest["updated_at"] = now_iso()
+                    manifest.setdefault("demand", {}).update(pending=len(queue.requested))
+                    write_manifest(manifest)
+                    queue.save()
+                if processed % 250 == 0:
+                    print(f"Image cache progress: {processed}/{pending} due places", flush=True)
 
     manifest.update({"run_status": "complete", "run_finished_at": now_iso(), "updated_at": now_iso()})
+    manifest.setdefault("demand", {}).update(pending=len(queue.requested))
+    manifest.setdefault("reencode", {"pending": 0, "done": 0}).update(pending=len(queue.reencode_due))
     write_manifest(manifest)
-    print(f"Image cache batch completed for {len(manifest['places'])} tracked places", flush=True)
+    queue.save()
+    print(f"Image cache batch completed: {processed} places checked, {failed} failed, {len(manifest['places'])} tracked", flush=True)
     return manifest
 
 
 def main() -> None:
-    interval = int(os.getenv("IMAGE_CACHE_INTERVAL_SECONDS", "21600"))
     run_forever = "--watch" in sys.argv
+    queue = WorkQueue.load(QUEUE_PATH)
+    urls: dict[str, list[str]] = {}
     while True:
         try:
-            run_once()
+            run_once(queue, urls)
         except Exception as exc:
             print(f"Image cache batch failed: {exc}", flush=True)
             manifest = load_manifest()
@@ -192,7 +743,11 @@ def main() -> None:
             write_manifest(manifest)
         if not run_forever:
             return
-        time.sleep(interval)
+        # Wake for the next due place, after DEMAND_POLL_SECONDS to pick up API demand, or after POLL_SECONDS to notice catalogue changes.
+        next_due = queue.next_due()
+        poll = poll_seconds()
+        wait = poll if next_due is None else min(poll, next_due - time.time())
+        time.sleep(max(1.0, wait))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from main import SwipeRecord, database_schema_error, engine
+
+
+SWIPES_PARTITION_MONTHS_AHEAD = int(os.getenv("SWIPES_PARTITION_MONTHS_AHEAD", "3"))
+SWIPES_RETENTION_MONTHS = int(os.getenv("SWIPES_RETENTION_MONTHS", "12"))
+DB_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("DB_MAINTENANCE_INTERVAL_SECONDS", "86400"))
+
+DEFAULT_PARTITION = "swipes_default"
+
+ROLLUP_UPSERT = """
+INSERT INTO swipe_rollups (user_id, place_id, right_count, left_count, first_swiped_at, last_swiped_at)
+SELECT user_id,
+       place_id,
+       count(*) FILTER (WHERE direction = 'right'),
+       count(*) FILTER (WHERE direction = 'left'),
+       min(created_at),
+       max(created_at)
+FROM {source}
+GROUP BY user_id, place_id
+ON CONFLICT (user_id, place_id) DO UPDATE SET
+    right_count = swipe_rollups.right_count + excluded.right_count,
+    left_count = swipe_rollups.left_count + excluded.left_count,
+    first_swiped_at = least(swipe_rollups.first_swiped_at, excluded.first_swiped_at),
+    last_swiped_at = greatest(swipe_rollups.last_swiped_at, excluded.last_swiped_at)
+"""
+
+
+def month_start(value: date, offset: int = 0) -> date:
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"swipes_p{month:%Y%m}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    return bool(
+        connection.execute(
+            text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('swipes'))")
+        ).scalar()
+    )
+
+
+def monthly_partitions(connection: Connection) -> dict[date, str]:
+    rows = connection.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass('swipes')
+            """
+        )
+    ).scalars()
+    partitions: dict[date, str] = {}
+    for name in rows:
+        suffix = name.removeprefix("swipes_p")
+        if len(suffix) == 6 and suffix.isdigit():
+            partitions[date(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return partitions
+
+
+def create_partition(connection: Connection, month: date) -> str:
+    name = partition_name(month)
+    bounds = {"start": datetime.combine(month, datetime.min.time()), "end": datetime.combine(month_start(month, 1), datetime.min.time())}
+    # Attaching a range the default partition already holds rows for would fail, so move those rows first.
+    connection.execute(text(f"CREATE TABLE {name} (LIKE swipes INCLUDING DEFAULTS)"))
+    connection.execute(
+        text(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """
+        ),
+        bounds,
+    )
+    connection.execute(
+        text(f"ALTER TABLE swipes ATTACH PARTITION {name} FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')")
+    )
+    return name
+
+
+def ensure_partitions(connection: Connection, first_month: date, last_month: date) -> list[str]:
+    existing = monthly_partitions(connection)
+    created = []
+    month = first_month
+    while month <= last_month:
+        if month not in existing:
+            created.append(create_partition(connection, month))
+        month = month_start(month, 1)
+    return created
+
+
+def partition_swipes(connection: Connection, months_ahead: int) -> bool:
+    if is_partitioned(connection):
+        return False
+
+    connection.execute(text("LOCK TABLE swipes IN ACCESS EXCLUSIVE MODE"))
+    sequence = connection.execute(text("SELECT pg_get_serial_sequence('swipes', 'id')")).scalar()
+    connection.execute(text("ALTER TABLE swipes RENAME TO swipes_legacy"))
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    connection.execute(text("CREATE TABLE swipes (LIKE swipes_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"))
+    connection.execute(text("ALTER TABLE swipes ADD CONSTRAINT swipes_id_created_pkey PRIMARY KEY (id, created_at)"))
+    connection.execute(text("ALTER TABLE swipes ADD FOREIGN KEY (user_id) REFERENCES users (id)"))
+    connection.execute(text("ALTER TABLE swipes ADD FOREIGN KEY (place_id) REFERENCES places (place_id)"))
+    connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF swipes DEFAULT"))
+
+    first_swipe = connection.execute(text("SELECT min(created_at) FROM swipes_legacy")).scalar()
+    today = datetime.utcnow().date()
+    ensure_partitions(connection, month_start(first_swipe or today), month_start(today, months_ahead))
+    connection.execute(text("INSERT INTO swipes SELECT * FROM swipes_legacy"))
+    connection.execute(text("DROP TABLE swipes_legacy"))
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY swipes.id"))
+    for index in SwipeRecord.__table__.indexes:
+        index.create(connection)
+    connection.execute(text("ANALYZE swipes"))
+    return True
+
+
+def rollup_swipes(connection: Connection, retention_months: int) -> dict[str, int]:
+    cutoff = month_start(datetime.utcnow().date(), -retention_months)
+    result = {"partitions_dropped": 0, "rows_rolled_up": 0}
+
+    if is_partitioned(connection):
+        for month, name in sorted(monthly_partitions(connection).items()):
+            if month_start(month, 1) > cutoff:
+                break
+            result["rows_rolled_up"] += connection.execute(text(f"SELECT count(*) FROM {name}")).scalar() or 0
+            connection.execute(text(ROLLUP_UPSERT.format(source=name)))
+            connection.execute(text(f"DROP TABLE {name}"))
+            result["partitions_dropped"] += 1
+        source = DEFAULT_PARTITION
+    else:
+        source = "swipes"
+
+    expired = connection.execute(
+        text(f"SELECT count(*) FROM {source} WHERE created_at < :cutoff"), {"cutoff": cutoff}
+    ).scalar()
+    if expired:
+        connection.execute(
+            text(
+                f"WITH expired AS (DELETE FROM {source} WHERE created_at < :cutoff RETURNING *) "
+                + ROLLUP_UPSERT.format(source="expired")
+            ),
+            {"cutoff": cutoff},
+        )
+        result["rows_rolled_up"] += expired
+    return result
+
+
+def run_once(
+    months_ahead: int = SWIPES_PARTITION_MONTHS_AHEAD,
+    retention_months: int = SWIPES_RETENTION_MONTHS,
+) -> dict[str, Any]:
+    schema_error = database_schema_error()
+    if schema_error:
+        raise RuntimeError(schema_error)
+    with engine.begin() as connection:
+        converted = partition_swipes(connection, months_ahead)
+    with engine.begin() as connection:
+        today = datetime.utcnow().date()
+        created = ensure_partitions(connection, month_start(today), month_start(today, months_ahead))
+    with engine.begin() as connection:
+        rollup = rollup_swipes(connection, retention_months)
+    result = {"converted": converted, "partitions_created": created, **rollup}
+    print(f"Swipe maintenance completed: {result}", flush=True)
+    return result
+
+
+def main() -> None:
+    if engine.dialect.name != "postgresql":
+        print(f"Swipe maintenance needs PostgreSQL, not {engine.dialect.name}", flush=True)
+        return
+    run_forever = "--watch" in sys.argv
+    while True:
+        try:
+            run_once()
+        except Exception as exc:
+            print(f"Swipe maintenance failed: {exc}", flush=True)
+        if not run_forever:
+            return
+        time.sleep(DB_MAINTENANCE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import gc
+import os
+import time
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT_SECONDS", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT_SECONDS", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE_SECONDS", "5"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+
+
+def when_ready(server) -> None:
+    if not preload_app:
+        return
+    import main
+
+    # Build the catalogue and manifest indexes once in the master so workers share the pages after fork.
+    # Freezing moves them out of the collector's generations, so collections in workers do not write to them.
+    started = time.perf_counter()
+    main.warm_caches()
+    gc.collect()
+    gc.freeze()
+    server.log.info("Warmed caches in %.2fs; %d objects frozen", time.perf_counter() - started, gc.get_freeze_count())
+
+
+def post_fork(server, worker) -> None:
+    if not preload_app:
+        return
+    import main
+
+    # Connections opened in the master must not be shared with workers.
+    main.engine.dispose(close=False)
+
+
+def post_worker_init(worker) -> None:
+    if preload_app:
+        return
+    import main
+
+    main.warm_caches()
@@ -3,10 +3,13 @@ from __future__ import annotations
 import json
 import os
 from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
 from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+import httpx
 from minio import Minio
 
 
@@ -14,26 +17,28 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 MANIFEST_PATH = Path(os.getenv("IMAGE_CACHE_MANIFEST_PATH", "/cache/image_manifest.json"))
 MINIO_BUCKET = os.getenv("MINIO_BUCKET", "place-images")
 IMAGE_PROXY_PREFIX = "/api/image-cache/images"
+OBJECT_FETCH_TIMEOUT_SECONDS = float(os.getenv("IMAGE_PROXY_FETCH_TIMEOUT_SECONDS", "15"))
+OBJECT_FETCH_MAX_CONNECTIONS = int(os.getenv("IMAGE_PROXY_MAX_CONNECTIONS", "32"))
 
 
-def image_candidates(raw: dict[str, Any]) -> list[str]:
-    sha = raw.get("sha") if isinstance(raw.get("sha"), dict) else {}
-    values = (
-        raw.get("thumbnailUrl"),
-        raw.get("thumbnail_url"),
-        raw.get("thumbnailURL"),
-        sha.get("thumbnailUrl"),
-        sha.get("thumbnail_url"),
-        sha.get("detailThumbnail"),
-        sha.get("detailPicture"),
-    )
-    urls: list[str] = []
-    for value in values:
-        if isinstance(value, str) and value.strip():
-            urls.append(value.strip())
-        elif isinstance(value, list):
-            urls.extend(item.strip() for item in value if isinstance(item, str) and item.strip())
-    return list(dict.fromkeys(urls))
+def _parse_variants(value: str) -> tuple[tuple[str, int], ...]:
+    variants: list[tuple[str, int]] = []
+    for item in value.split(","):
+        name, _, edge = item.strip().partition(":")
+        if name and name != "full" and edge.isdigit():
+            variants.append((name, int(edge)))
+    return tuple(sorted(variants, key=lambda variant: variant[1]))
+
+
+IMAGE_VARIANTS = _parse_variants(os.getenv("IMAGE_CACHE_VARIANTS", "thumb:320,card:800"))
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    content_type: str
+    etag: str = ""
+    last_modified: str = ""
+    size: int = 0
 
 
 @lru_cache(maxsize=2)
@@ -54,10 +59,99 @@ def load_manifest() -> dict[str, Any]:
     return _load_manifest_version(modified_ns)
 
 
-def cached_urls(place_id: str) -> list[str]:
+def _place_entry(place_id: str) -> dict[str, Any]:
     entry = load_manifest().get("places", {}).get(place_id, {})
-    objects = entry.get("objects", []) if isinstance(entry, dict) else []
-    return [f"{IMAGE_PROXY_PREFIX}/{object_name}" for object_name in objects if isinstance(object_name, str)]
+    return entry if isinstance(entry, dict) else {}
+
+
+def cached_objects(place_id: str) -> list[str]:
+    return [object_name for object_name in _place_entry(place_id).get("objects", []) if isinstance(object_name, str)]
+
+
+def _object_url(object_name: str, version: str | None, width: int | None = None) -> str:
+    params = [f"w={width}"] if width else []
+    if version:
+        params.append(f"v={version}")
+    query = f"?{'&'.join(params)}" if params else ""
+    return f"{IMAGE_PROXY_PREFIX}/{object_name}{query}"
+
+
+def cached_urls(place_id: str) -> list[str]:
+    entry = _place_entry(place_id)
+    versions = entry.get("versions", {}) if isinstance(entry.get("versions"), dict) else {}
+    return [
+        _object_url(object_name, versions.get(object_name))
+        for object_name in entry.get("objects", [])
+        if isinstance(object_name, str)
+    ]
+
+
+def cached_variant_urls(place_id: str) -> list[dict[str, str]]:
+    entry = _place_entry(place_id)
+    variants = entry.get("variants", {}) if isinstance(entry.get("variants"), dict) else {}
+    versions = entry.get("versions", {}) if isinstance(entry.get("versions"), dict) else {}
+    urls: list[dict[str, str]] = []
+    for object_name in entry.get("objects", []):
+        if not isinstance(object_name, str):
+            continue
+        version = versions.get(object_name)
+        sizes = {"full": _object_url(object_name, version)}
+        for variant in variants.get(object_name, []):
+            if variant.get("format") == "webp" and variant.get("name") != "full":
+                sizes[variant["name"]] = _object_url(object_name, version, int(variant["edge"]))
+        urls.append(sizes)
+    return urls
+
+
+@lru_cache(maxsize=2)
+def _object_index_version(modified_ns: int) -> dict[str, dict[str, Any]]:
+    index: dict[str, dict[str, Any]] = {}
+    for entry in _load_manifest_version(modified_ns).get("places", {}).values():
+        if not isinstance(entry, dict) or not isinstance(entry.get("variants"), dict):
+            continue
+        versions = entry.get("versions", {}) if isinstance(entry.get("versions"), dict) else {}
+        for object_name, variants in entry["variants"].items():
+            if isinstance(variants, list):
+                index[object_name] = {
+                    "version": versions.get(object_name),
+                    "variants": sorted(
+                        (variant for variant in variants if isinstance(variant, dict)),
+                        key=lambda variant: int(variant.get("edge", 0)),
+                    ),
+                }
+    return index
+
+
+def _object_index() -> dict[str, dict[str, Any]]:
+    try:
+        modified_ns = MANIFEST_PATH.stat().st_mtime_ns
+    except OSError:
+        modified_ns = 0
+    return _object_index_version(modified_ns)
+
+
+def warm_manifest() -> None:
+    _object_index()
+
+
+def image_variants(object_name: str) -> list[dict[str, Any]]:
+    return _object_index().get(object_name, {}).get("variants", [])
+
+
+def object_version(object_name: str) -> str | None:
+    return _object_index().get(object_name, {}).get("version")
+
+
+def select_variant(object_name: str, width: int | None = None, accept: str = "") -> str:
+    variants = image_variants(object_name)
+    wants_avif = "image/avif" in accept and any(variant.get("format") == "avif" for variant in variants)
+    candidates = [variant for variant in variants if variant.get("format") == ("avif" if wants_avif else "webp")]
+    if not candidates:
+        return object_name
+    for variant in candidates:
+        if width is not None and int(variant.get("edge", 0)) >= width:
+            return str(variant["object"])
+    return str(candidates[-1]["object"])
 
 
 def manifest_summary() -> dict[str, Any]:
@@ -77,6 +171,23 @@ def manifest_summary() -> dict[str, Any]:
         "tracked": len(places),
         "statuses": dict(statuses),
         "last_error": manifest.get("last_error"),
+        "demand": demand_summary(manifest),
+        "reencode": manifest.get("reencode", {"pending": 0, "done": 0}),
+    }
+
+
+def demand_summary(manifest: dict[str, Any]) -> dict[str, Any]:
+    demand = manifest.get("demand") if isinstance(manifest.get("demand"), dict) else {}
+    samples = sorted(demand.get("seconds_to_cached", []))
+    quantiles = {
+        f"p{int(quantile * 100)}_seconds_to_cached": samples[min(len(samples) - 1, int(quantile * len(samples)))] if samples else None
+        for quantile in (0.5, 0.95)
+    }
+    return {
+        "pending": demand.get("pending", 0),
+        "served": demand.get("served", 0),
+        "failed": demand.get("failed", 0),
+        **quantiles,
     }
 
 
@@ -87,4 +198,62 @@ def minio_client() -> Minio:
         access_key=os.getenv("MINIO_ACCESS_KEY", "longliff"),
         secret_key=os.getenv("MINIO_SECRET_KEY", "longliff-dev-secret"),
         secure=os.getenv("MINIO_SECURE", "false").lower() == "true",
+        region=os.getenv("MINIO_REGION", "us-east-1"),
+    )
+
+
+class ObjectNotFoundError(LookupError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def object_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(OBJECT_FETCH_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=OBJECT_FETCH_MAX_CONNECTIONS,
+            max_keepalive_connections=OBJECT_FETCH_MAX_CONNECTIONS,
+        ),
     )
+
+
+def _quoted_etag(etag: str | None) -> str:
+    if not etag:
+        return ""
+    return etag if etag.startswith(("\"", "W/")) else f'"{etag}"'
+
+
+def _object_info(response: httpx.Response, size: int) -> ObjectInfo:
+    return ObjectInfo(
+        content_type=response.headers.get("content-type", ""),
+        etag=_quoted_etag(response.headers.get("etag")),
+        last_modified=response.headers.get("last-modified", ""),
+        size=size,
+    )
+
+
+def _signed_object_url(method: str, object_name: str) -> str:
+    return minio_client().get_presigned_url(method, MINIO_BUCKET, object_name, expires=timedelta(minutes=5))
+
+
+def _raise_for_object_status(response: httpx.Response, object_name: str) -> None:
+    if response.status_code == 404:
+        raise ObjectNotFoundError(object_name)
+    response.raise_for_status()
+
+
+async def stat_object_info(object_name: str) -> ObjectInfo:
+    response = await object_http_client().head(_signed_object_url("HEAD", object_name))
+    _raise_for_object_status(response, object_name)
+    return _object_info(response, int(response.headers.get("content-length", "0")))
+
+
+async def download_object(object_name: str, target: Path) -> ObjectInfo:
+    async with object_http_client().stream("GET", _signed_object_url("GET", object_name)) as response:
+        _raise_for_object_status(response, object_name)
+        size = 0
+        with target.open("wb") as file:
+            async for chunk in response.aiter_bytes(64 * 1024):
+                file.write(chunk)
+                size += len(chunk)
+        return _object_info(response, size)
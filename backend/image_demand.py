@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from image_cache import MANIFEST_PATH
+
+
+IMAGE_DEMAND_ENABLED = os.getenv("IMAGE_DEMAND_ENABLED", "true").lower() == "true"
+SPOOL_DIR = Path(os.getenv("IMAGE_DEMAND_SPOOL_DIR") or MANIFEST_PATH.with_name("demand"))
+FLUSH_SECONDS = float(os.getenv("IMAGE_DEMAND_FLUSH_SECONDS", "5"))
+RESEND_SECONDS = float(os.getenv("IMAGE_DEMAND_RESEND_SECONDS", "900"))
+
+
+class DemandSpool:
+    def __init__(self, directory: Path, flush_seconds: float, resend_seconds: float) -> None:
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.resend_seconds = resend_seconds
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._missing_sent: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+
+    def record(self, hits: Iterable[str] = (), missing: Iterable[str] = ()) -> None:
+        now = time.time()
+        with self._lock:
+            for place_id in hits:
+                entry = self._pending.setdefault(place_id, {"hits": 0, "requested_at": now})
+                entry["hits"] += 1
+            for place_id in missing:
+                # Uncached places are reported again only after RESEND_SECONDS, so busy decks do not flood the spool.
+                if now - self._missing_sent.get(place_id, 0.0) < self.resend_seconds:
+                    continue
+                self._pending.setdefault(place_id, {"hits": 0, "requested_at": now})["missing"] = True
+            if self._pending and (self._flusher is None or not self._flusher.is_alive()):
+                self._flusher = threading.Thread(target=self._flush_forever, name="image-demand-spool", daemon=True)
+                self._flusher.start()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if len(self._missing_sent) > 100_000:
+                cutoff = time.time() - self.resend_seconds
+                self._missing_sent = {key: sent for key, sent in self._missing_sent.items() if sent >= cutoff}
+        if not pending:
+            return 0
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            name = f"{time.time_ns()}-{os.getpid()}.json"
+            temporary = self.directory / f".{name}.tmp"
+            temporary.write_text(json.dumps(pending), encoding="utf-8")
+            temporary.replace(self.directory / name)
+        except OSError as exc:
+            print(f"Image demand spool not written to {self.directory}: {exc}", flush=True)
+            # Unwritten demand goes back into the next flush, and its missing places are not marked as sent.
+            with self._lock:
+                for place_id, entry in pending.items():
+                    merge_demand(self._pending, place_id, entry)
+            return 0
+        sent = time.time()
+        with self._lock:
+            self._missing_sent.update((place_id, sent) for place_id, entry in pending.items() if entry.get("missing"))
+        return len(pending)
+
+    def _flush_forever(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+demand_spool = DemandSpool(SPOOL_DIR, FLUSH_SECONDS, RESEND_SECONDS)
+
+
+def record_demand(hits: Iterable[str] = (), missing: Iterable[str] = ()) -> None:
+    if IMAGE_DEMAND_ENABLED:
+        demand_spool.record(hits, missing)
+
+
+def merge_demand(demand: dict[str, dict[str, Any]], place_id: str, entry: dict[str, Any]) -> None:
+    merged = demand.setdefault(place_id, {"hits": 0, "requested_at": entry["requested_at"], "missing": False})
+    merged["hits"] += int(entry.get("hits", 0))
+    merged["requested_at"] = min(merged["requested_at"], entry["requested_at"])
+    merged["missing"] = merged["missing"] or bool(entry.get("missing"))
+
+
+def read_spool(directory: Path = SPOOL_DIR) -> tuple[dict[str, dict[str, Any]], list[Path]]:
+    # Files are left in place; the worker removes them with remove_spool_files once their requests are in its saved queue.
+    demand: dict[str, dict[str, Any]] = {}
+    read: list[Path] = []
+    try:
+        names = sorted(path for path in directory.iterdir() if path.suffix == ".json")
+    except OSError:
+        return demand, read
+    for path in names:
+        try:
+            batch = json.loads(path.read_text(encoding="utf-8"))
+        except OSError:
+            continue
+        except ValueError:
+            print(f"Image demand spool file {path} is unreadable and was removed", flush=True)
+            path.unlink(missing_ok=True)
+            continue
+        read.append(path)
+        for place_id, entry in batch.items():
+            merge_demand(demand, place_id, entry)
+    return demand, read
+
+
+def remove_spool_files(paths: Iterable[Path]) -> None:
+    for path in paths:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as exc:
+            print(f"Image demand spool file {path} not removed: {exc}", flush=True)
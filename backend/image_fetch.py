@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import httpx
+
+
+FETCH_TIMEOUT_SECONDS = float(os.getenv("IMAGE_CACHE_FETCH_TIMEOUT_SECONDS", "12"))
+FETCH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("IMAGE_FETCH_CONNECT_TIMEOUT_SECONDS", "5"))
+HOST_MAX_CONCURRENCY = int(os.getenv("IMAGE_FETCH_HOST_CONCURRENCY", "4"))
+HOST_RATE_PER_SECOND = float(os.getenv("IMAGE_FETCH_HOST_RATE", "4"))
+HOST_BURST = int(os.getenv("IMAGE_FETCH_HOST_BURST", "8"))
+HOST_WAIT_SECONDS = float(os.getenv("IMAGE_FETCH_HOST_WAIT_SECONDS", "30"))
+BREAKER_FAILURES = int(os.getenv("IMAGE_FETCH_BREAKER_FAILURES", "5"))
+BREAKER_BASE_SECONDS = float(os.getenv("IMAGE_FETCH_BREAKER_BASE_SECONDS", "30"))
+BREAKER_MAX_SECONDS = float(os.getenv("IMAGE_FETCH_BREAKER_MAX_SECONDS", "900"))
+RETRIES = int(os.getenv("IMAGE_FETCH_RETRIES", "2"))
+RETRY_BASE_SECONDS = float(os.getenv("IMAGE_FETCH_RETRY_BASE_SECONDS", "0.5"))
+RETRY_MAX_SECONDS = float(os.getenv("IMAGE_FETCH_RETRY_MAX_SECONDS", "8"))
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Reasons for URLs that were never attempted; places failing only for these are retried soon rather than in RETRY_HOURS.
+SKIP_REASONS = {"host-circuit-open", "host-rate-limited", "host-busy"}
+
+
+class FetchError(Exception):
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class FetchSkipped(FetchError):
+    # The URL was not requested because its host is tripped, rate limited or busy; reason is one of SKIP_REASONS.
+    pass
+
+
+class FetchFailed(FetchError):
+    # The URL was requested and failed: a timeout, a transport error or an HTTP error status.
+    pass
+
+
+def jittered(delay: float) -> float:
+    return random.uniform(delay / 2, delay)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        # Takes a token now and returns how long the caller must wait before using it.
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self) -> None:
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+
+class HostBreaker:
+    def __init__(self, threshold: int, base_seconds: float, max_seconds: float) -> None:
+        self.threshold = threshold
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.failures < self.threshold:
+                return True
+            now = time.monotonic()
+            if now < self.open_until:
+                return False
+            # One request probes the host after the cooldown; the rest keep skipping until it answers.
+            self.open_until = now + FETCH_TIMEOUT_SECONDS
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                delay = min(self.max_seconds, self.base_seconds * 2 ** (self.failures - self.threshold))
+                self.open_until = time.monotonic() + jittered(delay)
+
+
+class HostLimits:
+    def __init__(self) -> None:
+        self.bucket = TokenBucket(HOST_RATE_PER_SECOND, HOST_BURST)
+        self.slots = threading.BoundedSemaphore(HOST_MAX_CONCURRENCY)
+        self.breaker = HostBreaker(BREAKER_FAILURES, BREAKER_BASE_SECONDS, BREAKER_MAX_SECONDS)
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ImageFetcher:
+    def __init__(self) -> None:
+        self.client = httpx.Client(
+            timeout=httpx.Timeout(FETCH_TIMEOUT_SECONDS, connect=FETCH_CONNECT_TIMEOUT_SECONDS),
+            follow_redirects=True,
+            headers={"User-Agent": "LONG image cache/1.0"},
+        )
+        self._hosts: dict[str, HostLimits] = {}
+        self._lock = threading.Lock()
+
+    def host(self, url: str) -> HostLimits:
+        key = urlsplit(url).netloc.lower()
+        with self._lock:
+            limits = self._hosts.get(key)
+            if limits is None:
+                limits = self._hosts[key] = HostLimits()
+            return limits
+
+    def fetch(
+        self,
+        url: str,
+        wait_seconds: float = HOST_WAIT_SECONDS,
+        retries: int = RETRIES,
+        timeout: float | None = None,
+    ) -> bytes:
+        # Background callers pass a small wait_seconds and no retries, so a busy or limited host is skipped rather than waited on.
+        limits = self.host(url)
+        request_timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else httpx.Timeout(timeout)
+        reason = "unknown"
+        for attempt in range(retries + 1):
+            # A retry that cannot go ahead reports the failure that caused it; only a first attempt counts as skipped.
+            if not limits.breaker.allow():
+                raise FetchFailed(reason) if attempt else FetchSkipped("host-circuit-open")
+            wait = limits.bucket.reserve()
+            if wait > wait_seconds:
+                limits.bucket.refund()
+                raise FetchFailed(reason) if attempt else FetchSkipped("host-rate-limited")
+            time.sleep(wait)
+            if not limits.slots.acquire(timeout=wait_seconds):
+                limits.bucket.refund()
+                raise FetchFailed(reason) if attempt else FetchSkipped("host-busy")
+            retry_after = None
+            try:
+                response = self.client.get(url, timeout=request_timeout)
+            except httpx.TimeoutException:
+                reason = "timeout"
+            except httpx.HTTPError as exc:
+                reason = type(exc).__name__
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    # A 404 or 403 still means the host is answering, so it does not count against the breaker.
+                    limits.breaker.record(True)
+                    if response.is_error:
+                        raise FetchFailed(f"http-{response.status_code}")
+                    return response.content
+                reason = f"http-{response.status_code}"
+                retry_after = retry_after_seconds(response)
+            finally:
+                limits.slots.release()
+            limits.breaker.record(False)
+            if attempt < retries:
+                backoff = jittered(min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt))
+                time.sleep(min(RETRY_MAX_SECONDS, max(backoff, retry_after or 0.0)))
+        raise FetchFailed(reason)
+
+
+@lru_cache(maxsize=1)
+def image_fetcher() -> ImageFetcher:
+    return ImageFetcher()
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+from image_cache import ObjectInfo
+
+
+IMAGE_PROXY_CACHE_DIR = Path(os.getenv("IMAGE_PROXY_CACHE_DIR", "/tmp/long-image-proxy"))
+IMAGE_PROXY_CACHE_MAX_BYTES = int(os.getenv("IMAGE_PROXY_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+IMAGE_PROXY_MEMORY_MAX_BYTES = int(os.getenv("IMAGE_PROXY_MEMORY_MAX_BYTES", str(32 * 1024 * 1024)))
+IMAGE_PROXY_MEMORY_MAX_OBJECT_BYTES = int(os.getenv("IMAGE_PROXY_MEMORY_MAX_OBJECT_BYTES", str(256 * 1024)))
+IMAGE_PROXY_MEMORY_PROMOTE_HITS = int(os.getenv("IMAGE_PROXY_MEMORY_PROMOTE_HITS", "3"))
+IMAGE_PROXY_MAX_STREAMS = int(os.getenv("IMAGE_PROXY_MAX_STREAMS", "16"))
+
+CONTENT_TYPES = {".webp": "image/webp", ".avif": "image/avif", ".jpg": "image/jpeg", ".png": "image/png"}
+
+
+@dataclass
+class DiskEntry:
+    path: Path
+    size: int
+    info: ObjectInfo
+    hits: int = 0
+    pins: int = 0
+
+
+@dataclass(frozen=True)
+class CachedObject:
+    info: ObjectInfo
+    size: int
+    path: Path | None = None
+    content: bytes | None = None
+    tier: str = "disk"
+    entry: DiskEntry | None = None
+
+
+def content_type_for(object_name: str) -> str:
+    return CONTENT_TYPES.get(Path(object_name).suffix.lower(), "application/octet-stream")
+
+
+def cache_key(object_name: str, version: str | None) -> str:
+    # Re-encoding rewrites the same object names with a new manifest version, so the version is part of the key.
+    return f"{version}/{object_name}" if version else object_name
+
+
+class ImageProxyCache:
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        memory_max_bytes: int = IMAGE_PROXY_MEMORY_MAX_BYTES,
+        memory_max_object_bytes: int = IMAGE_PROXY_MEMORY_MAX_OBJECT_BYTES,
+        promote_hits: int = IMAGE_PROXY_MEMORY_PROMOTE_HITS,
+        max_streams: int = IMAGE_PROXY_MAX_STREAMS,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_max_object_bytes = memory_max_object_bytes
+        self.promote_hits = promote_hits
+        self._lock = threading.Lock()
+        self._disk: OrderedDict[str, DiskEntry] = OrderedDict()
+        self._disk_bytes = 0
+        self._memory: OrderedDict[str, tuple[ObjectInfo, bytes]] = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: dict[str, asyncio.Event] = {}
+        self._origin_slots = asyncio.Semaphore(max(1, max_streams))
+        self.max_streams = max(1, max_streams)
+        self._origin_active = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "origin_waits": 0,
+            "not_modified": 0,
+            "evictions": 0,
+            "fetch_errors": 0,
+            "bytes_served": 0,
+            "bytes_fetched": 0,
+        }
+        self._load_existing()
+
+    def _path_for(self, object_name: str) -> Path:
+        digest = hashlib.sha256(object_name.encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / f"{digest}{Path(object_name).suffix.lower()}"
+
+    def _load_existing(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        rows: list[list[str]] = []
+        try:
+            for line in (self.directory / "index.jsonl").read_text(encoding="utf-8").splitlines():
+                row = json.loads(line)
+                if isinstance(row, list) and len(row) == 4 and all(isinstance(value, str) for value in row):
+                    rows.append(row)
+        except (OSError, json.JSONDecodeError):
+            pass
+
+        for object_name, content_type, etag, last_modified in rows:
+            path = self._path_for(object_name)
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            info = ObjectInfo(content_type=content_type, etag=etag, last_modified=last_modified, size=size)
+            self._disk[object_name] = DiskEntry(path=path, size=size, info=info)
+            self._disk_bytes += size
+
+        known = {entry.path for entry in self._disk.values()}
+        for path in self.directory.glob("*/*"):
+            if path not in known:
+                path.unlink(missing_ok=True)
+        self._evict_disk()
+
+    def save_index(self) -> None:
+        with self._lock:
+            rows = [
+                [object_name, entry.info.content_type, entry.info.etag, entry.info.last_modified]
+                for object_name, entry in self._disk.items()
+            ]
+        temporary = self.directory / "index.tmp"
+        temporary.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+        temporary.replace(self.directory / "index.jsonl")
+
+    def _evict_disk(self) -> None:
+        # Pinned entries are still being served from their path, so eviction passes over them until they are released.
+        excess = self._disk_bytes - self.max_bytes
+        victims: list[str] = []
+        for object_name, entry in self._disk.items():
+            if excess <= 0 or len(self._disk) - len(victims) <= 1:
+                break
+            if entry.pins:
+                continue
+            victims.append(object_name)
+            excess -= entry.size
+        for object_name in victims:
+            entry = self._disk.pop(object_name)
+            self._disk_bytes -= entry.size
+            self._stats["evictions"] += 1
+            entry.path.unlink(missing_ok=True)
+
+    def _forget_disk(self, object_name: str, entry: DiskEntry) -> None:
+        if self._disk.get(object_name) is entry:
+            del self._disk[object_name]
+            self._disk_bytes -= entry.size
+
+    def release(self, cached: CachedObject) -> None:
+        if cached.entry is None:
+            return
+        with self._lock:
+            cached.entry.pins -= 1
+            if self._disk_bytes > self.max_bytes:
+                self._evict_disk()
+
+    def _remember_in_memory(self, key: str, info: ObjectInfo, content: bytes) -> None:
+        if key in self._memory:
+            return
+        self._memory[key] = (info, content)
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _lookup(self, key: str) -> CachedObject | None:
+        entry = self._disk.get(key)
+        memory_entry = self._memory.get(key)
+        if memory_entry is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            self._stats["bytes_served"] += len(memory_entry[1])
+            if entry is not None:
+                entry.pins += 1
+            return CachedObject(
+                info=memory_entry[0],
+                size=len(memory_entry[1]),
+                path=entry.path if entry is not None else None,
+                content=memory_entry[1],
+                tier="memory",
+                entry=entry,
+            )
+
+        if entry is None:
+            return None
+        # get() confirms the file and counts the hit off the event loop.
+        self._disk.move_to_end(key)
+        entry.hits += 1
+        entry.pins += 1
+        return CachedObject(info=entry.info, size=entry.size, path=entry.path, tier="disk", entry=entry)
+
+    def peek(self, object_name: str, version: str | None = None) -> ObjectInfo | None:
+        key = cache_key(object_name, version)
+        with self._lock:
+            memory_entry = self._memory.get(key)
+            if memory_entry is not None:
+                return memory_entry[0]
+            entry = self._disk.get(key)
+            return entry.info if entry is not None else None
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    async def get(
+        self,
+        object_name: str,
+        loader: Callable[[str, Path], Awaitable[ObjectInfo]],
+        version: str | None = None,
+    ) -> CachedObject:
+        # The returned object is pinned so its file outlives concurrent evictions; callers must pass it to release().
+        key = cache_key(object_name, version)
+        while True:
+            with self._lock:
+                cached = self._lookup(key)
+                if cached is None:
+                    waiter = self._inflight.get(key)
+                    if waiter is None:
+                        waiter = asyncio.Event()
+                        self._inflight[key] = waiter
+                        break
+                    self._stats["coalesced"] += 1
+            if cached is None:
+                await waiter.wait()
+                continue
+            if cached.tier == "memory":
+                return cached
+            # Disk checks and promotion reads run in the threadpool so a slow disk does not stall the event loop.
+            promote = cached.entry.hits >= self.promote_hits and cached.size <= self.memory_max_object_bytes
+            try:
+                content = await run_in_threadpool(cached.path.read_bytes) if promote else None
+                found = content is not None or await run_in_threadpool(cached.path.is_file)
+            except OSError:
+                content, found = None, False
+            with self._lock:
+                if found:
+                    self._stats["disk_hits"] += 1
+                    self._stats["bytes_served"] += cached.size
+                    if content is not None:
+                        self._remember_in_memory(key, cached.info, content)
+                    return cached
+                # Removed outside this cache; drop it so the lookup becomes a miss and the object is fetched again.
+                cached.entry.pins -= 1
+                self._forget_disk(key, cached.entry)
+
+        try:
+            entry = await self._download(key, object_name, loader)
+        except Exception:
+            with self._lock:
+                self._stats["fetch_errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.set()
+
+        with self._lock:
+            self._stats["misses"] += 1
+            self._stats["bytes_served"] += entry.size
+        return CachedObject(info=entry.info, size=entry.size, path=entry.path, tier="origin", entry=entry)
+
+    async def _download(self, key: str, object_name: str, loader: Callable[[str, Path], Awaitable[ObjectInfo]]) -> DiskEntry:
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{id(asyncio.current_task())}.part")
+        if self._origin_slots.locked():
+            with self._lock:
+                self._stats["origin_waits"] += 1
+        async with self._origin_slots:
+            self._origin_active += 1
+            try:
+                info = await loader(object_name, temporary)
+                temporary.replace(path)
+            finally:
+                self._origin_active -= 1
+                temporary.unlink(missing_ok=True)
+
+        size = path.stat().st_size
+        if not info.content_type:
+            info = ObjectInfo(content_type_for(object_name), info.etag, info.last_modified, size)
+        # Pinned for the caller that downloaded it; get() hands the pin over with the CachedObject.
+        entry = DiskEntry(path=path, size=size, info=info, pins=1)
+        with self._lock:
+            previous = self._disk.pop(key, None)
+            if previous is not None:
+                self._disk_bytes -= previous.size
+            self._disk[key] = entry
+            self._disk_bytes += entry.size
+            self._stats["bytes_fetched"] += entry.size
+            self._evict_disk()
+            save_index = self._stats["misses"] % 100 == 99
+        if save_index:
+            self.save_index()
+        return entry
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats: dict[str, Any] = dict(self._stats)
+            stats.update(
+                {
+                    "disk_objects": len(self._disk),
+                    "disk_bytes": self._disk_bytes,
+                    "disk_max_bytes": self.max_bytes,
+                    "memory_objects": len(self._memory),
+                    "memory_bytes": self._memory_bytes,
+                    "memory_max_bytes": self.memory_max_bytes,
+                    "origin_streams": self._origin_active,
+                    "origin_max_streams": self.max_streams,
+                }
+            )
+        requests = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / requests, 4) if requests else 0.0
+        return stats
+
+
+_slot_locks: list[IO[str]] = []
+
+
+def claim_cache_slot(directory: Path) -> Path:
+    # Server workers share IMAGE_PROXY_CACHE_DIR; each one holds a lock on its own slot for its lifetime,
+    # so one worker's evictions never delete files another worker is serving.
+    directory.mkdir(parents=True, exist_ok=True)
+    slot = 0
+    while True:
+        handle = (directory / f"slot-{slot}.lock").open("a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            slot += 1
+            continue
+        _slot_locks.append(handle)
+        return directory / f"slot-{slot}"
+
+
+@lru_cache(maxsize=1)
+def image_proxy_cache() -> ImageProxyCache:
+    return ImageProxyCache(claim_cache_slot(IMAGE_PROXY_CACHE_DIR), IMAGE_PROXY_CACHE_MAX_BYTES)
@@ -1,25 +1,55 @@
 from __future__ import annotations
 
+import hashlib
 import os
-from dataclasses import dataclass
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
 
-import httpx
-from PIL import Image, ImageOps, UnidentifiedImageError
+from PIL import Image, ImageMath, ImageOps, UnidentifiedImageError
+
+from image_cache import MANIFEST_PATH
+from image_fetch import FetchError, image_fetcher
+from perceptual_index import BKTree, hamming
 
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 SHA_REFERENCE_PATH = ROOT_DIR / "src" / "assets" / "sha-logo.png"
+PLACEHOLDER_DIR = Path(os.getenv("IMAGE_PLACEHOLDER_DIR") or ROOT_DIR / "data" / "placeholders")
+PLACEHOLDER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+PLACEHOLDER_PATHS = sorted(
+    path for path in (PLACEHOLDER_DIR.iterdir() if PLACEHOLDER_DIR.is_dir() else []) if path.suffix.lower() in PLACEHOLDER_SUFFIXES
+)
 
 IMAGE_FILTER_ENABLED = os.getenv("IMAGE_FILTER_ENABLED", "true").lower() != "false"
 REJECT_UNCHECKED_IMAGES = os.getenv("REJECT_UNCHECKED_IMAGES", "false").lower() == "true"
 SHA_MATCH_THRESHOLD = float(os.getenv("SHA_MATCH_THRESHOLD", "0.90"))
 MIN_IMAGE_EDGE = int(os.getenv("MIN_IMAGE_EDGE", "260"))
 MIN_SHARPNESS_SCORE = float(os.getenv("MIN_SHARPNESS_SCORE", "32"))
-IMAGE_FETCH_TIMEOUT_SECONDS = float(os.getenv("IMAGE_FETCH_TIMEOUT_SECONDS", "4"))
 MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(8 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+WORKING_EDGE = 512
+# Placeholder hashes are a 256-bit average hash followed by a 256-bit difference hash; this radius matches SHA_MATCH_THRESHOLD.
+PLACEHOLDER_DISTANCE = int((1 - SHA_MATCH_THRESHOLD) * 512)
+QUALITY_CACHE_PATH = Path(os.getenv("IMAGE_QUALITY_CACHE_PATH") or MANIFEST_PATH.with_name("image_quality.sqlite3"))
+QUALITY_CACHE_TTL_HOURS = float(os.getenv("IMAGE_QUALITY_CACHE_TTL_HOURS", "720"))
+QUALITY_ERROR_TTL_SECONDS = float(os.getenv("IMAGE_QUALITY_ERROR_TTL_SECONDS", "600"))
+QUALITY_CHECK_WORKERS = int(os.getenv("IMAGE_QUALITY_CHECK_WORKERS", "8"))
+# A check is a single short attempt, as before the shared fetcher; the worker's own downloads keep their longer timeout and retries.
+QUALITY_FETCH_TIMEOUT_SECONDS = float(os.getenv("IMAGE_FETCH_TIMEOUT_SECONDS", "4"))
+QUALITY_FETCH_WAIT_SECONDS = float(os.getenv("IMAGE_QUALITY_FETCH_WAIT_SECONDS", "1"))
+# Cached results are only reused while the thresholds that produced them are unchanged.
+PLACEHOLDER_SET = hashlib.sha256("\n".join(f"{path.name}:{path.stat().st_size}" for path in PLACEHOLDER_PATHS).encode()).hexdigest()[:12]
+# Bumped when cached rows gain a field, so rows written without it are checked again.
+QUALITY_SCHEMA = 2
+QUALITY_SETTINGS = (
+    f"{QUALITY_SCHEMA}:{SHA_MATCH_THRESHOLD}:{MIN_IMAGE_EDGE}:{MIN_SHARPNESS_SCORE}:{MAX_IMAGE_BYTES}:{MAX_IMAGE_PIXELS}:{WORKING_EDGE}:{PLACEHOLDER_SET}"
+)
 
 
 @dataclass(frozen=True)
@@ -30,6 +60,7 @@ class ImageQualityResult:
     sharpness: float = 0.0
     width: int = 0
     height: int = 0
+    duplicate_hash: int = 0
 
 
 def _normalized_rgb(image: Image.Image, size: tuple[int, int] | None = None) -> Image.Image:
@@ -45,78 +76,81 @@ def _normalized_rgb(image: Image.Image, size: tuple[int, int] | None = None) ->
     return image
 
 
-def _average_hash(image: Image.Image, size: int = 16) -> tuple[int, ...]:
-    gray = _normalized_rgb(image, (size, size)).convert("L")
-    pixels = list(gray.getdata())
+def _average_hash(image: Image.Image, size: int = 16) -> int:
+    pixels = _normalized_rgb(image, (size, size)).convert("L").tobytes()
     average = sum(pixels) / len(pixels)
-    return tuple(1 if pixel >= average else 0 for pixel in pixels)
+    return int("".join("1" if pixel >= average else "0" for pixel in pixels), 2)
 
 
-def _difference_hash(image: Image.Image, size: int = 16) -> tuple[int, ...]:
-    gray = _normalized_rgb(image, (size + 1, size)).convert("L")
-    bits: list[int] = []
-    for y in range(size):
-        row_offset = y * (size + 1)
-        for x in range(size):
-            bits.append(1 if gray.getpixel((x, y)) > gray.getpixel((x + 1, y)) else 0)
-    return tuple(bits)
+def _difference_hash(image: Image.Image, size: int = 16) -> int:
+    pixels = _normalized_rgb(image, (size + 1, size)).convert("L").tobytes()
+    bits = (
+        "1" if pixels[row + x] > pixels[row + x + 1] else "0"
+        for row in range(0, len(pixels), size + 1)
+        for x in range(size)
+    )
+    return int("".join(bits), 2)
 
 
-def _hash_similarity(left: tuple[int, ...], right: tuple[int, ...]) -> float:
-    if not left or len(left) != len(right):
-        return 0.0
-    matches = sum(1 for left_bit, right_bit in zip(left, right) if left_bit == right_bit)
-    return matches / len(left)
+def _placeholder_hash(image: Image.Image) -> int:
+    return _average_hash(image) << 256 | _difference_hash(image)
+
+
+def duplicate_hash(image: Image.Image) -> int:
+    # A 64-bit difference hash, small enough to keep for every cached image.
+    return _difference_hash(image, 8)
 
 
 def _laplacian_variance(image: Image.Image) -> float:
-    gray = _normalized_rgb(image).convert("L")
-    gray.thumbnail((512, 512), Image.Resampling.LANCZOS)
+    gray = image.convert("L")
     width, height = gray.size
     if width < 3 or height < 3:
         return 0.0
 
-    pixels = gray.load()
-    values: list[int] = []
-    for y in range(1, height - 1):
-        for x in range(1, width - 1):
-            center = int(pixels[x, y])
-            laplacian = (
-                int(pixels[x - 1, y])
-                + int(pixels[x + 1, y])
-                + int(pixels[x, y - 1])
-                + int(pixels[x, y + 1])
-                - (4 * center)
-            )
-            values.append(laplacian)
-
-    if not values:
-        return 0.0
-    mean = sum(values) / len(values)
-    return sum((value - mean) ** 2 for value in values) / len(values)
+    # The 4-neighbour Laplacian as float image arithmetic over shifted crops; box-resizing to one pixel gives the means.
+    pixels = gray.convert("F")
 
+    def shifted(dx: int, dy: int) -> Image.Image:
+        return pixels.crop((1 + dx, 1 + dy, width - 1 + dx, height - 1 + dy))
 
-@lru_cache(maxsize=1)
-def _sha_reference_hashes() -> tuple[tuple[int, ...], tuple[int, ...]] | None:
-    if not SHA_REFERENCE_PATH.exists():
-        return None
-    with Image.open(SHA_REFERENCE_PATH) as image:
-        return _average_hash(image), _difference_hash(image)
+    laplacian = ImageMath.lambda_eval(
+        lambda args: args["up"] + args["down"] + args["left"] + args["right"] - args["center"] * 4,
+        up=shifted(0, -1),
+        down=shifted(0, 1),
+        left=shifted(-1, 0),
+        right=shifted(1, 0),
+        center=shifted(0, 0),
+    )
+    squared = ImageMath.lambda_eval(lambda args: args["value"] * args["value"], value=laplacian)
+    mean = laplacian.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    mean_square = squared.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return max(0.0, mean_square - mean * mean)
 
 
-def _sha_similarity(image: Image.Image) -> float:
-    reference = _sha_reference_hashes()
-    if reference is None:
-        return 0.0
-    average_similarity = _hash_similarity(_average_hash(image), reference[0])
-    difference_similarity = _hash_similarity(_difference_hash(image), reference[1])
-    return (average_similarity + difference_similarity) / 2
+def _working_copy(image: Image.Image) -> Image.Image:
+    # JPEGs decode straight to 1/2, 1/4 or 1/8 scale in draft mode, never below WORKING_EDGE; other formats decode in full once.
+    image.draft("RGB", (WORKING_EDGE, WORKING_EDGE))
+    working = _normalized_rgb(image)
+    working.thumbnail((WORKING_EDGE, WORKING_EDGE), Image.Resampling.LANCZOS)
+    return working
 
 
-def _open_image_bytes(content: bytes) -> Image.Image:
-    image = Image.open(BytesIO(content))
-    image.load()
-    return image
+@lru_cache(maxsize=1)
+def _placeholder_index() -> tuple[BKTree, int | None]:
+    index = BKTree()
+    sha_hash = None
+    for path in [SHA_REFERENCE_PATH, *PLACEHOLDER_PATHS]:
+        try:
+            with Image.open(path) as image:
+                hashed = _placeholder_hash(_working_copy(image))
+        except OSError as exc:
+            if path != SHA_REFERENCE_PATH:
+                print(f"Placeholder image {path} skipped: {exc}", flush=True)
+            continue
+        index.add(hashed, path.name)
+        if path == SHA_REFERENCE_PATH:
+            sha_hash = hashed
+    return index, sha_hash
 
 
 def check_image_bytes(content: bytes) -> ImageQualityResult:
@@ -125,26 +159,40 @@ def check_image_bytes(content: bytes) -> ImageQualityResult:
     if len(content) > MAX_IMAGE_BYTES:
         return ImageQualityResult(usable=False, reason="too-large")
 
+    # Stage one reads only the header, so small or oversized images are rejected without decoding any pixels.
     try:
-        image = _open_image_bytes(content)
+        image = Image.open(BytesIO(content))
     except (UnidentifiedImageError, OSError):
         return ImageQualityResult(usable=False, reason="invalid-image")
 
     width, height = image.size
     if min(width, height) < MIN_IMAGE_EDGE:
         return ImageQualityResult(usable=False, reason="too-small", width=width, height=height)
+    if width * height > MAX_IMAGE_PIXELS:
+        return ImageQualityResult(usable=False, reason="too-large", width=width, height=height)
 
-    similarity = _sha_similarity(image)
-    if similarity >= SHA_MATCH_THRESHOLD:
+    # Stage two decodes one reduced working copy; the placeholder hashes and sharpness all read from it.
+    try:
+        with image:
+            working = _working_copy(image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return ImageQualityResult(usable=False, reason="invalid-image", width=width, height=height)
+
+    placeholder_hash = _placeholder_hash(working)
+    placeholders, sha_hash = _placeholder_index()
+    matches = placeholders.search(placeholder_hash, PLACEHOLDER_DISTANCE)
+    if matches:
+        distance, name = matches[0]
         return ImageQualityResult(
             usable=False,
-            reason="sha-placeholder",
-            sha_similarity=round(similarity, 4),
+            reason="sha-placeholder" if name == SHA_REFERENCE_PATH.name else "placeholder",
+            sha_similarity=round(1 - distance / 512, 4),
             width=width,
             height=height,
         )
+    similarity = 1 - hamming(placeholder_hash, sha_hash) / 512 if sha_hash is not None else 0.0
 
-    sharpness = _laplacian_variance(image)
+    sharpness = _laplacian_variance(working)
     if sharpness < MIN_SHARPNESS_SCORE:
         return ImageQualityResult(
             usable=False,
@@ -162,10 +210,111 @@ def check_image_bytes(content: bytes) -> ImageQualityResult:
         sharpness=round(sharpness, 2),
         width=width,
         height=height,
+        duplicate_hash=duplicate_hash(working),
     )
 
 
-@lru_cache(maxsize=4096)
+class QualityCache:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # WAL lets API workers and the cache worker read while one of them writes.
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS quality_results (
+                    url TEXT PRIMARY KEY,
+                    content_sha256 TEXT,
+                    settings TEXT NOT NULL,
+                    usable INTEGER NOT NULL,
+                    reason TEXT NOT NULL,
+                    sha_similarity REAL NOT NULL,
+                    sharpness REAL NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    duplicate_hash TEXT NOT NULL DEFAULT ''
+                )
+                """
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(quality_results)")}
+            if "duplicate_hash" not in columns:
+                connection.execute("ALTER TABLE quality_results ADD COLUMN duplicate_hash TEXT NOT NULL DEFAULT ''")
+            connection.execute("CREATE INDEX IF NOT EXISTS quality_results_content ON quality_results (content_sha256)")
+            self._connection = connection
+        return self._connection
+
+    def _query(self, sql: str, parameters: tuple) -> tuple | None:
+        try:
+            with self._lock:
+                return self._connect().execute(sql, parameters).fetchone()
+        except sqlite3.Error as exc:
+            print(f"Image quality cache unavailable at {self.path}: {exc}", flush=True)
+            return None
+
+    @staticmethod
+    def _result(row: tuple | None) -> ImageQualityResult | None:
+        if row is None:
+            return None
+        usable, reason, sha_similarity, sharpness, width, height, duplicate_hash = row
+        return ImageQualityResult(bool(usable), reason, sha_similarity, sharpness, width, height, int(duplicate_hash or "0", 16))
+
+    def by_url(self, url: str) -> ImageQualityResult | None:
+        return self._result(
+            self._query(
+                "SELECT usable, reason, sha_similarity, sharpness, width, height, duplicate_hash FROM quality_results "
+                "WHERE url = ? AND settings = ? AND expires_at > ?",
+                (url, QUALITY_SETTINGS, time.time()),
+            )
+        )
+
+    def by_content(self, content_sha256: str) -> ImageQualityResult | None:
+        return self._result(
+            self._query(
+                "SELECT usable, reason, sha_similarity, sharpness, width, height, duplicate_hash FROM quality_results "
+                "WHERE content_sha256 = ? AND settings = ? AND expires_at > ? LIMIT 1",
+                (content_sha256, QUALITY_SETTINGS, time.time()),
+            )
+        )
+
+    def store(self, url: str, content_sha256: str | None, result: ImageQualityResult) -> None:
+        ttl = QUALITY_CACHE_TTL_HOURS * 3600 if content_sha256 else QUALITY_ERROR_TTL_SECONDS
+        values = asdict(result)
+        self._query(
+            "INSERT OR REPLACE INTO quality_results "
+            "(url, content_sha256, settings, usable, reason, sha_similarity, sharpness, width, height, expires_at, duplicate_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                url,
+                content_sha256,
+                QUALITY_SETTINGS,
+                int(values["usable"]),
+                values["reason"],
+                values["sha_similarity"],
+                values["sharpness"],
+                values["width"],
+                values["height"],
+                time.time() + ttl,
+                f"{values['duplicate_hash']:016x}" if values["duplicate_hash"] else "",
+            ),
+        )
+
+
+_CONTENT_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+@lru_cache(maxsize=1)
+def quality_cache() -> QualityCache:
+    return QualityCache(QUALITY_CACHE_PATH)
+
+
 def check_image_url(url: str) -> ImageQualityResult:
     if not IMAGE_FILTER_ENABLED:
         return ImageQualityResult(usable=True, reason="disabled")
@@ -174,29 +323,33 @@ def check_image_url(url: str) -> ImageQualityResult:
     if not cleaned_url:
         return ImageQualityResult(usable=False, reason="empty")
 
+    cache = quality_cache()
+    cached = cache.by_url(cleaned_url)
+    if cached is not None:
+        return cached
+
     try:
-        with httpx.Client(
-            timeout=IMAGE_FETCH_TIMEOUT_SECONDS,
-            follow_redirects=True,
-            headers={"User-Agent": "LONG image quality filter/1.0"},
-        ) as client:
-            response = client.get(cleaned_url)
-            response.raise_for_status()
-            content = response.content
-    except httpx.HTTPError:
-        return ImageQualityResult(usable=not REJECT_UNCHECKED_IMAGES, reason="fetch-error")
+        content = image_fetcher().fetch(
+            cleaned_url, wait_seconds=QUALITY_FETCH_WAIT_SECONDS, retries=0, timeout=QUALITY_FETCH_TIMEOUT_SECONDS
+        )
+    except FetchError:
+        # Fetch errors expire after QUALITY_ERROR_TTL_SECONDS so a host that recovers is checked again.
+        result = ImageQualityResult(usable=not REJECT_UNCHECKED_IMAGES, reason="fetch-error")
+        cache.store(cleaned_url, None, result)
+        return result
 
-    return check_image_bytes(content)
+    # The same picture is often served under several URLs; identical bytes reuse the earlier verdict.
+    content_sha256 = hashlib.sha256(content).hexdigest()
+    with _CONTENT_LOCKS[int(content_sha256[:8], 16) % len(_CONTENT_LOCKS)]:
+        result = cache.by_content(content_sha256) or check_image_bytes(content)
+        cache.store(cleaned_url, content_sha256, result)
+    return result
 
 
 def usable_image_urls(urls: list[str]) -> list[str]:
-    usable: list[str] = []
-    seen: set[str] = set()
-    for url in urls:
-        cleaned_url = url.strip()
-        if not cleaned_url or cleaned_url in seen:
-            continue
-        seen.add(cleaned_url)
-        if check_image_url(cleaned_url).usable:
-            usable.append(cleaned_url)
-    return usable
+    cleaned = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+    if len(cleaned) <= 1:
+        return [url for url in cleaned if check_image_url(url).usable]
+    with ThreadPoolExecutor(max_workers=min(QUALITY_CHECK_WORKERS, len(cleaned))) as pool:
+        results = list(pool.map(check_image_url, cleaned))
+    return [url for url, result in zip(cleaned, results) if result.usable]
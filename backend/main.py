@@ -1,20 +1,27 @@
 from __future__ import annotations
 
+import asyncio
+import heapq
 import json
 import math
 import os
+import random
 import re
+import secrets
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Generator
+from typing import Any, AsyncGenerator, Callable, Generator
 
 import httpx
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from minio.error import S3Error
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import (
     JSON,
@@ -22,16 +29,59 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
     create_engine,
+    event,
+    func,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
 )
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
-
-from image_cache import MINIO_BUCKET, cached_urls, manifest_summary, minio_client
+from starlette.background import BackgroundTask
+
+from image_cache import (
+    IMAGE_PROXY_PREFIX,
+    ObjectInfo,
+    ObjectNotFoundError,
+    cached_objects,
+    cached_urls,
+    cached_variant_urls,
+    demand_summary,
+    download_object,
+    image_variants,
+    load_manifest,
+    manifest_summary,
+    object_http_client,
+    object_version,
+    select_variant,
+    stat_object_info,
+    warm_manifest,
+)
+from image_demand import record_demand
+from image_proxy_cache import image_proxy_cache
+from metrics import (
+    CONTENT_TYPE,
+    CallbackMetric,
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    record_db_query,
+    render_metrics,
+    timed,
+)
+from place_catalogue import load_catalogue, normalize_record
+from profiling import PROFILE_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS, ProfilingMiddleware, request_profiler
 
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -73,15 +123,156 @@ DATABASE_URL = os.getenv(
 )
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+SEEN_SET_TTL_SECONDS = float(os.getenv("SEEN_SET_TTL_SECONDS", "600"))
+SEEN_SET_MAX_USERS = int(os.getenv("SEEN_SET_MAX_USERS", "10000"))
+LIKED_CACHE_TTL_SECONDS = float(os.getenv("LIKED_CACHE_TTL_SECONDS", "30"))
+LIKED_CACHE_MAX_USERS = int(os.getenv("LIKED_CACHE_MAX_USERS", "2000"))
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_TIMEOUT_SECONDS = float(os.getenv("DATABASE_POOL_TIMEOUT_SECONDS", "30"))
+DATABASE_POOL_RECYCLE_SECONDS = int(os.getenv("DATABASE_POOL_RECYCLE_SECONDS", "1800"))
+DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "false").lower() == "true"
+DATABASE_KEEPALIVES_IDLE_SECONDS = int(os.getenv("DATABASE_KEEPALIVES_IDLE_SECONDS", "30"))
+DATABASE_PREPARE_THRESHOLD = int(os.getenv("DATABASE_PREPARE_THRESHOLD", "2"))
+DATABASE_PGBOUNCER = os.getenv("DATABASE_PGBOUNCER", "false").lower() == "true"
+DATABASE_RETRY_BASE_SECONDS = float(os.getenv("DATABASE_RETRY_BASE_SECONDS", "1"))
+DATABASE_RETRY_MAX_SECONDS = float(os.getenv("DATABASE_RETRY_MAX_SECONDS", "30"))
+DATABASE_BREAKER_FAILURES = int(os.getenv("DATABASE_BREAKER_FAILURES", "3"))
+SCHEMA_VERSION = 4
+
+
+def engine_options(database_url: str) -> dict[str, Any]:
+    url = make_url(database_url)
+    options: dict[str, Any] = {"pool_pre_ping": DATABASE_POOL_PRE_PING}
+    if url.get_backend_name() != "postgresql":
+        return options
+
+    # Dead connections are caught by TCP keepalives and recycling instead of a ping per checkout;
+    # a disconnect error still invalidates the pool.
+    options.update(
+        pool_size=DATABASE_POOL_SIZE,
+        max_overflow=DATABASE_MAX_OVERFLOW,
+        pool_timeout=DATABASE_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DATABASE_POOL_RECYCLE_SECONDS,
+        pool_use_lifo=True,
+    )
+    connect_args: dict[str, Any] = {
+        "keepalives": 1,
+        "keepalives_idle": DATABASE_KEEPALIVES_IDLE_SECONDS,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    }
+    if url.get_driver_name() == "psycopg":
+        # PgBouncer in transaction mode cannot keep server-side prepared statements per client.
+        connect_args["prepare_threshold"] = None if DATABASE_PGBOUNCER else DATABASE_PREPARE_THRESHOLD
+    options["connect_args"] = connect_args
+    return options
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+event.listen(engine, "after_cursor_execute", record_db_query)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
+class TTLCache:
+    # Shared by threadpool endpoints, so every access holds the lock; the least recently used entry is evicted first.
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any | None:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            if cached[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def set(self, key: Any, value: Any) -> Any:
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        return value
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class CircuitBreaker:
+    def __init__(self, base_seconds: float, max_seconds: float, threshold: int) -> None:
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.threshold = max(1, threshold)
+        self.ready = False
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_error = "Database not checked yet"
+        self._probe = threading.Lock()
+        self._lock = threading.Lock()
+
+    def record(self, error: str | None) -> None:
+        with self._lock:
+            if not error:
+                self.ready = True
+                self.failures = 0
+                return
+            self.failures += 1
+            self.last_error = error
+            if self.ready and self.failures < self.threshold:
+                # While the database is up, the breaker opens only after `threshold` consecutive request failures.
+                return
+            self.ready = False
+            delay = min(self.max_seconds, self.base_seconds * 2 ** max(0, self.failures - self.threshold))
+            self.retry_at = time.monotonic() + random.uniform(delay / 2, delay)
+
+    def check(self, probe: Callable[[], str | None]) -> None:
+        if self.ready:
+            return
+        # One caller probes once the backoff expires; everyone else fails fast until it succeeds.
+        if time.monotonic() >= self.retry_at and self._probe.acquire(blocking=False):
+            try:
+                self.record(probe())
+            finally:
+                self._probe.release()
+            if self.ready:
+                return
+        retry_after = max(1, math.ceil(self.retry_at - time.monotonic()))
+        raise HTTPException(status_code=503, detail=self.last_error, headers={"Retry-After": str(retry_after)})
+
+
+_user_cache = TTLCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
+_seen_sets = TTLCache(SEEN_SET_TTL_SECONDS, SEEN_SET_MAX_USERS)
+_liked_cache = TTLCache(LIKED_CACHE_TTL_SECONDS, LIKED_CACHE_MAX_USERS)
+
+
 class Base(DeclarativeBase):
     pass
 
 
+class SchemaMigrationRecord(Base):
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255))
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class UserRecord(Base):
     __tablename__ = "users"
 
@@ -89,6 +280,8 @@ class UserRecord(Base):
     line_user_id: Mapped[str] = mapped_column(String(255), unique=True, index=True)
     display_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     picture_url: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Bumped by every write to the user's swipes or places, so each worker can tell when its cached sets are stale.
+    places_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -111,7 +304,16 @@ class PlaceRecord(Base):
 
 class UserPlaceRecord(Base):
     __tablename__ = "user_places"
-    __table_args__ = (UniqueConstraint("user_id", "place_id", name="uq_user_places_user_place"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "place_id", name="uq_user_places_user_place"),
+        Index(
+            "ix_user_places_user_status_updated",
+            "user_id",
+            "status",
+            "updated_at",
+            postgresql_include=["place_id"],
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -124,6 +326,7 @@ class UserPlaceRecord(Base):
 
 class SwipeRecord(Base):
     __tablename__ = "swipes"
+    __table_args__ = (Index("ix_swipes_user_created", "user_id", text("created_at DESC"), text("id DESC")),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -132,6 +335,17 @@ class SwipeRecord(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
+class SwipeRollupRecord(Base):
+    __tablename__ = "swipe_rollups"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    place_id: Mapped[str] = mapped_column(String(64), ForeignKey("places.place_id"), primary_key=True)
+    right_count: Mapped[int] = mapped_column(Integer, default=0)
+    left_count: Mapped[int] = mapped_column(Integer, default=0)
+    first_swiped_at: Mapped[datetime] = mapped_column(DateTime)
+    last_swiped_at: Mapped[datetime] = mapped_column(DateTime)
+
+
 class DiscoverySessionRecord(Base):
     __tablename__ = "discovery_sessions"
 
@@ -174,29 +388,124 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if PROFILE_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+CATALOGUE_SCANS = Counter("catalogue_scans_total", "Full passes over the place catalogue.", ("endpoint",))
+MANIFEST_LOOKUPS = Counter("manifest_lookups_total", "Places whose cached images were looked up in the manifest.")
+OPENROUTER_DURATION = Histogram(
+    "openrouter_request_duration_seconds",
+    "OpenRouter route generation calls.",
+    ("outcome",),
+)
+ROUTE_GENERATIONS = Counter("route_generations_total", "Generated routes by planner.", ("provider",))
+CallbackMetric(
+    "image_proxy_requests_total",
+    "Image proxy requests by cache result.",
+    "counter",
+    lambda: {
+        (result,): image_proxy_cache().stats()[key]
+        for result, key in (
+            ("memory_hit", "memory_hits"),
+            ("disk_hit", "disk_hits"),
+            ("miss", "misses"),
+            ("coalesced", "coalesced"),
+            ("not_modified", "not_modified"),
+            ("fetch_error", "fetch_errors"),
+        )
+    },
+    ("result",),
+)
+CallbackMetric(
+    "image_proxy_bytes_total",
+    "Image bytes served to clients and fetched from MinIO.",
+    "counter",
+    lambda: {
+        ("served",): image_proxy_cache().stats()["bytes_served"],
+        ("fetched",): image_proxy_cache().stats()["bytes_fetched"],
+    },
+    ("direction",),
+)
+CallbackMetric(
+    "image_demand_seconds_to_cached",
+    "Seconds from the first API request for an uncached place to its cached image, over recent requests.",
+    "gauge",
+    lambda: {
+        (quantile,): value
+        for quantile, key in (("0.5", "p50_seconds_to_cached"), ("0.95", "p95_seconds_to_cached"))
+        if (value := demand_summary(load_manifest())[key]) is not None
+    },
+    ("quantile",),
+)
+CallbackMetric(
+    "db_pool_checked_out_connections",
+    "Database connections currently in use.",
+    "gauge",
+    lambda: {(): engine.pool.checkedout()} if hasattr(engine.pool, "checkedout") else {},
+)
 
 
-@app.on_event("startup")
-def startup() -> None:
+_database = CircuitBreaker(DATABASE_RETRY_BASE_SECONDS, DATABASE_RETRY_MAX_SECONDS, DATABASE_BREAKER_FAILURES)
+
+
+def database_unavailable(exc: SQLAlchemyError) -> bool:
+    # Connection and pool errors say the database is unreachable; constraint and query errors do not.
+    if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, (OperationalError, InterfaceError, PoolTimeoutError))
+
+
+def record_database_error(exc: SQLAlchemyError) -> None:
+    if database_unavailable(exc):
+        _database.record(f"Database unavailable: {exc}")
+
+
+def current_schema_version(connection: Any) -> int:
+    if not engine.dialect.has_table(connection, SchemaMigrationRecord.__tablename__):
+        return 0
+    return connection.execute(select(func.max(SchemaMigrationRecord.version))).scalar() or 0
+
+
+def database_schema_error() -> str | None:
     try:
-        Base.metadata.create_all(bind=engine)
-        app.state.database_ready = True
+        with engine.connect() as connection:
+            version = current_schema_version(connection)
     except SQLAlchemyError as exc:
-        app.state.database_ready = False
-        print(f"Database unavailable: {exc}")
+        return f"Database unavailable: {exc}"
+    if version < SCHEMA_VERSION:
+        return f"Database schema is at version {version}, expected {SCHEMA_VERSION}; run python migrations.py"
+    return None
 
 
-def get_db() -> Generator[Session, None, None]:
-    if not getattr(app.state, "database_ready", False):
-        try:
-            Base.metadata.create_all(bind=engine)
-            app.state.database_ready = True
-        except SQLAlchemyError as exc:
-            raise HTTPException(status_code=503, detail=f"Database unavailable: {exc}") from exc
+def ensure_database_ready() -> None:
+    _database.check(database_schema_error)
+
+
+@app.on_event("startup")
+def startup() -> None:
+    _database.record(database_schema_error())
+    if not _database.ready:
+        print(_database.last_error)
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    image_proxy_cache().save_index()
+    await object_http_client().aclose()
+
 
+def get_db() -> Generator[Session, None, None]:
+    ensure_database_ready()
     db = SessionLocal()
     try:
-        yield db
+        try:
+            yield db
+        except SQLAlchemyError as exc:
+            record_database_error(exc)
+            raise
+        if _database.failures:
+            _database.record(None)
     finally:
         db.close()
 
@@ -209,6 +518,7 @@ class Poi(BaseModel):
     image: str = ""
     thumbnail_url: str = ""
     images: list[str] = Field(default_factory=list)
+    image_variants: list[dict[str, str]] = Field(default_factory=list)
     description: str | None = None
     country: str = "Thailand"
     city: str | None = None
@@ -303,6 +613,10 @@ class RouteGenerateResponse(BaseModel):
     reasoning: str | None = None
 
 
+class ImageCacheRequest(BaseModel):
+    place_ids: list[str] = Field(min_length=1, max_length=50)
+
+
 def _first_string(value: Any) -> str:
     if isinstance(value, str):
         return value
@@ -313,32 +627,7 @@ def _first_string(value: Any) -> str:
     return ""
 
 
-def _string_list(value: Any) -> list[str]:
-    if isinstance(value, str) and value:
-        return [value]
-    if isinstance(value, list):
-        return [item for item in value if isinstance(item, str) and item]
-    return []
-
-
-def _nested_name(raw: dict[str, Any], *keys: str) -> str | None:
-    current: Any = raw
-    for key in keys:
-        if not isinstance(current, dict):
-            return None
-        current = current.get(key)
-    return current if isinstance(current, str) and current else None
-
-
-def _to_float(value: Any) -> float | None:
-    try:
-        if value in (None, ""):
-            return None
-        return float(value)
-    except (TypeError, ValueError):
-        return None
-
-
+@timed("haversine_km")
 def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     radius = 6371.0
     d_lat = math.radians(lat2 - lat1)
@@ -353,73 +642,34 @@ def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
 
 def _normalize_place(raw: dict[str, Any]) -> Poi | None:
-    lat = _to_float(raw.get("latitude"))
-    lon = _to_float(raw.get("longitude"))
-    place_id = str(raw.get("placeId") or raw.get("id") or "").strip()
+    entry = normalize_record(raw)
+    return _catalogue_poi(entry) if entry else None
 
-    if not place_id or lat is None or lon is None:
-        return None
-    if raw.get("status") and raw.get("status") != "approved":
-        return None
-
-    sha = raw.get("sha") if isinstance(raw.get("sha"), dict) else {}
-    location = raw.get("location") if isinstance(raw.get("location"), dict) else {}
-    tags = raw.get("tags") if isinstance(raw.get("tags"), list) else []
-    category = raw.get("category") if isinstance(raw.get("category"), dict) else {}
-
-    images = []
-    for value in (
-        raw.get("thumbnailUrl"),
-        raw.get("thumbnail_url"),
-        raw.get("thumbnailURL"),
-        sha.get("thumbnailUrl"),
-        sha.get("thumbnail_url"),
-        sha.get("detailThumbnail"),
-        sha.get("detailPicture"),
-    ):
-        images.extend(_string_list(value))
 
-    images = list(dict.fromkeys(images))
-    image = images[0] if images else ""
-    description = raw.get("introduction") or sha.get("detail")
-
-    return Poi(
-        id=place_id,
-        name=str(raw.get("name") or sha.get("name") or "Unnamed POI"),
-        lat=lat,
-        long=lon,
-        image=image,
-        thumbnail_url=image,
-        images=images,
-        description=description if isinstance(description, str) else None,
-        city=_nested_name(location, "province", "name"),
-        province=_nested_name(location, "province", "name"),
-        district=_nested_name(location, "district", "name"),
-        address=location.get("address") if isinstance(location.get("address"), str) else None,
-        category=category.get("name") if isinstance(category.get("name"), str) else None,
-        type=_nested_name(sha, "type", "name"),
-        tags=[str(tag) for tag in tags if tag],
-        viewer=raw.get("viewer") if isinstance(raw.get("viewer"), int) else None,
-        slug=raw.get("slug") if isinstance(raw.get("slug"), str) else None,
-    )
+def _catalogue_poi(entry: dict[str, Any]) -> Poi | None:
+    return Poi.model_validate(entry["poi"]) if entry["poi"] else None
 
 
+@timed("sanitize_place_images")
 def _sanitize_place_images(place: Poi, require_image: bool = False) -> Poi | None:
     images = cached_urls(place.id)
     if require_image and not images:
         return None
 
+    variants = cached_variant_urls(place.id) if images else []
     image = images[0] if images else ""
     return place.model_copy(
         update={
             "image": image,
-            "thumbnail_url": image,
+            "thumbnail_url": variants[0].get("card", image) if variants else image,
             "images": images,
+            "image_variants": variants,
         }
     )
 
 
 def _sanitize_places_images(places: list[Poi], require_image: bool = False) -> list[Poi]:
+    MANIFEST_LOOKUPS.inc(amount=len(places))
     sanitized: list[Poi] = []
     for place in places:
         updated_place = _sanitize_place_images(place, require_image=require_image)
@@ -433,14 +683,63 @@ def get_places() -> list[Poi]:
     if not PLACES_PATH.exists():
         raise FileNotFoundError(f"places.json not found at {PLACES_PATH}")
 
-    with PLACES_PATH.open("r", encoding="utf-8") as file:
-        payload = json.load(file)
+    places = [_catalogue_poi(entry) for entry in load_catalogue(PLACES_PATH)]
+    return [place for place in places if place is not None]
 
-    if not isinstance(payload, list):
-        raise ValueError("places.json must contain a list of places")
 
-    places = [_normalize_place(item) for item in payload if isinstance(item, dict)]
-    return [place for place in places if place is not None]
+@lru_cache(maxsize=1)
+def catalogue_rows() -> dict[str, tuple[int, ...]]:
+    rows: dict[str, list[int]] = {}
+    for index, place in enumerate(get_places()):
+        rows.setdefault(place.id, []).append(index)
+    return {place_id: tuple(indexes) for place_id, indexes in rows.items()}
+
+
+def _mark_rows(bitmap: bytearray, place_id: str) -> None:
+    for index in catalogue_rows().get(place_id, ()):
+        bitmap[index >> 3] |= 1 << (index & 7)
+
+
+def places_version(db: Session, user_id: int) -> int:
+    return db.scalar(select(UserRecord.places_version).where(UserRecord.id == user_id)) or 0
+
+
+def bump_places_version(db: Session, user_id: int) -> int:
+    return db.execute(
+        update(UserRecord)
+        .where(UserRecord.id == user_id)
+        .values(places_version=UserRecord.places_version + 1)
+        .returning(UserRecord.places_version)
+    ).scalar_one()
+
+
+def seen_places(db: Session, user_id: int) -> bytearray:
+    # Read the version before the rows, so a set cached under a version never misses that version's writes.
+    version = places_version(db, user_id)
+    cached = _seen_sets.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # The same rows clear_swipes deletes, so a reset brings every place back.
+    bitmap = bytearray((len(get_places()) + 7) // 8)
+    rows = db.execute(
+        select(SwipeRecord.place_id)
+        .where(SwipeRecord.user_id == user_id)
+        .union(select(SwipeRollupRecord.place_id).where(SwipeRollupRecord.user_id == user_id))
+    )
+    for (place_id,) in rows:
+        _mark_rows(bitmap, place_id)
+    _seen_sets.set(user_id, (version, bitmap))
+    return bitmap
+
+
+def mark_seen(user_id: int, place_id: str, version: int) -> None:
+    cached = _seen_sets.get(user_id)
+    if cached is None or cached[0] != version - 1:
+        return
+    bitmap = bytearray(cached[1])
+    _mark_rows(bitmap, place_id)
+    _seen_sets.set(user_id, (version, bitmap))
 
 
 def get_or_create_user(
@@ -448,33 +747,57 @@ def get_or_create_user(
     line_user_id: str,
     display_name: str | None = None,
     picture_url: str | None = None,
-) -> UserRecord:
-    user = db.query(UserRecord).filter(UserRecord.line_user_id == line_user_id).first()
-    if user:
-        if display_name is not None:
-            user.display_name = display_name
-        if picture_url is not None:
-            user.picture_url = picture_url
-        user.updated_at = datetime.utcnow()
+) -> UserResponse:
+    cached = _user_cache.get(line_user_id)
+    if (
+        cached is not None
+        and (display_name is None or display_name == cached.display_name)
+        and (picture_url is None or picture_url == cached.picture_url)
+    ):
+        return cached
+
+    table = UserRecord.__table__
+    new_display_name = func.coalesce(insert(table).excluded.display_name, table.c.display_name)
+    new_picture_url = func.coalesce(insert(table).excluded.picture_url, table.c.picture_url)
+    statement = insert(table).values(
+        line_user_id=line_user_id,
+        display_name=display_name,
+        picture_url=picture_url,
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.line_user_id],
+        set_={
+            "display_name": new_display_name,
+            "picture_url": new_picture_url,
+            "updated_at": statement.excluded.updated_at,
+        },
+        where=or_(
+            table.c.display_name.is_distinct_from(new_display_name),
+            table.c.picture_url.is_distinct_from(new_picture_url),
+        ),
+    ).returning(table.c.id, table.c.line_user_id, table.c.display_name, table.c.picture_url)
+
+    _user_cache.pop(line_user_id)
+    row = db.execute(statement).first()
+    if row is None:
+        row = db.execute(
+            select(table.c.id, table.c.line_user_id, table.c.display_name, table.c.picture_url).where(
+                table.c.line_user_id == line_user_id
+            )
+        ).one()
+    else:
         db.commit()
-        db.refresh(user)
-        return user
-
-    user = UserRecord(line_user_id=line_user_id, display_name=display_name, picture_url=picture_url)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return _user_cache.set(line_user_id, UserResponse.model_validate(row._asdict()))
 
 
-def require_user(db: Session, line_user_id: str) -> UserRecord:
-    user = db.query(UserRecord).filter(UserRecord.line_user_id == line_user_id).first()
-    if user:
-        return user
+def require_user(db: Session, line_user_id: str) -> UserResponse:
     return get_or_create_user(db, line_user_id)
 
 
 def upsert_place(db: Session, poi: Poi) -> PlaceRecord:
+    MANIFEST_LOOKUPS.inc()
     poi = _sanitize_place_images(poi) or poi
     snapshot = poi.model_dump()
     place = db.query(PlaceRecord).filter(PlaceRecord.place_id == poi.id).first()
@@ -512,15 +835,45 @@ def poi_from_snapshot(snapshot: dict[str, Any]) -> Poi:
     return Poi.model_validate(snapshot)
 
 
-def liked_places_for_user(db: Session, user: UserRecord) -> list[Poi]:
-    rows = (
-        db.query(UserPlaceRecord, PlaceRecord)
-        .join(PlaceRecord, UserPlaceRecord.place_id == PlaceRecord.place_id)
-        .filter(UserPlaceRecord.user_id == user.id, UserPlaceRecord.status == "liked")
+@lru_cache(maxsize=1)
+def places_by_id() -> dict[str, Poi]:
+    catalogue: dict[str, Poi] = {}
+    for place in get_places():
+        catalogue.setdefault(place.id, place)
+    return catalogue
+
+
+def warm_caches() -> None:
+    try:
+        places_by_id()
+        catalogue_rows()
+    except (OSError, ValueError) as exc:
+        print(f"Catalogue not loaded: {exc}")
+    warm_manifest()
+
+
+def liked_places_for_user(db: Session, user: UserResponse) -> list[Poi]:
+    version = places_version(db, user.id)
+    cached = _liked_cache.get(user.id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    place_ids = db.execute(
+        select(UserPlaceRecord.place_id)
+        .where(UserPlaceRecord.user_id == user.id, UserPlaceRecord.status == "liked")
         .order_by(UserPlaceRecord.updated_at.desc())
-        .all()
-    )
-    return _sanitize_places_images([poi_from_snapshot(place.snapshot) for _, place in rows])
+    ).scalars().all()
+    catalogue = places_by_id()
+    missing = [place_id for place_id in place_ids if place_id not in catalogue]
+    snapshots: dict[str, Poi] = {}
+    if missing:
+        rows = db.execute(select(PlaceRecord.place_id, PlaceRecord.snapshot).where(PlaceRecord.place_id.in_(missing)))
+        snapshots = {place_id: poi_from_snapshot(snapshot) for place_id, snapshot in rows}
+
+    places = [catalogue.get(place_id) or snapshots.get(place_id) for place_id in place_ids]
+    liked = _sanitize_places_images([place for place in places if place is not None])
+    _liked_cache.set(user.id, (version, liked))
+    return liked
 
 
 def desired_route_count(duration: str) -> int:
@@ -549,9 +902,11 @@ def nearby_candidates(
     images_only: bool = True,
 ) -> list[Poi]:
     candidates: list[Poi] = []
+    lookups = 0
     for place in get_places():
         if place.id in exclude_ids:
             continue
+        lookups += 1
         place_with_images = _sanitize_place_images(place, require_image=images_only)
         if place_with_images is None:
             continue
@@ -565,6 +920,8 @@ def nearby_candidates(
                     }
                 )
             )
+    CATALOGUE_SCANS.inc("route_candidates")
+    MANIFEST_LOOKUPS.inc(amount=lookups)
     candidates.sort(key=lambda item: (item.distance_km or 999999, -(item.viewer or 0)))
     return candidates[:limit]
 
@@ -615,6 +972,7 @@ def parse_json_content(content: str) -> dict[str, Any]:
     return json.loads(stripped)
 
 
+@timed("call_openrouter")
 def call_openrouter(
     personality: str,
     duration: str,
@@ -661,9 +1019,11 @@ def call_openrouter(
         },
     }
 
+    started = time.perf_counter()
+    outcome = "error"
     try:
         response = httpx.post(
-            "https://openrouter.ai/api/v1/chat/completions",
+            f"{OPENROUTER_BASE_URL}/chat/completions",
             headers={
                 "Authorization": f"Bearer {OPENROUTER_API_KEY}",
                 "Content-Type": "application/json",
@@ -689,10 +1049,14 @@ def call_openrouter(
         response.raise_for_status()
         content = response.json()["choices"][0]["message"]["content"]
         parsed = parse_json_content(content)
+        outcome = "invalid"
         if isinstance(parsed.get("ordered_place_ids"), list):
+            outcome = "ok"
             return parsed
     except Exception as exc:
         print(f"OpenRouter route generation failed: {exc}")
+    finally:
+        OPENROUTER_DURATION.observe(time.perf_counter() - started, outcome)
     return None
 
 
@@ -705,52 +1069,243 @@ def health_check() -> dict[str, Any]:
     return {"status": "ok", "places": total, "image_cache": manifest_summary()}
 
 
+@app.get("/api/metrics")
+def metrics() -> Response:
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
+def require_admin(authorization: str | None = Header(default=None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {ADMIN_TOKEN}".encode("utf-8")
+    if not authorization or not secrets.compare_digest(authorization.encode("utf-8"), expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles() -> dict[str, Any]:
+    return {
+        "enabled": PROFILE_ENABLED,
+        "slow_ms": PROFILE_SLOW_MS,
+        "sample_rate": PROFILE_SAMPLE_RATE,
+        "profiles": request_profiler.profiles(),
+    }
+
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: int) -> Response:
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        profile.folded(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
+
+
 @app.get("/api/image-cache/status")
 def image_cache_status() -> dict[str, Any]:
-    return manifest_summary()
+    return {**manifest_summary(), "proxy_cache": image_proxy_cache().stats()}
+
+
+@app.post("/api/image-cache/requests", status_code=202)
+def request_image_cache(payload: ImageCacheRequest) -> dict[str, int]:
+    place_ids = [place_id for place_id in dict.fromkeys(payload.place_ids) if not cached_objects(place_id)]
+    record_demand(missing=place_ids)
+    return {"requested": len(place_ids)}
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def _resolve_image_request(
+    object_name: str,
+    width: int | None,
+    version: str | None,
+    accept: str,
+) -> tuple[str, str | None, dict[str, str]]:
+    current = object_version(object_name)
+    if version and version == current:
+        headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    else:
+        headers = {"Cache-Control": "public, max-age=86400, must-revalidate"}
+    if any(variant.get("format") == "avif" for variant in image_variants(object_name)):
+        headers["Vary"] = "Accept"
+    return select_variant(object_name, width, accept), current, headers
 
 
 @app.get("/api/image-cache/images/{object_name:path}")
-def cached_image(object_name: str) -> StreamingResponse:
+async def cached_image(
+    object_name: str,
+    request: Request,
+    w: int | None = Query(default=None, ge=1, le=4096, description="Requested display width in pixels."),
+    v: str | None = Query(default=None, description="Content version from cached image URLs."),
+) -> Response:
     if not object_name.startswith("places/") or ".." in object_name.split("/"):
         raise HTTPException(status_code=400, detail="Invalid image object name")
+    object_name, current, headers = await run_in_threadpool(
+        _resolve_image_request,
+        object_name,
+        w,
+        v,
+        request.headers.get("accept", ""),
+    )
+    cache = image_proxy_cache()
+
     try:
-        response = minio_client().get_object(MINIO_BUCKET, object_name)
-    except S3Error as exc:
-        if exc.code in {"NoSuchKey", "NoSuchObject", "NoSuchBucket"}:
-            raise HTTPException(status_code=404, detail="Cached image not found") from exc
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            info = cache.peek(object_name, current) or await stat_object_info(object_name)
+            if _etag_matches(if_none_match, info.etag):
+                cache.record_not_modified()
+                return Response(status_code=304, headers={**headers, "ETag": info.etag})
+        cached = await cache.get(object_name, download_object, current)
+    except ObjectNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Cached image not found") from exc
+    except (httpx.HTTPError, OSError) as exc:
         raise HTTPException(status_code=503, detail="Image cache unavailable") from exc
 
-    def stream() -> Generator[bytes, None, None]:
+    headers["X-Cache"] = cached.tier
+    headers["Accept-Ranges"] = "bytes"
+    if cached.info.etag:
+        headers["ETag"] = cached.info.etag
+    if cached.info.last_modified:
+        headers["Last-Modified"] = cached.info.last_modified
+    if cached.content is not None and (
+        "range" not in request.headers or cached.path is None or not await run_in_threadpool(cached.path.is_file)
+    ):
+        cache.release(cached)
+        return Response(content=cached.content, media_type=cached.info.content_type, headers=headers)
+    # The file stays pinned against eviction until FileResponse has sent it.
+    return FileResponse(cached.path, media_type=cached.info.content_type, headers=headers, background=BackgroundTask(cache.release, cached))
+
+
+BUNDLE_PLACE_ID = re.compile(r"[A-Za-z0-9_.:-]{1,128}")
+
+
+def _comma_separated(value: str | None) -> list[str]:
+    return list(dict.fromkeys(item.strip() for item in (value or "").split(",") if item.strip()))
+
+
+def _resolve_bundle_objects(place_ids: list[str], width: int, accept: str) -> list[tuple[str, str, str | None]]:
+    resolved: list[tuple[str, str, str | None]] = []
+    for place_id in place_ids:
+        objects = cached_objects(place_id)
+        if objects:
+            resolved.append((place_id, select_variant(objects[0], width, accept), object_version(objects[0])))
+    return resolved
+
+
+async def _fetch_bundle_objects(objects: list[tuple[str, str, str | None]]) -> list[tuple[str, str, Any]]:
+    cache = image_proxy_cache()
+
+    async def fetch(place_id: str, object_name: str, version: str | None) -> tuple[str, str, Any]:
         try:
-            yield from response.stream(64 * 1024)
+            return place_id, object_name, await cache.get(object_name, download_object, version)
+        except (ObjectNotFoundError, httpx.HTTPError, OSError):
+            return place_id, object_name, None
+
+    return await asyncio.gather(*(fetch(place_id, object_name, version) for place_id, object_name, version in objects))
+
+
+def _read_bundle_parts(fetched: list[tuple[str, str, Any]]) -> list[tuple[str, str, ObjectInfo, bytes]]:
+    cache = image_proxy_cache()
+    parts: list[tuple[str, str, ObjectInfo, bytes]] = []
+    for place_id, object_name, cached in fetched:
+        if cached is None:
+            continue
+        try:
+            content = cached.content if cached.content is not None else cached.path.read_bytes()
+        except OSError:
+            continue
         finally:
-            response.close()
-            response.release_conn()
+            cache.release(cached)
+        parts.append((place_id, object_name, cached.info, content))
+    return parts
+
+
+@app.get("/api/image-cache/bundle")
+async def image_bundle(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    place_ids: str = Query(..., description="Comma-separated place ids, at most 24."),
+    w: int = Query(default=320, ge=1, le=4096, description="Requested display width in pixels."),
+    prefetch_ids: str | None = Query(default=None, description="Comma-separated place ids to warm for the next deck."),
+) -> StreamingResponse:
+    requested = _comma_separated(place_ids)
+    if not requested or len(requested) > 24:
+        raise HTTPException(status_code=400, detail="place_ids must contain between 1 and 24 ids")
+    prefetch = [place_id for place_id in _comma_separated(prefetch_ids) if place_id not in requested][:24]
+    # Ids are echoed in part and response headers, which must stay single-line latin-1.
+    if not all(BUNDLE_PLACE_ID.fullmatch(place_id) for place_id in requested + prefetch):
+        raise HTTPException(status_code=422, detail="place ids may only contain letters, digits, '.', '_', ':' and '-'")
+    accept = request.headers.get("accept", "")
+    objects = await run_in_threadpool(_resolve_bundle_objects, requested, w, accept)
+    fetched = await _fetch_bundle_objects(objects)
+    parts_found = await run_in_threadpool(_read_bundle_parts, fetched)
+
+    if prefetch:
+
+        async def warm_next_deck() -> None:
+            warmed = await _fetch_bundle_objects(await run_in_threadpool(_resolve_bundle_objects, prefetch, w, accept))
+            for _, _, cached in warmed:
+                if cached is not None:
+                    image_proxy_cache().release(cached)
+
+        background_tasks.add_task(warm_next_deck)
+
+    boundary = uuid.uuid4().hex
+    found = {place_id for place_id, _, _, _ in parts_found}
+    missing = [place_id for place_id in requested if place_id not in found]
+
+    async def parts() -> AsyncGenerator[bytes, None]:
+        for place_id, object_name, info, content in parts_found:
+            part_headers = [
+                f"--{boundary}",
+                f"Content-Type: {info.content_type}",
+                f"Content-Length: {len(content)}",
+                f"Content-Location: {IMAGE_PROXY_PREFIX}/{object_name}",
+                f"X-Place-Id: {place_id}",
+            ]
+            if info.etag:
+                part_headers.append(f"ETag: {info.etag}")
+            yield ("\r\n".join(part_headers) + "\r\n\r\n").encode("utf-8") + content + b"\r\n"
+        yield f"--{boundary}--\r\n".encode("utf-8")
 
     return StreamingResponse(
-        stream(),
-        media_type=response.headers.get("content-type", "image/webp"),
-        headers={"Cache-Control": "public, max-age=86400, immutable"},
+        parts(),
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers={
+            "Cache-Control": "private, max-age=300",
+            "X-Missing-Place-Ids": ",".join(missing),
+        },
+        background=background_tasks,
     )
 
 
 @app.post("/api/users", response_model=UserResponse)
 def create_or_get_user(payload: UserCreate, db: Session = Depends(get_db)) -> UserResponse:
-    user = get_or_create_user(db, payload.line_user_id, payload.display_name, payload.picture_url)
-    return UserResponse(
-        id=user.id,
-        line_user_id=user.line_user_id,
-        display_name=user.display_name,
-        picture_url=user.picture_url,
-    )
+    return get_or_create_user(db, payload.line_user_id, payload.display_name, payload.picture_url)
 
 
 @app.get("/api/users/{line_user_id}/liked-places", response_model=PoiListResponse)
-def get_liked_places(line_user_id: str, db: Session = Depends(get_db)) -> PoiListResponse:
+def get_liked_places(
+    line_user_id: str,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+) -> PoiListResponse:
     user = require_user(db, line_user_id)
     places = liked_places_for_user(db, user)
-    return PoiListResponse(places=places, total=len(places), source_total=len(places))
+    page = places[offset : offset + limit] if limit is not None else places[offset:]
+    return PoiListResponse(places=page, total=len(places), source_total=len(places))
 
 
 @app.post("/api/users/{line_user_id}/swipes")
@@ -781,19 +1336,37 @@ def record_swipe(line_user_id: str, payload: SwipeCreate, db: Session = Depends(
             )
         )
 
+    version = bump_places_version(db, user.id)
     db.commit()
+    mark_seen(user.id, payload.place.id, version)
     return {"success": True, "place_id": payload.place.id, "status": status}
 
 
 @app.get("/api/users/{line_user_id}/swipes")
-def get_swipes(line_user_id: str, db: Session = Depends(get_db)) -> dict[str, Any]:
+def get_swipes(
+    line_user_id: str,
+    limit: int = Query(default=200, ge=1, le=1000),
+    since: str | None = Query(default=None, description="Cursor from next_cursor; returns older swipes."),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
     user = require_user(db, line_user_id)
-    rows = (
-        db.query(SwipeRecord)
-        .filter(SwipeRecord.user_id == user.id)
-        .order_by(SwipeRecord.created_at.desc())
-        .all()
+    query = (
+        select(SwipeRecord.id, SwipeRecord.place_id, SwipeRecord.direction, SwipeRecord.created_at)
+        .where(SwipeRecord.user_id == user.id)
+        .order_by(SwipeRecord.created_at.desc(), SwipeRecord.id.desc())
+        .limit(limit + 1)
     )
+    if since:
+        try:
+            created_at, _, swipe_id = since.rpartition("_")
+            cursor = (datetime.fromisoformat(created_at), int(swipe_id))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="Invalid swipe history cursor") from exc
+        query = query.where(tuple_(SwipeRecord.created_at, SwipeRecord.id) < cursor)
+
+    rows = db.execute(query).all()
+    page = rows[:limit]
+    total = db.scalar(select(func.count()).select_from(SwipeRecord).where(SwipeRecord.user_id == user.id))
     return {
         "swipes": [
             {
@@ -801,9 +1374,10 @@ def get_swipes(line_user_id: str, db: Session = Depends(get_db)) -> dict[str, An
                 "direction": row.direction,
                 "created_at": row.created_at.isoformat(),
             }
-            for row in rows
+            for row in page
         ],
-        "total": len(rows),
+        "total": total or 0,
+        "next_cursor": f"{page[-1].created_at.isoformat()}_{page[-1].id}" if len(rows) > limit else None,
     }
 
 
@@ -811,7 +1385,9 @@ def get_swipes(line_user_id: str, db: Session = Depends(get_db)) -> dict[str, An
 def clear_swipes(line_user_id: str, db: Session = Depends(get_db)) -> dict[str, bool]:
     user = require_user(db, line_user_id)
     db.query(SwipeRecord).filter(SwipeRecord.user_id == user.id).delete()
+    db.query(SwipeRollupRecord).filter(SwipeRollupRecord.user_id == user.id).delete()
     db.query(UserPlaceRecord).filter(UserPlaceRecord.user_id == user.id, UserPlaceRecord.status == "dismissed").delete()
+    bump_places_version(db, user.id)
     db.commit()
     return {"success": True}
 
@@ -827,6 +1403,7 @@ def remove_liked_place(line_user_id: str, place_id: str, db: Session = Depends(g
     if row:
         row.status = "removed"
         row.updated_at = datetime.utcnow()
+        bump_places_version(db, user.id)
         db.commit()
     return {"success": True}
 
@@ -834,10 +1411,12 @@ def remove_liked_place(line_user_id: str, place_id: str, db: Session = Depends(g
 @app.delete("/api/users/{line_user_id}/liked-places")
 def clear_liked_places(line_user_id: str, db: Session = Depends(get_db)) -> dict[str, bool]:
     user = require_user(db, line_user_id)
-    rows = db.query(UserPlaceRecord).filter(UserPlaceRecord.user_id == user.id).all()
-    for row in rows:
-        row.status = "removed"
-        row.updated_at = datetime.utcnow()
+    db.execute(
+        update(UserPlaceRecord)
+        .where(UserPlaceRecord.user_id == user.id)
+        .values(status="removed", updated_at=datetime.utcnow())
+    )
+    bump_places_version(db, user.id)
     db.commit()
     return {"success": True}
 
@@ -962,6 +1541,7 @@ def generate_route(
     else:
         route_places = fallback_route(candidates, count, anchor, payload.personality)
 
+    ROUTE_GENERATIONS.inc("openrouter" if is_ai_generated else "fallback")
     for place in route_places:
         upsert_place(db, place)
 
@@ -1020,6 +1600,7 @@ def list_pois(
     except (FileNotFoundError, ValueError) as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
+    CATALOGUE_SCANS.inc("search")
     filtered = places
     if province:
         filtered = [place for place in filtered if place.province == province]
@@ -1054,6 +1635,7 @@ def nearby_pois(
     limit: int = Query(default=12, ge=1, le=100),
     exclude_ids: str | None = Query(default=None, description="Comma-separated place ids to exclude."),
     images_only: bool = Query(default=False),
+    line_user_id: str | None = Query(default=None, description="Exclude places this user has already swiped."),
 ) -> PoiListResponse:
     try:
         places = get_places()
@@ -1061,13 +1643,30 @@ def nearby_pois(
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
     excluded = {item.strip() for item in (exclude_ids or "").split(",") if item.strip()}
+    seen = bytearray()
+    if line_user_id:
+        ensure_database_ready()
+        try:
+            with SessionLocal() as db:
+                seen = seen_places(db, require_user(db, line_user_id).id)
+        except SQLAlchemyError as exc:
+            record_database_error(exc)
+            raise HTTPException(status_code=503, detail=f"Database unavailable: {exc}") from exc
     nearby: list[Poi] = []
+    uncached: list[tuple[float, str]] = []
+    lookups = 0
 
-    for place in places:
+    for index, place in enumerate(places):
+        if seen and seen[index >> 3] & (1 << (index & 7)):
+            continue
         if place.id in excluded:
             continue
+        lookups += 1
         place_with_images = _sanitize_place_images(place, require_image=images_only)
         if place_with_images is None:
+            distance_km = _haversine_km(lat, lng, place.lat, place.long)
+            if distance_km <= radius_km:
+                uncached.append((distance_km, place.id))
             continue
         distance_km = _haversine_km(lat, lng, place_with_images.lat, place_with_images.long)
         if distance_km <= radius_km:
@@ -1080,6 +1679,8 @@ def nearby_pois(
                 )
             )
 
+    CATALOGUE_SCANS.inc("nearby")
+    MANIFEST_LOOKUPS.inc(amount=lookups)
     nearby.sort(
         key=lambda item: (
             0 if item.thumbnail_url else 1,
@@ -1087,7 +1688,12 @@ def nearby_pois(
             item.name,
         )
     )
-    return PoiListResponse(places=nearby[:limit], total=len(nearby), source_total=len(places))
+    page = nearby[:limit]
+    # Places left out of an images-only deck, or shown without a photo, are the ones worth caching next.
+    missing = [place_id for _, place_id in heapq.nsmallest(limit, uncached)]
+    missing.extend(place.id for place in page if not place.thumbnail_url)
+    record_demand(hits=[place.id for place in page], missing=missing)
+    return PoiListResponse(places=page, total=len(nearby), source_total=len(places))
 
 
 @app.get("/api/poi-clusters", response_model=PoiClusterResponse)
@@ -1101,6 +1707,7 @@ def poi_clusters(
     except (FileNotFoundError, ValueError) as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
+    CATALOGUE_SCANS.inc("clusters")
     buckets: dict[tuple[int, int], list[Poi]] = {}
     for place in places:
         key = (math.floor(place.lat / grid_size), math.floor(place.long / grid_size))
@@ -1127,6 +1734,8 @@ def poi_clusters(
         category = max(category_counts, key=category_counts.get) if category_counts else None
         with_images = _sanitize_places_images(bucket, require_image=True)
         thumbnail = with_images[0].thumbnail_url if with_images else ""
+        if with_images and with_images[0].image_variants:
+            thumbnail = with_images[0].image_variants[0].get("thumb", thumbnail)
         sample_names = [place.name for place in sorted(bucket, key=lambda item: item.viewer or 0, reverse=True)[:3]]
         center_lat = sum(place.lat for place in bucket) / len(bucket)
         center_lng = sum(place.long for place in bucket) / len(bucket)
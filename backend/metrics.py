@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, TypeVar
+
+
+METRICS_TIMING_HOOKS = os.getenv("METRICS_TIMING_HOOKS", "false").lower() == "true"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values)
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        lock: threading.Lock | None = None,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = lock or threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._observe(value, labels)
+
+    def _observe(self, value: float, labels: tuple[str, ...]) -> None:
+        # Per series: one slot per bucket plus +Inf, then the sum. Callers hold the lock.
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, values in series:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {repr(values[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(cumulative)}")
+        return lines
+
+
+class CallbackMetric:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        kind: str,
+        callback: Callable[[], dict[tuple[str, ...], float]],
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.callback = callback
+        self.labels = labels
+        REGISTRY.append(self)
+
+    def render(self) -> list[str]:
+        try:
+            values = sorted(self.callback().items())
+        except Exception:
+            return []
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values)
+        return lines
+
+
+REGISTRY: list[Counter | Histogram | CallbackMetric] = []
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestUsage:
+    __slots__ = ("db_queries",)
+
+    def __init__(self) -> None:
+        self.db_queries = 0
+
+
+_request_usage: ContextVar[RequestUsage | None] = ContextVar("request_usage", default=None)
+
+_http_lock = threading.Lock()
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte.",
+    ("method", "route", "status"),
+    lock=_http_lock,
+)
+HTTP_FIRST_BYTE = Histogram(
+    "http_response_first_byte_seconds",
+    "Time from receiving a request to sending the response headers.",
+    ("route",),
+    lock=_http_lock,
+)
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database statements executed per request.",
+    ("route",),
+    QUERY_COUNT_BUCKETS,
+    lock=_http_lock,
+)
+DB_QUERIES = Counter("db_queries_total", "Database statements executed.")
+FUNCTION_DURATION = Histogram(
+    "function_duration_seconds",
+    "Duration of helpers wrapped with timing hooks (METRICS_TIMING_HOOKS=true).",
+    ("function",),
+    FAST_BUCKETS + LATENCY_BUCKETS[4:],
+)
+
+
+def record_db_query(*_: Any) -> None:
+    DB_QUERIES.inc()
+    usage = _request_usage.get()
+    if usage is not None:
+        usage.db_queries += 1
+
+
+def timed(name: str) -> Callable[[F], F]:
+    def decorate(function: F) -> F:
+        if not METRICS_TIMING_HOOKS:
+            return function
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                FUNCTION_DURATION.observe(time.perf_counter() - started, name)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+class MetricsMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        first_byte = 0.0
+        status = "500"
+        usage = RequestUsage()
+        token = _request_usage.set(usage)
+
+        async def send_with_timing(message: dict[str, Any]) -> None:
+            nonlocal first_byte, status
+            if message["type"] == "http.response.start":
+                first_byte = time.perf_counter()
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            finished = time.perf_counter()
+            _request_usage.reset(token)
+            route = scope.get("route")
+            # Label by route template, not raw path, so ids do not create new series.
+            path = getattr(route, "path", "unmatched")
+            route_labels = (path,)
+            with _http_lock:
+                HTTP_DURATION._observe(finished - started, (scope["method"], path, status))
+                if first_byte:
+                    HTTP_FIRST_BYTE._observe(first_byte - started, route_labels)
+                HTTP_DB_QUERIES._observe(usage.db_queries, route_labels)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import inspect, insert, select, text
+from sqlalchemy.engine import Connection
+
+from main import (
+    SCHEMA_VERSION,
+    Base,
+    SchemaMigrationRecord,
+    SwipeRecord,
+    SwipeRollupRecord,
+    UserPlaceRecord,
+    UserRecord,
+    current_schema_version,
+    engine,
+)
+
+
+# Migrations must be safe on a database whose tables were created from the current models,
+# because version 1 creates every missing table as it is defined today.
+MIGRATION_LOCK_KEY = 4_114_202_611
+
+
+def create_tables(connection: Connection) -> None:
+    Base.metadata.create_all(bind=connection)
+
+
+def add_history_indexes(connection: Connection) -> None:
+    for table, name in (
+        (UserPlaceRecord.__table__, "ix_user_places_user_status_updated"),
+        (SwipeRecord.__table__, "ix_swipes_user_created"),
+    ):
+        next(index for index in table.indexes if index.name == name).create(connection, checkfirst=True)
+
+
+def add_swipe_rollups(connection: Connection) -> None:
+    SwipeRollupRecord.__table__.create(connection, checkfirst=True)
+
+
+def add_places_version(connection: Connection) -> None:
+    if "places_version" in {column["name"] for column in inspect(connection).get_columns(UserRecord.__tablename__)}:
+        return
+    connection.execute(text("ALTER TABLE users ADD COLUMN places_version INTEGER NOT NULL DEFAULT 0"))
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create tables", create_tables),
+    (2, "liked places and swipe history indexes", add_history_indexes),
+    (3, "swipe rollups", add_swipe_rollups),
+    (4, "per-user places version", add_places_version),
+]
+
+
+def migrate() -> list[int]:
+    if MIGRATIONS[-1][0] != SCHEMA_VERSION:
+        raise RuntimeError(f"Latest migration is {MIGRATIONS[-1][0]} but main.SCHEMA_VERSION is {SCHEMA_VERSION}")
+
+    applied: list[int] = []
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        SchemaMigrationRecord.__table__.create(connection, checkfirst=True)
+        done = set(connection.execute(select(SchemaMigrationRecord.version)).scalars())
+        for version, name, apply in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"Applying migration {version}: {name}", flush=True)
+            apply(connection)
+            connection.execute(
+                insert(SchemaMigrationRecord).values(version=version, name=name, applied_at=datetime.utcnow())
+            )
+            applied.append(version)
+    return applied
+
+
+def main() -> None:
+    if "--status" in sys.argv:
+        with engine.connect() as connection:
+            print(f"Schema version {current_schema_version(connection)} of {SCHEMA_VERSION}", flush=True)
+        return
+    applied = migrate()
+    print(f"Schema is at version {SCHEMA_VERSION} ({len(applied)} migrations applied)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+
+def hamming(left: int, right: int) -> int:
+    return (left ^ right).bit_count()
+
+
+class BKTree:
+    def __init__(self) -> None:
+        # Each node is [hash, values, children keyed by Hamming distance to this node].
+        self._root: list[Any] | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: int, value: Any) -> None:
+        with self._lock:
+            self._size += 1
+            if self._root is None:
+                self._root = [key, [value], {}]
+                return
+            node = self._root
+            while True:
+                distance = hamming(key, node[0])
+                if distance == 0:
+                    node[1].append(value)
+                    return
+                child = node[2].get(distance)
+                if child is None:
+                    node[2][distance] = [key, [value], {}]
+                    return
+                node = child
+
+    def search(self, key: int, radius: int) -> list[tuple[int, Any]]:
+        matches: list[tuple[int, Any]] = []
+        with self._lock:
+            stack = [self._root] if self._root is not None else []
+            while stack:
+                node = stack.pop()
+                distance = hamming(key, node[0])
+                if distance <= radius:
+                    matches.extend((distance, value) for value in node[1])
+                # The triangle inequality rules out every subtree whose edge distance is outside distance ± radius.
+                low, high = distance - radius, distance + radius
+                stack.extend(child for edge, child in node[2].items() if low <= edge <= high)
+        matches.sort(key=lambda match: match[0])
+        return matches
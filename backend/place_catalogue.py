@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import marshal
+import os
+from pathlib import Path
+from typing import Any
+
+from image_cache import MANIFEST_PATH
+
+
+NORMALIZE_VERSION = 1
+SNAPSHOT_PATH = Path(os.getenv("CATALOGUE_SNAPSHOT_PATH") or MANIFEST_PATH.with_name("catalogue_snapshot.json"))
+
+
+def _string_list(value: Any) -> list[str]:
+    if isinstance(value, str):
+        value = [value]
+    if isinstance(value, list):
+        return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+    return []
+
+
+def _nested_name(raw: dict[str, Any], *keys: str) -> str | None:
+    current: Any = raw
+    for key in keys:
+        if not isinstance(current, dict):
+            return None
+        current = current.get(key)
+    return current if isinstance(current, str) and current else None
+
+
+def _to_float(value: Any) -> float | None:
+    try:
+        if value in (None, ""):
+            return None
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def image_candidates(raw: dict[str, Any], sha: dict[str, Any] | None = None) -> list[str]:
+    if sha is None:
+        sha = raw.get("sha") if isinstance(raw.get("sha"), dict) else {}
+    urls: list[str] = []
+    for value in (
+        raw.get("thumbnailUrl"),
+        raw.get("thumbnail_url"),
+        raw.get("thumbnailURL"),
+        sha.get("thumbnailUrl"),
+        sha.get("thumbnail_url"),
+        sha.get("detailThumbnail"),
+        sha.get("detailPicture"),
+    ):
+        urls.extend(_string_list(value))
+    return list(dict.fromkeys(urls))
+
+
+def source_fingerprint(urls: list[str]) -> str:
+    return hashlib.sha256("\n".join(urls).encode("utf-8")).hexdigest()
+
+
+def normalize_record(raw: dict[str, Any]) -> dict[str, Any] | None:
+    place_id = str(raw.get("placeId") or raw.get("id") or "").strip()
+    if not place_id:
+        return None
+
+    sha = raw.get("sha") if isinstance(raw.get("sha"), dict) else {}
+    images = image_candidates(raw, sha)
+    entry: dict[str, Any] = {
+        "id": place_id,
+        "image_urls": images,
+        "image_fingerprint": source_fingerprint(images),
+        "poi": None,
+    }
+
+    lat = _to_float(raw.get("latitude"))
+    lon = _to_float(raw.get("longitude"))
+    if lat is None or lon is None:
+        return entry
+    if raw.get("status") and raw.get("status") != "approved":
+        return entry
+
+    location = raw.get("location") if isinstance(raw.get("location"), dict) else {}
+    tags = raw.get("tags") if isinstance(raw.get("tags"), list) else []
+    category = raw.get("category") if isinstance(raw.get("category"), dict) else {}
+    image = images[0] if images else ""
+    description = raw.get("introduction") or sha.get("detail")
+    province = _nested_name(location, "province", "name")
+
+    entry["poi"] = {
+        "id": place_id,
+        "name": str(raw.get("name") or sha.get("name") or "Unnamed POI"),
+        "lat": lat,
+        "long": lon,
+        "image": image,
+        "thumbnail_url": image,
+        "images": images,
+        "description": description if isinstance(description, str) else None,
+        "city": province,
+        "province": province,
+        "district": _nested_name(location, "district", "name"),
+        "address": location.get("address") if isinstance(location.get("address"), str) else None,
+        "category": category.get("name") if isinstance(category.get("name"), str) else None,
+        "type": _nested_name(sha, "type", "name"),
+        "tags": [str(tag) for tag in tags if tag],
+        "viewer": raw.get("viewer") if isinstance(raw.get("viewer"), int) else None,
+        "slug": raw.get("slug") if isinstance(raw.get("slug"), str) else None,
+    }
+    return entry
+
+
+def record_hash(raw: dict[str, Any]) -> str:
+    # marshal is several times faster than json.dumps here; a Python upgrade that changes its output only costs one re-normalization.
+    return hashlib.blake2b(marshal.dumps(raw), digest_size=16).hexdigest()
+
+
+def _read_snapshot() -> dict[str, Any]:
+    # The snapshot sits on a volume other processes can write, so it is plain JSON data and is checked before use.
+    try:
+        snapshot = json.loads(SNAPSHOT_PATH.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(snapshot, dict) or snapshot.get("version") != NORMALIZE_VERSION:
+        return {}
+    records, order = snapshot.get("records"), snapshot.get("order")
+    if not isinstance(records, dict) or not isinstance(order, list):
+        return {}
+    if not all(isinstance(entry, dict) for entry in records.values()) or not all(isinstance(key, str) and key in records for key in order):
+        return {}
+    return snapshot
+
+
+def _write_snapshot(snapshot: dict[str, Any]) -> None:
+    try:
+        SNAPSHOT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temporary = SNAPSHOT_PATH.with_name(f"{SNAPSHOT_PATH.name}.{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        temporary.replace(SNAPSHOT_PATH)
+    except OSError as exc:
+        print(f"Catalogue snapshot not written to {SNAPSHOT_PATH}: {exc}", flush=True)
+
+
+def load_catalogue(path: Path) -> list[dict[str, Any]]:
+    stat = path.stat()
+    source = {"path": str(path.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    snapshot = _read_snapshot()
+    records: dict[str, dict[str, Any]] = snapshot.get("records", {})
+    if snapshot.get("source") == source:
+        return [records[key] for key in snapshot["order"]]
+
+    with path.open("r", encoding="utf-8") as file:
+        payload = json.load(file)
+    if not isinstance(payload, list):
+        raise ValueError("places.json must contain a list of places")
+
+    # Records whose content hash is already in the snapshot reuse their normalized entry.
+    current: dict[str, dict[str, Any]] = {}
+    order: list[str] = []
+    normalized = 0
+    for raw in payload:
+        if not isinstance(raw, dict):
+            continue
+        key = record_hash(raw)
+        entry = current.get(key) or records.get(key)
+        if entry is None:
+            entry = normalize_record(raw)
+            normalized += 1
+            if entry is None:
+                continue
+        current[key] = entry
+        order.append(key)
+
+    if normalized:
+        print(f"Catalogue snapshot: normalized {normalized} of {len(order)} places", flush=True)
+    _write_snapshot({"version": NORMALIZE_VERSION, "source": source, "records": current, "order": order})
+    return [current[key] for key in order]
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import Context, ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "20"))
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", "64"))
+
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "runners.py")
+
+# Threadpool calls run inside a copy of the request's context, which is how their samples are traced back to the request.
+_current_profile: ContextVar[int | None] = ContextVar("current_profile", default=None)
+
+
+@dataclass
+class RequestProfile:
+    id: int
+    method: str
+    path: str
+    query: str
+    started_at: float
+    started: float
+    status: int = 0
+    duration_ms: float = 0.0
+    reason: str = ""
+    samples: int = 0
+    stacks: Counter[str] = field(default_factory=Counter)
+    thread_id: int = 0
+    frame: Any = field(default=None, repr=False)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "duration_ms": round(self.duration_ms, 1),
+            "reason": self.reason,
+            "samples": self.samples,
+        }
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _folded_stack(frame: Any) -> str | None:
+    names: list[str] = []
+    innermost = frame.f_code.co_filename
+    if innermost.endswith(IDLE_FILES):
+        return None
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _on_stack(frame: Any, target: Any) -> bool:
+    while frame is not None:
+        if frame is target:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _context_profile(frame: Any) -> int | None:
+    # The worker's copied context is a local of one of the outermost frames (the threadpool's run loop).
+    outer: deque[Any] = deque(maxlen=4)
+    while frame is not None:
+        outer.append(frame)
+        frame = frame.f_back
+    for candidate in outer:
+        for value in candidate.f_locals.values():
+            if isinstance(value, Context):
+                return value.get(_current_profile)
+    return None
+
+
+class RequestProfiler:
+    def __init__(self, slow_ms: float, sample_rate: float, interval_ms: float, ring_size: int) -> None:
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self._active: dict[int, RequestProfile] = {}
+        self._profiles: deque[RequestProfile] = deque(maxlen=ring_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def _ensure_sampler(self) -> None:
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._sample_forever, name="request-profiler", daemon=True)
+            self._sampler.start()
+
+    def _sample_forever(self) -> None:
+        own_thread = threading.get_ident()
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+                if not active:
+                    self._wake.clear()
+                    continue
+            # A stack belongs to a request only when its thread is running that request: the event loop while the
+            # request's own coroutine is on the stack, or a threadpool worker running in the request's context.
+            owned: list[tuple[RequestProfile, str]] = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                owners = [profile for profile in active if profile.thread_id == thread_id and _on_stack(frame, profile.frame)]
+                if not owners:
+                    profile_id = _context_profile(frame)
+                    owners = [profile for profile in active if profile.id == profile_id]
+                if owners and (stack := _folded_stack(frame)) is not None:
+                    owned.extend((profile, stack) for profile in owners)
+            with self._lock:
+                for profile in active:
+                    profile.samples += 1
+                for profile, stack in owned:
+                    profile.stacks[stack] += 1
+
+    def start(self, method: str, path: str, query: str, frame: Any = None) -> RequestProfile:
+        profile = RequestProfile(
+            id=next(self._ids),
+            method=method,
+            path=path,
+            query=query,
+            started_at=time.time(),
+            started=time.perf_counter(),
+            thread_id=threading.get_ident(),
+            frame=frame,
+        )
+        with self._lock:
+            self._active[profile.id] = profile
+            self._ensure_sampler()
+        if not self._wake.is_set():
+            self._wake.set()
+        return profile
+
+    def finish(self, profile: RequestProfile, status: int) -> None:
+        profile.duration_ms = (time.perf_counter() - profile.started) * 1000
+        profile.status = status
+        profile.frame = None
+        if profile.duration_ms >= self.slow_ms:
+            profile.reason = "slow"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            profile.reason = "sampled"
+        with self._lock:
+            self._active.pop(profile.id, None)
+            if profile.reason:
+                self._profiles.append(profile)
+
+    def profiles(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: int) -> RequestProfile | None:
+        with self._lock:
+            return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+
+request_profiler = RequestProfiler(PROFILE_SLOW_MS, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, PROFILE_RING_SIZE)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: Any, profiler: RequestProfiler = request_profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.start(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), sys._getframe()
+        )
+        token = _current_profile.set(profile.id)
+        status = 500
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_profile.reset(token)
+            self.profiler.finish(profile, status)
@@ -40,12 +40,6 @@ const TinderPage: React.FC = () => {
     setLikedPlaces(liked.places);
   }, [lineUserId]);
 
-  const loadSwipedIds = useCallback(async () => {
-    if (USE_MOCK_DATA) return [];
-    const response = await poiApi.getSwipes(lineUserId);
-    return response.swipes.map((swipe) => swipe.place_id);
-  }, [lineUserId]);
-
   const ensureUser = useCallback(async () => {
     if (USE_MOCK_DATA) {
       await mockApi.createOrGetUser(lineUserId);
@@ -97,7 +91,7 @@ const TinderPage: React.FC = () => {
             lng: location.lng,
             radiusKm: location.radiusKm,
             limit: 80,
-            excludeIds: await loadSwipedIds(),
+            lineUserId,
             imagesOnly: true,
           });
       setPlaces(response.places);
@@ -111,7 +105,7 @@ const TinderPage: React.FC = () => {
     } finally {
       setLoading(false);
     }
-  }, [ensureUser, lineUserId, loadLikedPlaces, loadSwipedIds]);
+  }, [ensureUser, lineUserId, loadLikedPlaces]);
 
   useEffect(() => {
     const checkPreferencesAndLoad = async () => {
@@ -42,6 +42,18 @@ export interface DiscoverySessionPayload {
   source?: string;
 }
 
+export interface SwipeHistoryItem {
+  place_id: string;
+  direction: 'left' | 'right';
+  created_at: string;
+}
+
+export interface SwipeHistoryPage {
+  swipes: SwipeHistoryItem[];
+  total: number;
+  next_cursor: string | null;
+}
+
 export interface RouteAnchor {
   lat: number;
   lng: number;
@@ -150,6 +162,7 @@ class PoiApi {
     limit?: number;
     excludeIds?: string[];
     imagesOnly?: boolean;
+    lineUserId?: string;
   }): Promise<PoiResponse> {
     const params = new URLSearchParams({
       lat: String(options.lat),
@@ -164,6 +177,9 @@ class PoiApi {
     if (options.imagesOnly) {
       params.set('images_only', 'true');
     }
+    if (options.lineUserId) {
+      params.set('line_user_id', options.lineUserId);
+    }
 
     return this.fetchPoiResponse(`/api/pois/nearby?${params.toString()}`);
   }
@@ -219,8 +235,10 @@ class PoiApi {
     });
   }
 
-  async getSwipes(lineUserId: string): Promise<{ swipes: { place_id: string; direction: 'left' | 'right'; created_at: string }[]; total: number }> {
-    return this.fetch(`/api/users/${encodeURIComponent(lineUserId)}/swipes`);
+  async getSwipes(lineUserId: string, options: { limit?: number; since?: string } = {}): Promise<SwipeHistoryPage> {
+    const params = new URLSearchParams({ limit: String(options.limit ?? 200) });
+    if (options.since) params.set('since', options.since);
+    return this.fetch<SwipeHistoryPage>(`/api/users/${encodeURIComponent(lineUserId)}/swipes?${params.toString()}`);
   }
 
   async clearSwipes(lineUserId: string) {